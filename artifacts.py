@@ -0,0 +1,119 @@
+import datetime
+import hashlib
+import re
+from collections import Counter
+
+from pymongo import ReturnDocument
+
+# Arquivos gerados guardados uma única vez, endereçados pelo sha256 do conteúdo.
+# refcount conta os registros de histórico que apontam para o artefato; ao chegar a zero
+# o artefato recebe orphaned_at e o índice TTL (bootstrap.py) o remove depois.
+COLLECTION = "artifacts"
+
+_KEY_RE = re.compile(r"[0-9a-f]{64}\Z")
+
+
+def content_key(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def valid_key(key):
+    return isinstance(key, str) and bool(_KEY_RE.match(key))
+
+
+# Filtro e update de retain; o $setOnInsert recria o artefato se o TTL já o tiver removido
+def _retain_update(kind, content, count=1):
+    key = content_key(content)
+    return key, {"_id": key}, {
+        "$inc": {"refcount": count},
+        "$unset": {"orphaned_at": ""},
+        "$setOnInsert": {
+            "kind": kind,
+            "content": content,
+            "size": len(content),
+            "created_at": datetime.datetime.now(datetime.timezone.utc),
+        },
+    }
+
+
+def retain(db, kind, content):
+    key, query, update = _retain_update(kind, content)
+    db[COLLECTION].update_one(query, update, upsert=True)
+    return key
+
+
+# Versão em lote de retain para o write-behind (history_writer.py): um upsert por artefato distinto do lote
+def retain_many(db, kind, contents):
+    for content, count in Counter(filter(None, contents)).items():
+        _, query, update = _retain_update(kind, content, count)
+        db[COLLECTION].update_one(query, update, upsert=True)
+
+
+def _orphan_update(key):
+    return {"_id": key, "refcount": {"$lte": 0}}, {"$set": {"orphaned_at": datetime.datetime.now(datetime.timezone.utc)}}
+
+
+def release(db, key):
+    if not valid_key(key):
+        return
+    artifact = db[COLLECTION].find_one_and_update(
+        {"_id": key}, {"$inc": {"refcount": -1}}, projection={"refcount": 1}, return_document=ReturnDocument.AFTER
+    )
+    if artifact is not None and artifact.get("refcount", 0) <= 0:
+        db[COLLECTION].update_one(*_orphan_update(key))
+
+
+async def release_async(db, key):
+    if not valid_key(key):
+        return
+    artifact = await db[COLLECTION].find_one_and_update(
+        {"_id": key}, {"$inc": {"refcount": -1}}, projection={"refcount": 1}, return_document=ReturnDocument.AFTER
+    )
+    if artifact is not None and artifact.get("refcount", 0) <= 0:
+        await db[COLLECTION].update_one(*_orphan_update(key))
+
+
+# Chaves agrupadas pela quantidade de referências: um update_many por quantidade distinta
+def _keys_by_count(keys):
+    groups = {}
+    for key, count in Counter(key for key in keys if valid_key(key)).items():
+        groups.setdefault(count, []).append(key)
+    return groups
+
+
+# Versões em lote de release/retain, usadas pela remoção e restauração em lote (history_bulk.py)
+def release_many(db, keys):
+    groups = _keys_by_count(keys)
+    for count, group in groups.items():
+        db[COLLECTION].update_many({"_id": {"$in": group}}, {"$inc": {"refcount": -count}})
+    if groups:
+        db[COLLECTION].update_many(*_orphan_update({"$in": [key for group in groups.values() for key in group]}))
+
+
+# Só reconta artefatos que ainda existem; se o TTL já removeu um deles, o download gera o arquivo de novo
+def reacquire_many(db, keys):
+    for count, group in _keys_by_count(keys).items():
+        db[COLLECTION].update_many({"_id": {"$in": group}}, {"$inc": {"refcount": count}, "$unset": {"orphaned_at": ""}})
+
+
+# Remove um registro de histórico e libera o artefato dele; retorna None se não existir
+# projection: campos extras do registro removido que o chamador precisa (além do artefato)
+def delete_history(db, collection_name, query, projection=None):
+    deleted = db[collection_name].find_one_and_delete(query, projection=dict(projection or {}, **{"content.artifact": 1}))
+    if deleted is not None:
+        release(db, deleted.get("content", {}).get("artifact"))
+    return deleted
+
+
+async def delete_history_async(db, collection_name, query, projection=None):
+    deleted = await db[collection_name].find_one_and_delete(query, projection=dict(projection or {}, **{"content.artifact": 1}))
+    if deleted is not None:
+        await release_async(db, deleted.get("content", {}).get("artifact"))
+    return deleted
+
+
+def load(db, key):
+    if not valid_key(key):
+        return None
+    artifact = db[COLLECTION].find_one({"_id": key}, {"content": 1})
+    return bytes(artifact["content"]) if artifact else None
@@ -0,0 +1,267 @@
+# Modo assíncrono (ASGI), opcional, para as rotas que passam quase todo o tempo esperando o MongoDB
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+#
+# /dockerfileHistory, /dockerComposeHistory e as duas rotas de exclusão são atendidas aqui com o
+# AsyncMongoClient do pymongo, sem ocupar uma thread por requisição. Todas as outras rotas seguem
+# para o mesmo app Flask, executado em um pool de threads (a2wsgi). Respostas, autenticação e
+# mensagens de erro são as mesmas do modo síncrono.
+import asyncio
+import json
+import os
+import time
+from urllib.parse import parse_qsl
+
+from werkzeug.http import http_date
+
+import jwt
+from a2wsgi import WSGIMiddleware
+from bson.objectid import ObjectId
+from pymongo import AsyncMongoClient
+
+import artifacts
+import auth
+import compression
+import history
+import history_sync
+import history_search
+import metrics
+import usage_stats
+from app import app as flask_app
+
+flask_app.config["ASGI_WSGI_THREADS"] = int(os.environ.get("ASGI_WSGI_THREADS", 10))
+wsgi = WSGIMiddleware(flask_app, workers=flask_app.config["ASGI_WSGI_THREADS"])
+
+
+# Cliente assíncrono com as mesmas opções de pool do cliente síncrono (MONGO_*)
+class AsyncDatabase:
+    def __init__(self, database):
+        self.database = database
+        self._pid = None
+        self._client = None
+
+    @property
+    def client(self):
+        if self._pid != os.getpid():
+            self._client = AsyncMongoClient(
+                self.database.uri,
+                event_listeners=[metrics.MongoCommandMetrics()],
+                **self.database.client_options,
+            )
+            self._pid = os.getpid()
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[self.database.name]
+
+    async def ping(self):
+        await self.client.admin.command("ping", maxTimeMS=self.database.ping_timeout_ms)
+
+    async def close(self):
+        if self._client is not None and self._pid == os.getpid():
+            await self._client.close()
+        self._client = None
+        self._pid = None
+
+
+mongo = AsyncDatabase(flask_app.extensions["mongo"])
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        # Como no request.args do Flask, vale o primeiro valor de cada parâmetro
+        self.args = {}
+        for key, value in parse_qsl(scope.get("query_string", b"").decode("latin-1")):
+            self.args.setdefault(key, value)
+        self.body = body
+
+    def get_json(self):
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError:
+            return None
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+# Mesmo corpo do jsonify (provider de JSON do Flask: datas em formato HTTP, chaves ordenadas),
+# comprimido como no compression.init_app; data=None envia uma resposta sem corpo (304)
+async def send_json(send, request, status, data, extra_headers=()):
+    headers = [(key.encode("latin-1"), value.encode("latin-1")) for key, value in extra_headers]
+    body = b""
+    if data is not None:
+        body = flask_app.json.response(data).get_data()
+        headers.append((b"content-type", b"application/json"))
+        headers.append((b"vary", b"Accept-Encoding"))
+        encoding = compression.negotiate(request.headers.get("accept-encoding"))
+        if status == 200 and encoding and len(body) >= flask_app.config["COMPRESS_MIN_SIZE"]:
+            body = compression.compress(
+                body,
+                encoding,
+                gzip_level=flask_app.config["COMPRESS_GZIP_LEVEL"],
+                brotli_quality=flask_app.config["COMPRESS_BROTLI_QUALITY"],
+            )
+            headers.append((b"content-encoding", encoding.encode("ascii")))
+        headers.append((b"content-length", str(len(body)).encode("ascii")))
+    # Mesmos cabeçalhos que o Flask-CORS adiciona com origins="*"
+    headers += [(b"access-control-allow-origin", b"*"), (b"access-control-expose-headers", b"Authorization")]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+    return status
+
+
+# Mesmas respostas do auth.login_required: 403 sem token, 401 para token expirado ou inválido
+def authenticate(request):
+    token = auth.bearer_token(request.headers.get("authorization"))
+    if not token:
+        return None, (403, {"error": "Token ausente"})
+
+    try:
+        verifier = flask_app.extensions["token_verifier"]
+        return verifier.verify(token, flask_app.config["SECRET_KEY"]), None
+    except jwt.ExpiredSignatureError:
+        return None, (401, {"error": "Token expirado"})
+    except jwt.InvalidTokenError:
+        return None, (401, {"error": "Token inválido"})
+
+
+async def history_changes(request, user_id, collection_name, fields):
+    try:
+        since = history_sync.since_arg(request.args)
+    except ValueError as e:
+        return 400, {"error": str(e)}
+
+    try:
+        return 200, await history_sync.fetch_changes_async(
+            mongo.db, collection_name, user_id, fields, since, flask_app.config["HISTORY_SYNC_MAX"],
+            flask_app.config["HISTORY_SYNC_LAG"], flask_app.config["HISTORY_TOMBSTONE_TTL"],
+        )
+    except history_sync.SyncExpired as e:
+        return 410, {"error": str(e)}
+    except Exception as e:
+        return 500, {"error": f"Erro ao recuperar histórico: {str(e)}"}
+
+
+async def history_page(request, user_id, collection_name, fields):
+    if "since" in request.args:
+        return await history_changes(request, user_id, collection_name, fields)
+
+    try:
+        limit, cursor = history.page_args(
+            request.args, flask_app.config["HISTORY_PAGE_SIZE"], flask_app.config["HISTORY_MAX_PAGE_SIZE"]
+        )
+        conditions, search = history_search.parse(collection_name, request.args)
+    except ValueError as e:
+        return 400, {"error": str(e)}
+
+    try:
+        etag, last_modified = await history.fetch_validators_async(mongo.db, collection_name, user_id, fields, limit, cursor, search)
+        validators = [("ETag", f'W/"{etag}"'), ("Cache-Control", "private, no-cache")]
+        if last_modified:
+            validators.append(("Last-Modified", http_date(last_modified)))
+
+        if history.not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since"), etag, last_modified):
+            return 304, None, validators
+
+        items, next_cursor = await history.fetch_page_async(mongo.db[collection_name], user_id, fields, limit, cursor, conditions)
+        return 200, {
+            "message": "Histórico recuperado com sucesso",
+            "history": items,
+            "next_cursor": next_cursor,
+            "since": history_sync.next_since(flask_app.config["HISTORY_SYNC_LAG"]),
+        }, validators
+    except Exception as e:
+        return 500, {"error": f"Erro ao recuperar histórico: {str(e)}"}
+
+
+async def history_delete(request, user_id, collection_name, label):
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return 400, {"error": "JSON inválido"}
+
+    try:
+        history_id = ObjectId(data.get("_id"))
+        deleted = await artifacts.delete_history_async(mongo.db, collection_name, {
+            "_id": history_id,
+            "content.user_id": user_id
+        }, projection=usage_stats.PROJECTION)
+
+        if deleted is None:
+            return 404, {"error": f"{label} não encontrado ou não pertence ao usuário"}
+
+        await history_sync.record_deletions_async(mongo.db, collection_name, user_id, [history_id])
+        flask_app.extensions["usage_recorder"].forget(collection_name, [deleted])
+        await mongo.db[history.STATE_COLLECTION].update_one(*history.version_update(collection_name, user_id), upsert=True)
+        return 200, {"message": f"{label} excluído com sucesso"}
+    except Exception as e:
+        return 500, {"error": f"Erro ao excluir {label}: {str(e)}"}
+
+
+# Rotas atendidas de forma assíncrona: (método, caminho) -> (handler, argumentos)
+ROUTES = {
+    ("GET", "/dockerfileHistory"): (history_page, ("dockerfile", history.DOCKERFILE_FIELDS)),
+    ("GET", "/dockerComposeHistory"): (history_page, ("dockercompose", history.DOCKERCOMPOSE_FIELDS)),
+    ("DELETE", "/dockerfileHistoryDelete"): (history_delete, ("dockerfile", "Dockerfile")),
+    ("DELETE", "/dockerComposeHistoryDelete"): (history_delete, ("dockercompose", "Docker Compose")),
+}
+
+
+async def handle(scope, receive, send, route):
+    handler, arguments = route
+    request = Request(scope, await read_body(receive))
+
+    user_id, error = authenticate(request)
+    if error:
+        return await send_json(send, request, *error)
+
+    return await send_json(send, request, *await handler(request, user_id, *arguments))
+
+
+# Aquece os dois clientes: o síncrono também garante os índices (bootstrap.py)
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await asyncio.to_thread(flask_app.extensions["mongo"].warmup)
+            try:
+                await mongo.ping()
+            except Exception as e:
+                print(f"Erro ao conectar ao MongoDB (cliente assíncrono): {e}")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await mongo.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    route = ROUTES.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+    if route is None:
+        return await wsgi(scope, receive, send)
+
+    path = scope["path"]
+    metrics.REQUESTS_IN_FLIGHT.labels(path).inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        status = await handle(scope, receive, send, route)
+    finally:
+        metrics.REQUEST_LATENCY.labels(path, scope["method"], str(status)).observe(time.perf_counter() - start)
+        metrics.REQUESTS_IN_FLIGHT.labels(path).dec()
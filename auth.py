@@ -0,0 +1,161 @@
+import functools
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from flask import current_app, g, jsonify, request
+
+
+# Verificação de JWT com cache dos tokens já validados
+class TokenVerifier:
+    def __init__(self, max_size=10000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+        self.verifications = 0
+        self.cache_hits = 0
+        self.failures = 0
+
+    def _cached(self, token):
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is None:
+                return None
+
+            user_id, expires_at = entry
+            if expires_at <= time.time():
+                del self._tokens[token]
+                return None
+
+            self._tokens.move_to_end(token)
+            self.cache_hits += 1
+            return user_id
+
+    def _store(self, token, user_id, exp):
+        # A entrada nunca vive mais que o próprio token
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+
+        with self._lock:
+            self._tokens[token] = (user_id, expires_at)
+            self._tokens.move_to_end(token)
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+
+    # Retorna o user_id do token ou levanta jwt.ExpiredSignatureError / jwt.InvalidTokenError
+    def verify(self, token, secret):
+        user_id = self._cached(token)
+        if user_id is not None:
+            return user_id
+
+        with self._lock:
+            self.verifications += 1
+
+        try:
+            decoded_token = jwt.decode(token, secret, algorithms=["HS256"])
+            user_id = decoded_token["user_id"]
+        except KeyError:
+            with self._lock:
+                self.failures += 1
+            raise jwt.InvalidTokenError("Token sem user_id")
+        except jwt.InvalidTokenError:
+            with self._lock:
+                self.failures += 1
+            raise
+
+        if self.max_size > 0:
+            self._store(token, user_id, decoded_token.get("exp"))
+        return user_id
+
+    def revoke(self, token):
+        with self._lock:
+            self._tokens.pop(token, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.verifications + self.cache_hits
+            return {
+                "size": len(self._tokens),
+                "max_size": self.max_size,
+                "verifications": self.verifications,
+                "cache_hits": self.cache_hits,
+                "failures": self.failures,
+                "hit_rate": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def init_app(app):
+    app.config.setdefault("TOKEN_CACHE_SIZE", 10000)
+    app.config.setdefault("TOKEN_CACHE_TTL", 300)
+    app.extensions["token_verifier"] = TokenVerifier(
+        max_size=app.config["TOKEN_CACHE_SIZE"],
+        ttl=app.config["TOKEN_CACHE_TTL"],
+    )
+
+
+def token_verifier():
+    return current_app.extensions["token_verifier"]
+
+
+# Tokens de operação (PROFILE_TOKEN, USAGE_STATS_TOKEN) comparados em tempo constante; os bytes
+# porque compare_digest recusa str com caracteres fora do ASCII. Token não configurado nunca confere
+def token_matches(token, expected):
+    return bool(expected) and isinstance(token, str) and hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8"))
+
+
+# Aceita "Bearer <token>" ou o token puro
+def bearer_token(header):
+    if not header:
+        return None
+    scheme, _, token = header.partition(" ")
+    return token.strip() if token else scheme.strip()
+
+
+# Valida o token da requisição e guarda o usuário em flask.g
+def _authenticate():
+    g.user_id = None
+    token = bearer_token(request.headers.get("Authorization"))
+    if not token:
+        return None
+
+    g.user_id = token_verifier().verify(token, current_app.config["SECRET_KEY"])
+    return g.user_id
+
+
+# Rotas que exigem login: 403 sem token, 401 para token expirado ou inválido
+def login_required(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            user_id = _authenticate()
+        except jwt.ExpiredSignatureError:
+            return jsonify({"error": "Token expirado"}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({"error": "Token inválido"}), 401
+
+        if not user_id:
+            return jsonify({"error": "Token ausente"}), 403
+
+        return view(*args, **kwargs)
+    return wrapper
+
+
+# Rotas em que o login é opcional; reject_invalid recusa tokens inválidos em vez de ignorá-los
+def login_optional(reject_invalid=False):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                _authenticate()
+            except jwt.InvalidTokenError:
+                g.user_id = None
+                if reject_invalid:
+                    return jsonify({"error": "Token inválido ou expirado"}), 401
+
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,195 @@
+# Compara o modo síncrono (gunicorn + app.py) com o modo assíncrono (uvicorn + asgi.py)
+# nas rotas de histórico e exclusão, com muitas conexões simultâneas
+#
+# Precisa de um mongod local (o AsyncMongoClient não funciona com o mongomock), gunicorn e uvicorn:
+#
+#   MONGO_URI=mongodb://127.0.0.1:27017/fad python benchmarks/bench_async.py --workers 2 --concurrency 50,500,2000
+import argparse
+import asyncio
+import datetime
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from bench_routes import ROUTES, Context, load_app, percentile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+ASYNC_ROUTES = ["dockerfileHistory", "dockerComposeHistory", "dockerfileHistoryDelete", "dockerComposeHistoryDelete"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_command(mode, port, workers, threads):
+    if mode == "sync":
+        return [
+            sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{port}",
+            "-w", str(workers), "--threads", str(threads), "--log-level", "warning", "app:app",
+        ]
+    return [
+        sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--no-access-log", "--log-level", "warning",
+    ]
+
+
+def wait_ready(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connection.request("GET", "/readyz")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Servidor na porta {port} não ficou pronto em {timeout}s")
+
+
+# Uma conexão por requisição (o worker sync do gunicorn não mantém keep-alive)
+async def send(port, method, path, body, headers, timeout):
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    lines = [f"{method} {path} HTTP/1.1", f"Host: 127.0.0.1:{port}", "Connection: close", f"Content-Length: {len(payload)}"]
+    if body is not None:
+        lines.append("Content-Type: application/json")
+    lines += [f"{key}: {value}" for key, value in headers.items()]
+
+    async def exchange():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+            return int(status_line.split()[1])
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    try:
+        status = await asyncio.wait_for(exchange(), timeout)
+    except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+        status = "erro"
+    return status, time.perf_counter() - start
+
+
+async def run_route(port, context, route, requests, concurrency, timeout):
+    name, method, path, build, prepare = route
+    if prepare:
+        prepare(context, requests)
+
+    calls = [build(context) for _ in range(requests)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(arguments):
+        query, body, headers = arguments
+        async with semaphore:
+            return await send(port, method, path, body, headers, timeout)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(call(arguments) for arguments in calls))
+    wall = time.perf_counter() - start
+
+    statuses = {}
+    latencies = []
+    for status, elapsed in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        latencies.append(elapsed * 1000)
+
+    return {
+        "route": name,
+        "requests": requests,
+        "throughput_rps": round(requests / wall, 2),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+# Milhares de conexões simultâneas passam do limite padrão de arquivos abertos
+def raise_file_limit():
+    try:
+        import resource
+
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do modo assíncrono (ASGI) contra os workers síncronos")
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--workers", type=int, default=2, help="processos por servidor")
+    parser.add_argument("--threads", type=int, default=4, help="threads por worker do gunicorn")
+    parser.add_argument("--concurrency", default="50,500")
+    parser.add_argument("--requests", type=int, default=2000, help="requisições por rota e cenário")
+    parser.add_argument("--history-size", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0, help="tempo máximo por requisição (s)")
+    parser.add_argument("--save", help="arquivo JSON onde salvar os resultados")
+    args = parser.parse_args()
+
+    raise_file_limit()
+    modes = [mode for mode in args.modes.split(",") if mode]
+    concurrency_levels = [int(level) for level in args.concurrency.split(",") if level]
+    routes = [route for route in ROUTES if route[0] in ASYNC_ROUTES]
+
+    # O app só é importado aqui para semear o banco (mesmo SECRET_KEY dos servidores)
+    output = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        app_module = load_app("mongod")
+        context = Context(app_module, args.history_size)
+    finally:
+        sys.stdout.close()
+        sys.stdout = output
+
+    results = []
+    try:
+        for mode in modes:
+            port = free_port()
+            server = subprocess.Popen(
+                server_command(mode, port, args.workers, args.threads),
+                cwd=ROOT,
+                stdout=subprocess.DEVNULL,
+                env=dict(os.environ, MONGO_URI=app_module.app.config["MONGO_URI"]),
+            )
+            try:
+                wait_ready(port)
+                for concurrency in concurrency_levels:
+                    for route in routes:
+                        result = asyncio.run(run_route(port, context, route, args.requests, concurrency, args.timeout))
+                        result.update(mode=mode, concurrency=concurrency, workers=args.workers)
+                        results.append(result)
+                        print(
+                            f"{mode:<6} {result['route']:<28} concurrency={concurrency:<5}"
+                            f" {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>9.2f} ms"
+                            f"  p99 {result['p99_ms']:>9.2f} ms  {result['statuses']}"
+                        )
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+    finally:
+        context.cleanup()
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as save_file:
+            json.dump({
+                "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "workers": args.workers,
+                "threads": args.threads,
+                "results": results,
+            }, save_file, indent=2)
+        print(f"Resultados salvos em {args.save}")
+
+
+if __name__ == "__main__":
+    main()
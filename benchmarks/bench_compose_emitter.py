@@ -0,0 +1,118 @@
+# Compara o emissor direto do docker-compose com o yaml.dump
+#
+# Antes de medir, confere que o emissor direto gera exatamente os mesmos bytes do
+# yaml.dump usado originalmente e que todo YAML gerado (inclusive pelo fallback com
+# LibYAML, que difere em casos raros como chaves vazias) volta ao mesmo dicionário.
+#
+#   python benchmarks/bench_compose_emitter.py --iterations 20000 --fuzz 5000
+import argparse
+import os
+import random
+import sys
+import timeit
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import compose_emitter  # noqa: E402
+import renderer  # noqa: E402
+
+# Valores escolhidos para exercitar as regras de aspas do YAML
+TRICKY_VALUES = [
+    "", "yes", "No", "on", "OFF", "true", "null", "~", "3.8", "42", "0x1F", "1e3", ".inf", "-", "--x", "8080:80",
+    "8080:50", "443:443/tcp", "a b", "a: b", "#x", "x#y", "key=value", "é", "*ref", "&anchor", "!tag", "@x", "x:",
+    "/app", "./src", "...", "---", "=", "<<", "python:3.11-slim", "nvidia/cuda:11.8-cudnn8-devel-ubuntu20.04",
+    "2026-10-18", "a" * 140, "_", "+1", "+x", "x" * 90 + " " + "y" * 20,
+]
+WORDS = ["web", "api", "db", "python", "app.py", "/app", "8080", "80:80", "NODE_ENV", "production", "run.sh", "gpu"]
+
+
+def base_specs():
+    specs = [
+        {"service": "web", "baseImage": "python:3.11", "workdir": "/app", "gpuSupport": True,
+         "envVars": "A=1,B=production", "ports": "8080:80, 443:443", "startupScript": "python app.py"},
+        {"service": "api", "useDockerfile": True, "context": ".", "ports": "5000"},
+        {"service": "x"},
+        {"service": "worker", "baseImage": "nvidia/cuda:11.8-cudnn8-devel-ubuntu20.04", "gpuSupport": True,
+         "envVars": "CUDA_VISIBLE_DEVICES=0,OMP_NUM_THREADS=4", "startupScript": "bash run.sh --epochs 10"},
+    ]
+    return [renderer.build_dockercompose(renderer.dockercompose_spec(spec)) for spec in specs]
+
+
+def random_scalar(rng):
+    choice = rng.random()
+    if choice < 0.5:
+        return rng.choice(WORDS)
+    if choice < 0.8:
+        return rng.choice(TRICKY_VALUES)
+    return rng.choice([True, False, None, 0, 7, 12345])
+
+
+def random_value(rng, depth):
+    choice = rng.random()
+    if depth > 2 or choice < 0.5:
+        return random_scalar(rng)
+    if choice < 0.75:
+        return {rng.choice(WORDS + TRICKY_VALUES[:20]): random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+    return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+
+
+def fuzz_documents(count, seed):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield {"version": "3.8", "services": {rng.choice(WORDS + TRICKY_VALUES): random_value(rng, 0)}}
+
+
+def check(documents):
+    direct = 0
+    fallback = 0
+    for document in documents:
+        try:
+            produced = compose_emitter.emit(document)
+        except compose_emitter.Unsupported:
+            produced = compose_emitter.dump(document)
+            fallback += 1
+        else:
+            expected = yaml.dump(document, default_flow_style=False)
+            if produced != expected:
+                raise AssertionError(f"Saída diferente para {document!r}:\n{produced}\n---\n{expected}")
+            direct += 1
+
+        if yaml.safe_load(produced) != document:
+            raise AssertionError(f"Round-trip diferente para {document!r}")
+    return direct, fallback
+
+
+def bench(label, func, documents, iterations):
+    rounds = max(1, iterations // len(documents))
+    seconds = min(timeit.repeat(lambda: [func(document) for document in documents], number=rounds, repeat=3))
+    per_call = seconds / (rounds * len(documents)) * 1e6
+    print(f"{label:<28} {per_call:10.2f} us/doc")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do emissor de docker-compose")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--fuzz", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    documents = base_specs()
+    direct, fallback = check(documents)
+    if fallback:
+        raise AssertionError("Os documentos gerados pela aplicação devem usar o emissor direto")
+
+    fuzz_direct, fuzz_fallback = check(fuzz_documents(args.fuzz, args.seed))
+    print(f"{direct + fuzz_direct} documentos idênticos ao yaml.dump, {fuzz_fallback} pelo fallback; round-trip ok")
+
+    baseline = bench("yaml.dump (Python)", lambda d: yaml.dump(d, default_flow_style=False), documents, args.iterations)
+    if compose_emitter.FallbackDumper is not yaml.SafeDumper:
+        bench("yaml.dump (CSafeDumper)", lambda d: yaml.dump(d, Dumper=yaml.CSafeDumper, default_flow_style=False), documents, args.iterations)
+    fast = bench("compose_emitter.dump", compose_emitter.dump, documents, args.iterations)
+    print(f"Ganho do emissor direto: {baseline / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# Benchmark de carga das rotas da API, sem depender do MongoDB Atlas
+#
+# Sobe o app em um servidor local (threaded) apontando para um banco substituto:
+#   --backend mongomock  banco em memória (padrão, não precisa de nada instalado)
+#   --backend mongod     um mongod local, informado em MONGO_URI (apenas localhost)
+#
+# Mede vazão e latência p50/p99 de cada rota para cada tamanho de histórico e nível
+# de concorrência. Os resultados podem ser salvos como baseline e comparados depois:
+#
+#   python benchmarks/bench_routes.py --history-sizes 100,5000 --concurrency 1,8 --save benchmarks/results/baseline.json
+#   python benchmarks/bench_routes.py --history-sizes 100,5000 --concurrency 1,8 --compare benchmarks/results/baseline.json
+import argparse
+import datetime
+import http.client
+import itertools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from urllib.parse import urlencode, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+DOCKERFILE_FORM = {
+    "baseImage": "python:3.11", "workdir": "/app", "framework": "torch", "dependencies": "numpy pandas",
+    "gpuSupport": True, "envVars": "A=1,B=2", "ports": "8080", "startupScript": "python app.py",
+    "useRequirements": True,
+}
+DOCKERCOMPOSE_FORM = {
+    "service": "web", "baseImage": "python:3.11", "workdir": "/app", "gpuSupport": True,
+    "envVars": "A=1,B=2", "ports": "8080:80", "startupScript": "python app.py",
+}
+DOCKERFILE_HISTORY = {
+    "base_image": "python:3.11", "workdir": "/app", "framework": "torch", "dependencies": "numpy pandas",
+    "gpu_support": True, "env_vars": "A=1,B=2", "ports": "8080", "startup_script": "python app.py",
+    "use_requirements": True,
+}
+DOCKERCOMPOSE_HISTORY = {
+    "service_name": "web", "base_image": "python:3.11", "workdir": "/app", "gpu_support": True,
+    "env_vars": "A=1,B=2", "ports": "8080:80", "startup_script": "python app.py",
+}
+
+
+# Importa o app com o banco substituto
+def load_app(backend):
+    if backend == "mongomock":
+        import mongomock
+
+        import app as app_module
+
+        # O cliente é criado no warmup, como no post_worker_init do gunicorn
+        client = mongomock.MongoClient()
+        with mock.patch("database.MongoClient", lambda *args, **kwargs: client):
+            app_module.app.extensions["mongo"].warmup()
+        return app_module
+
+    uri = os.environ.get("MONGO_URI", "mongodb://127.0.0.1:27017/fad")
+    if urlparse(uri).hostname not in ("localhost", "127.0.0.1", "::1"):
+        raise SystemExit("O backend mongod só pode ser usado com um MongoDB local (MONGO_URI em localhost)")
+    os.environ["MONGO_URI"] = uri
+
+    import app as app_module
+    if not app_module.app.extensions["mongo"].warmup():
+        raise SystemExit(f"Não foi possível conectar ao MongoDB em {uri}")
+    return app_module
+
+
+def start_server(flask_app):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    # Sem log de acesso por requisição
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, flask_app, threaded=True, request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class Context:
+    def __init__(self, app_module, history_size):
+        self.app_module = app_module
+        self.db = app_module.app.extensions["mongo"].db
+        self.run_id = uuid.uuid4().hex[:8]
+        self.user_name = f"bench-{self.run_id}"
+        self.password = "bench-password"
+        self.user_ids = []
+        self._delete_ids = {"dockerfile": [], "dockercompose": []}
+        self._lock = threading.Lock()
+        self._names = itertools.count()
+
+        # Usuário de teste e token
+        self.user_id = str(self.db["user"].insert_one({
+            "name": self.user_name,
+            "password": app_module.app.extensions["password_hasher"].hash(self.password),
+        }).inserted_id)
+        self.user_ids.append(self.user_id)
+        self.token = self.issue_token(self.user_id)
+        self.seed_history(history_size)
+
+    def issue_token(self, user_id):
+        import jwt
+
+        return jwt.encode({
+            "user_id": user_id,
+            "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1),
+        }, self.app_module.app.config["SECRET_KEY"], algorithm="HS256")
+
+    def seed_history(self, size, batch_size=1000):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for collection_name, data in (("dockerfile", DOCKERFILE_HISTORY), ("dockercompose", DOCKERCOMPOSE_HISTORY)):
+            documents = []
+            for index in range(size):
+                created_at = now - datetime.timedelta(seconds=index)
+                documents.append({"content": dict(data, created_at=created_at, user_id=self.user_id)})
+                if len(documents) >= batch_size:
+                    self.db[collection_name].insert_many(documents)
+                    documents = []
+            if documents:
+                self.db[collection_name].insert_many(documents)
+
+    # Cria os documentos que serão apagados pelas rotas de exclusão
+    def prepare_deletes(self, collection_name, count):
+        data = DOCKERFILE_HISTORY if collection_name == "dockerfile" else DOCKERCOMPOSE_HISTORY
+        created_at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=365)
+        result = self.db[collection_name].insert_many([
+            {"content": dict(data, created_at=created_at, user_id=self.user_id)} for _ in range(count)
+        ])
+        self._delete_ids[collection_name] = [str(object_id) for object_id in result.inserted_ids]
+
+    def next_delete_id(self, collection_name):
+        with self._lock:
+            return self._delete_ids[collection_name].pop()
+
+    def next_user_name(self):
+        return f"{self.user_name}-{next(self._names)}"
+
+    def cleanup(self):
+        for collection_name in ("dockerfile", "dockercompose"):
+            self.db[collection_name].delete_many({"content.user_id": {"$in": self.user_ids}})
+            self.db["history_state"].delete_many({"_id": {"$in": [f"{collection_name}:{user_id}" for user_id in self.user_ids]}})
+        self.db["history_tombstones"].delete_many({"user_id": {"$in": self.user_ids}})
+        self.db["user"].delete_many({"name": {"$regex": f"^{self.user_name}"}})
+
+
+def auth(context):
+    return {"Authorization": f"Bearer {context.token}"}
+
+
+# Cada rota: (nome, método, caminho, função que monta (query, corpo, headers), preparação)
+ROUTES = [
+    ("createDockerfile", "POST", "/createDockerfile", lambda c: (None, DOCKERFILE_FORM, auth(c)), None),
+    ("createDockerCompose", "POST", "/createDockerCompose", lambda c: (None, DOCKERCOMPOSE_FORM, auth(c)), None),
+    ("register", "POST", "/register", lambda c: (None, {"name": c.next_user_name(), "password": c.password}, {}), None),
+    ("login", "POST", "/login", lambda c: (None, {"name": c.user_name, "password": c.password}, {}), None),
+    ("protected", "GET", "/protected", lambda c: (None, None, auth(c)), None),
+    ("dockerfileHistory", "GET", "/dockerfileHistory", lambda c: (None, None, auth(c)), None),
+    ("dockerfileHistoryExport", "GET", "/dockerfileHistoryExport", lambda c: (None, None, auth(c)), None),
+    ("createDockerfileHistory", "POST", "/createDockerfileHistory", lambda c: (None, DOCKERFILE_HISTORY, auth(c)), None),
+    ("dockerfileHistoryDelete", "DELETE", "/dockerfileHistoryDelete",
+     lambda c: (None, {"_id": c.next_delete_id("dockerfile")}, auth(c)),
+     lambda c, n: c.prepare_deletes("dockerfile", n)),
+    ("dockerComposeHistory", "GET", "/dockerComposeHistory", lambda c: (None, None, auth(c)), None),
+    ("dockerComposeHistoryExport", "GET", "/dockerComposeHistoryExport", lambda c: (None, None, auth(c)), None),
+    ("createDockerComposeHistory", "POST", "/createDockerComposeHistory", lambda c: (None, DOCKERCOMPOSE_HISTORY, auth(c)), None),
+    ("dockerComposeHistoryDelete", "DELETE", "/dockerComposeHistoryDelete",
+     lambda c: (None, {"_id": c.next_delete_id("dockercompose")}, auth(c)),
+     lambda c, n: c.prepare_deletes("dockercompose", n)),
+]
+
+
+def send(host, port, method, path, query, body, headers):
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    if query:
+        path = f"{path}?{urlencode(query)}"
+    payload = None
+    headers = dict(headers)
+    if body is not None:
+        payload = json.dumps(body).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+
+    start = time.perf_counter()
+    connection.request(method, path, body=payload, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    elapsed = time.perf_counter() - start
+    connection.close()
+    return response.status, elapsed
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_route(host, port, context, route, requests, concurrency):
+    name, method, path, build, prepare = route
+    if prepare:
+        prepare(context, requests)
+
+    calls = [build(context) for _ in range(requests)]
+    statuses = {}
+
+    def call(arguments):
+        query, body, headers = arguments
+        return send(host, port, method, path, query, body, headers)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, calls))
+    wall = time.perf_counter() - start
+
+    latencies = []
+    for status, elapsed in results:
+        statuses[status] = statuses.get(status, 0) + 1
+        latencies.append(elapsed * 1000)
+
+    return {
+        "route": name,
+        "requests": requests,
+        "throughput_rps": round(requests / wall, 2),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def scenario_key(result):
+    return f"{result['route']}|history={result['history_size']}|concurrency={result['concurrency']}"
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = {scenario_key(result): result for result in json.load(baseline_file)["results"]}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get(scenario_key(result))
+        if not previous:
+            continue
+        change = (result["p99_ms"] - previous["p99_ms"]) / previous["p99_ms"] if previous["p99_ms"] else 0.0
+        marker = ""
+        if change > tolerance:
+            marker = "  <-- REGRESSÃO"
+            regressions.append(scenario_key(result))
+        print(f"{scenario_key(result):<72} p99 {previous['p99_ms']:>9.2f} -> {result['p99_ms']:>9.2f} ms ({change:+.0%}){marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das rotas da API")
+    parser.add_argument("--backend", choices=["mongomock", "mongod"], default="mongomock")
+    parser.add_argument("--history-sizes", default="100,1000")
+    parser.add_argument("--concurrency", default="1,8")
+    parser.add_argument("--requests", type=int, default=200, help="requisições por rota e cenário")
+    parser.add_argument("--routes", default="", help="lista de rotas separadas por vírgula (padrão: todas)")
+    parser.add_argument("--save", help="arquivo JSON onde salvar os resultados")
+    parser.add_argument("--compare", help="baseline JSON para comparar o p99")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="aumento máximo aceito no p99 (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    history_sizes = [int(size) for size in args.history_sizes.split(",") if size]
+    concurrency_levels = [int(level) for level in args.concurrency.split(",") if level]
+    selected = set(filter(None, args.routes.split(",")))
+    routes = [route for route in ROUTES if not selected or route[0] in selected]
+
+    # Os prints do app são descartados; os resultados vão para a saída original
+    output = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+
+    app_module = load_app(args.backend)
+    server = start_server(app_module.app)
+    host, port = server.server_address[:2]
+
+    results = []
+    try:
+        for history_size in history_sizes:
+            context = Context(app_module, history_size)
+            try:
+                for concurrency in concurrency_levels:
+                    for route in routes:
+                        result = run_route(host, port, context, route, args.requests, concurrency)
+                        result.update(history_size=history_size, concurrency=concurrency)
+                        results.append(result)
+                        print(
+                            f"{result['route']:<28} history={history_size:<7} concurrency={concurrency:<4}"
+                            f" {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f} ms"
+                            f"  p99 {result['p99_ms']:>8.2f} ms  {result['statuses']}",
+                            file=output,
+                        )
+            finally:
+                context.cleanup()
+    finally:
+        server.shutdown()
+        sys.stdout.close()
+        sys.stdout = output
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as output:
+            json.dump({
+                "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "backend": args.backend,
+                "results": results,
+            }, output, indent=2)
+        print(f"Resultados salvos em {args.save}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} cenário(s) com regressão acima de {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# Criação idempotente dos índices usados pela aplicação
+#
+#   MONGO_URI=... MONGO_DB_NAME=fad python bootstrap.py
+import os
+import sys
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, MongoClient
+from pymongo.errors import PyMongoError
+
+# Paginação do histórico por dono e data; também atende as rotas de remoção (_id + dono)
+HISTORY_INDEX = [("content.user_id", ASCENDING), ("content.created_at", DESCENDING), ("_id", DESCENDING)]
+
+# Sincronização incremental (history_sync.py); registros anteriores a changed_at ficam fora do índice
+SYNC_INDEX = [("content.user_id", ASCENDING), ("changed_at", ASCENDING), ("_id", ASCENDING)]
+SYNC_PARTIAL = {"changed_at": {"$exists": True}}
+
+
+# Filtros de igualdade do histórico (history_search.py): dono, campo filtrado e a mesma
+# ordenação da paginação. gpu_support é booleano e pouco seletivo para ter um índice próprio:
+# fica no user_created_at, que já entrega a ordem certa
+def search_index(field):
+    return [("content.user_id", ASCENDING), (field, ASCENDING), ("content.created_at", DESCENDING), ("_id", DESCENDING)]
+
+
+# Índice de texto do parâmetro q, com o dono como prefixo de igualdade
+def text_index(*fields):
+    return [("content.user_id", ASCENDING)] + [(field, TEXT) for field in fields]
+
+# Artefatos sem nenhum registro de histórico são removidos depois deste prazo
+ARTIFACT_ORPHAN_TTL = int(os.environ.get("ARTIFACT_ORPHAN_TTL", 7 * 24 * 3600))
+
+# Janela para desfazer uma remoção em lote (history_bulk.py)
+HISTORY_TRASH_TTL = int(os.environ.get("HISTORY_TRASH_TTL", 15 * 60))
+
+# Por quanto tempo um cursor de sincronização (since=) ainda enxerga as remoções
+HISTORY_TOMBSTONE_TTL = int(os.environ.get("HISTORY_TOMBSTONE_TTL", 30 * 24 * 3600))
+
+INDEXES = {
+    "user": [
+        # Garante nomes únicos: o cadastro é um único insert que trata a chave duplicada
+        IndexModel([("name", ASCENDING)], name="name_unique", unique=True),
+    ],
+    "dockerfile": [
+        IndexModel(HISTORY_INDEX, name="user_created_at"),
+        IndexModel(SYNC_INDEX, name="user_changed_at", partialFilterExpression=SYNC_PARTIAL),
+        IndexModel(search_index("content.base_image"), name="user_base_image"),
+        IndexModel(search_index("content.framework"), name="user_framework"),
+        IndexModel(text_index("content.dependencies", "content.startup_script"), name="user_text"),
+    ],
+    "dockercompose": [
+        IndexModel(HISTORY_INDEX, name="user_created_at"),
+        IndexModel(SYNC_INDEX, name="user_changed_at", partialFilterExpression=SYNC_PARTIAL),
+        IndexModel(search_index("content.base_image"), name="user_base_image"),
+        IndexModel(search_index("content.services.base_image"), name="user_services_base_image"),
+        IndexModel(text_index("content.startup_script", "content.services.startup_script"), name="user_text"),
+    ],
+    "artifacts": [
+        IndexModel([("orphaned_at", ASCENDING)], name="orphaned_ttl", expireAfterSeconds=ARTIFACT_ORPHAN_TTL),
+    ],
+    "history_trash": [
+        IndexModel([("deleted_at", ASCENDING)], name="deleted_ttl", expireAfterSeconds=HISTORY_TRASH_TTL),
+    ],
+    "refresh_tokens": [
+        # expireAfterSeconds=0: o documento sai quando expires_at passa
+        IndexModel([("expires_at", ASCENDING)], name="expires_ttl", expireAfterSeconds=0),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("family", ASCENDING)], name="family"),
+    ],
+    "templates": [
+        # Nome único por usuário e tipo; a listagem usa o mesmo prefixo
+        IndexModel([("user_id", ASCENDING), ("kind", ASCENDING), ("name", ASCENDING)], name="user_kind_name", unique=True),
+    ],
+    "history_tombstones": [
+        IndexModel([("collection", ASCENDING), ("user_id", ASCENDING), ("deleted_at", ASCENDING)], name="user_deleted_at"),
+        IndexModel([("deleted_at", ASCENDING)], name="deleted_ttl", expireAfterSeconds=HISTORY_TOMBSTONE_TTL),
+    ],
+}
+
+
+def _same_index(existing, model):
+    document = model.document
+    if bool(existing.get("unique")) != bool(document.get("unique")):
+        return False
+
+    # Índices de texto aparecem como _fts/_ftsx: compara o prefixo e os campos em weights
+    if "weights" in existing:
+        text_fields = {field for field, kind in document["key"].items() if kind == TEXT}
+        prefix = [(field, kind) for field, kind in document["key"].items() if kind != TEXT]
+        existing_prefix = [(field, kind) for field, kind in existing["key"] if field not in ("_fts", "_ftsx")]
+        return existing_prefix == prefix and set(existing["weights"]) == text_fields
+    return list(existing["key"]) == list(document["key"].items())
+
+
+# Cria os índices que faltam e devolve um relatório por índice
+# status: "exists", "created", "conflict" (mesmo nome com outra definição) ou "error"
+def ensure_indexes(db, indexes=INDEXES):
+    report = []
+    for collection_name, models in indexes.items():
+        collection = db[collection_name]
+        try:
+            existing = collection.index_information()
+        except PyMongoError as e:
+            report.extend(
+                {"collection": collection_name, "index": model.document["name"], "status": "error", "detail": str(e)}
+                for model in models
+            )
+            continue
+
+        for model in models:
+            name = model.document["name"]
+            entry = {"collection": collection_name, "index": name}
+            if name in existing:
+                entry["status"] = "exists" if _same_index(existing[name], model) else "conflict"
+            else:
+                try:
+                    collection.create_indexes([model])
+                    entry["status"] = "created"
+                except PyMongoError as e:
+                    # Ex.: nomes de usuário duplicados impedem o índice único
+                    entry["status"] = "error"
+                    entry["detail"] = str(e)
+            report.append(entry)
+    return report
+
+
+def index_ready(report, collection_name, index_name):
+    return any(
+        entry["collection"] == collection_name and entry["index"] == index_name and entry["status"] in ("exists", "created")
+        for entry in report
+    )
+
+
+def print_report(report):
+    for entry in report:
+        line = f"Índice {entry['collection']}.{entry['index']}: {entry['status']}"
+        if entry.get("detail"):
+            line += f" ({entry['detail']})"
+        print(line)
+
+
+if __name__ == "__main__":
+    uri = os.environ.get("MONGO_URI")
+    if not uri:
+        sys.exit("Defina MONGO_URI")
+
+    report = ensure_indexes(MongoClient(uri)[os.environ.get("MONGO_DB_NAME", "fad")])
+    print_report(report)
+    sys.exit(0 if all(entry["status"] in ("exists", "created") for entry in report) else 1)
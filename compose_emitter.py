@@ -0,0 +1,118 @@
+import functools
+import re
+import yaml
+from yaml.nodes import ScalarNode
+
+# Dumper usado quando o documento sai do formato conhecido: LibYAML se disponível
+try:
+    FallbackDumper = yaml.CSafeDumper
+except AttributeError:
+    FallbackDumper = yaml.SafeDumper
+
+_STR_TAG = "tag:yaml.org,2002:str"
+_resolver = yaml.resolver.Resolver()
+
+# Escalares que o emissor direto sabe escrever exatamente como o PyYAML:
+# sem espaços, sem indicadores no início e sem ':' no final
+_SIMPLE_SCALAR_RE = re.compile(r"[A-Za-z0-9_./-][A-Za-z0-9_./:=@+-]*\Z")
+
+# O PyYAML escreve chaves longas como chaves complexas ("? ")
+_MAX_SIMPLE_KEY = 128
+
+
+class Unsupported(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=4096)
+def _string(value):
+    if not _SIMPLE_SCALAR_RE.match(value) or value.endswith(":") or value == "-" or value.startswith(("---", "...")):
+        raise Unsupported(value)
+
+    # Textos que seriam lidos como outro tipo (número, booleano...) vão entre aspas simples
+    if _resolver.resolve(ScalarNode, value, (True, False)) == _STR_TAG:
+        return value
+    return f"'{value}'"
+
+
+def _scalar(value):
+    if isinstance(value, str):
+        return _string(value)
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if value is None:
+        return "null"
+    if isinstance(value, int):
+        return str(value)
+    raise Unsupported(value)
+
+
+def _key(key):
+    if not isinstance(key, str) or len(key) >= _MAX_SIMPLE_KEY:
+        raise Unsupported(key)
+    return _string(key)
+
+
+def _value(lines, prefix, value, indent):
+    if isinstance(value, dict):
+        if not value:
+            lines.append(prefix + " {}")
+        else:
+            lines.append(prefix)
+            _mapping(lines, value, indent + 2)
+    elif isinstance(value, list):
+        if not value:
+            lines.append(prefix + " []")
+        else:
+            lines.append(prefix)
+            # Listas dentro de mapeamentos não são indentadas (padrão do PyYAML)
+            _sequence(lines, value, indent)
+    else:
+        lines.append(prefix + " " + _scalar(value))
+
+
+def _mapping(lines, mapping, indent, first_prefix=None):
+    pad = " " * indent
+    try:
+        keys = sorted(mapping)
+    except TypeError:
+        raise Unsupported(mapping)
+
+    for position, key in enumerate(keys):
+        prefix = first_prefix if position == 0 and first_prefix is not None else pad
+        _value(lines, prefix + _key(key) + ":", mapping[key], indent)
+
+
+def _sequence(lines, items, indent):
+    pad = " " * indent
+    for item in items:
+        if isinstance(item, dict):
+            if not item:
+                lines.append(pad + "- {}")
+            else:
+                _mapping(lines, item, indent + 2, first_prefix=pad + "- ")
+        elif isinstance(item, list):
+            raise Unsupported(item)
+        else:
+            lines.append(pad + "- " + _scalar(item))
+
+
+# Emissor direto para o formato do docker-compose gerado pela aplicação
+def emit(document):
+    if not isinstance(document, dict) or not document:
+        raise Unsupported(document)
+
+    lines = []
+    _mapping(lines, document, 0)
+    lines.append("")
+    return "\n".join(lines)
+
+
+# Serializa o docker-compose com o mesmo resultado de yaml.dump(default_flow_style=False)
+def dump(document):
+    try:
+        return emit(document)
+    except Unsupported:
+        return yaml.dump(document, Dumper=FallbackDumper, default_flow_style=False)
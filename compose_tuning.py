@@ -0,0 +1,244 @@
+import re
+
+# Ajustes de desempenho de um serviço do docker-compose: recursos (deploy.resources),
+# reserva de GPUs, shm_size, ulimits, ipc, healthcheck e tmpfs. normalize valida o JSON
+# recebido (ValueError com a mensagem para o cliente) e apply escreve as chaves no serviço
+
+# Campo da especificação -> chave do JSON recebido
+FORM_FIELDS = {
+    "cpu_limit": "cpuLimit",
+    "memory_limit": "memoryLimit",
+    "cpu_reservation": "cpuReservation",
+    "memory_reservation": "memoryReservation",
+    "gpu_count": "gpuCount",
+    "gpu_device_ids": "gpuDeviceIds",
+    "shm_size": "shmSize",
+    "ulimits": "ulimits",
+    "ipc": "ipc",
+    "healthcheck": "healthcheck",
+    "tmpfs": "tmpfs",
+}
+
+ULIMITS = frozenset([
+    "core", "cpu", "data", "fsize", "locks", "memlock", "msgqueue", "nice",
+    "nofile", "nproc", "rss", "rtprio", "rttime", "sigpending", "stack",
+])
+IPC_MODES = frozenset(["host", "private", "shareable", "none"])
+
+_CPUS_RE = re.compile(r"\d+(\.\d+)?\Z")
+_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)([bkmg]?)b?\Z", re.IGNORECASE)
+_DURATION_RE = re.compile(r"(\d+(\.\d+)?(us|ms|s|m|h))+\Z")
+_DEVICE_ID_RE = re.compile(r"[A-Za-z0-9-]+\Z")
+_SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+MAX_TMPFS = 20
+
+
+def _present(value):
+    return value not in (None, "", [], {})
+
+
+def _cpus(value, name):
+    text = str(value).strip()
+    if isinstance(value, bool) or not _CPUS_RE.match(text) or float(text) <= 0:
+        raise ValueError(f"{name} deve ser um número de CPUs maior que zero")
+    return text
+
+
+def _size(value, name):
+    text = str(value).strip().lower()
+    match = _SIZE_RE.match(text)
+    if isinstance(value, bool) or not match or float(match.group(1)) <= 0:
+        raise ValueError(f"{name} inválido (ex.: 512m, 2g)")
+    return text
+
+
+def size_bytes(text):
+    number, unit = _SIZE_RE.match(text).groups()
+    return float(number) * _SIZE_UNITS[unit.lower()]
+
+
+def _int(value, name, minimum):
+    if isinstance(value, bool):
+        raise ValueError(f"{name} inválido")
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} inválido")
+    if number < minimum or str(number) != str(value).strip():
+        raise ValueError(f"{name} inválido")
+    return number
+
+
+def _string_list(value):
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        return None
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def _gpu_count(value):
+    if str(value).strip().lower() == "all":
+        return "all"
+    return _int(value, "gpuCount", 1)
+
+
+def _gpu_device_ids(value):
+    ids = _string_list(value)
+    if not ids or not all(_DEVICE_ID_RE.match(device_id) for device_id in ids):
+        raise ValueError("gpuDeviceIds deve ser uma lista de índices ou UUIDs de GPU")
+    return ids
+
+
+# {"nofile": 65536} ou {"nofile": {"soft": 1024, "hard": 65536}}; -1 é ilimitado
+def _ulimits(value):
+    if not isinstance(value, dict):
+        raise ValueError("ulimits deve ser um objeto")
+    ulimits = {}
+    for name, limit in value.items():
+        if name not in ULIMITS:
+            raise ValueError(f"ulimit desconhecido: {name}")
+        if isinstance(limit, dict):
+            if set(limit) != {"soft", "hard"}:
+                raise ValueError(f"ulimit {name} precisa de soft e hard")
+            soft = _int(limit["soft"], f"ulimit {name}", -1)
+            hard = _int(limit["hard"], f"ulimit {name}", -1)
+            if hard != -1 and (soft == -1 or soft > hard):
+                raise ValueError(f"ulimit {name}: soft não pode passar de hard")
+            ulimits[name] = {"soft": soft, "hard": hard}
+        else:
+            ulimits[name] = _int(limit, f"ulimit {name}", -1)
+    return ulimits
+
+
+def _ipc(value):
+    text = str(value).strip()
+    mode, _, target = text.partition(":")
+    if text in IPC_MODES or (mode in ("service", "container") and target):
+        return text
+    raise ValueError("ipc deve ser host, private, shareable, none, service:<nome> ou container:<nome>")
+
+
+def _duration(value, name):
+    text = str(value).strip()
+    if not _DURATION_RE.match(text):
+        raise ValueError(f"healthcheck.{name} inválido (ex.: 30s, 1m30s)")
+    return text
+
+
+# O teste pode vir como texto (executado pelo shell) ou como lista no formato do compose
+def _healthcheck(value):
+    if not isinstance(value, dict):
+        raise ValueError("healthcheck deve ser um objeto")
+
+    # start_period é o nome salvo no histórico; startPeriod o do formulário
+    allowed = {"test", "interval", "timeout", "retries", "startPeriod", "start_period", "disable"}
+    unknown = set(value) - allowed
+    if unknown:
+        raise ValueError(f"Campo desconhecido em healthcheck: {', '.join(sorted(unknown))}")
+
+    if value.get("disable") is True:
+        return {"disable": True}
+
+    test = value.get("test")
+    if isinstance(test, str) and test.strip():
+        test = ["CMD-SHELL", test.strip()]
+    elif not (
+        isinstance(test, list) and test and all(isinstance(item, str) for item in test)
+        and test[0] in ("CMD", "CMD-SHELL", "NONE")
+    ):
+        raise ValueError("healthcheck.test deve ser um comando ou uma lista iniciada por CMD ou CMD-SHELL")
+
+    healthcheck = {"test": test}
+    for name in ("interval", "timeout", "start_period"):
+        duration = value.get(name, value.get("startPeriod") if name == "start_period" else None)
+        if _present(duration):
+            healthcheck[name] = _duration(duration, name)
+    if _present(value.get("retries")):
+        healthcheck["retries"] = _int(value["retries"], "healthcheck.retries", 0)
+    return healthcheck
+
+
+# "/tmp" ou "/tmp:size=64m,mode=1777"; cada item é um ponto de montagem
+def _tmpfs(value):
+    mounts = [value] if isinstance(value, str) else value
+    if not isinstance(mounts, list) or not all(isinstance(mount, str) for mount in mounts):
+        raise ValueError("tmpfs deve ser uma lista de caminhos")
+    mounts = [mount.strip() for mount in mounts if mount.strip()]
+    if len(mounts) > MAX_TMPFS:
+        raise ValueError(f"Máximo de {MAX_TMPFS} montagens tmpfs por serviço")
+    if not all(mount.startswith("/") for mount in mounts):
+        raise ValueError("tmpfs deve usar caminhos absolutos")
+    return mounts
+
+
+_PARSERS = {
+    "cpu_limit": lambda value: _cpus(value, "cpuLimit"),
+    "memory_limit": lambda value: _size(value, "memoryLimit"),
+    "cpu_reservation": lambda value: _cpus(value, "cpuReservation"),
+    "memory_reservation": lambda value: _size(value, "memoryReservation"),
+    "gpu_count": _gpu_count,
+    "gpu_device_ids": _gpu_device_ids,
+    "shm_size": lambda value: _size(value, "shmSize"),
+    "ulimits": _ulimits,
+    "ipc": _ipc,
+    "healthcheck": _healthcheck,
+    "tmpfs": _tmpfs,
+}
+
+
+def normalize(form, fields):
+    tuning = {}
+    for field, parse in _PARSERS.items():
+        value = form.get(fields[field])
+        tuning[field] = parse(value) if _present(value) else None
+
+    if tuning["gpu_count"] is not None and tuning["gpu_device_ids"] is not None:
+        raise ValueError("Use gpuCount ou gpuDeviceIds, não os dois")
+    if tuning["cpu_limit"] and tuning["cpu_reservation"] and float(tuning["cpu_reservation"]) > float(tuning["cpu_limit"]):
+        raise ValueError("cpuReservation não pode passar de cpuLimit")
+    if (
+        tuning["memory_limit"] and tuning["memory_reservation"]
+        and size_bytes(tuning["memory_reservation"]) > size_bytes(tuning["memory_limit"])
+    ):
+        raise ValueError("memoryReservation não pode passar de memoryLimit")
+    return tuning
+
+
+def wants_gpu(spec):
+    return bool(spec.get("gpu_support")) or spec.get("gpu_count") is not None or spec.get("gpu_device_ids") is not None
+
+
+# Reserva de GPUs no formato atual do compose (substitui o runtime: nvidia, obsoleto)
+def _gpu_device(spec):
+    device = {"driver": "nvidia", "capabilities": ["gpu"]}
+    if spec.get("gpu_device_ids"):
+        device["device_ids"] = spec["gpu_device_ids"]
+    else:
+        device["count"] = spec.get("gpu_count") or "all"
+    return device
+
+
+def apply(service, spec):
+    limits = {}
+    reservations = {}
+    if spec.get("cpu_limit"):
+        limits["cpus"] = spec["cpu_limit"]
+    if spec.get("memory_limit"):
+        limits["memory"] = spec["memory_limit"]
+    if spec.get("cpu_reservation"):
+        reservations["cpus"] = spec["cpu_reservation"]
+    if spec.get("memory_reservation"):
+        reservations["memory"] = spec["memory_reservation"]
+    if wants_gpu(spec):
+        reservations["devices"] = [_gpu_device(spec)]
+
+    resources = {key: value for key, value in (("limits", limits), ("reservations", reservations)) if value}
+    if resources:
+        service["deploy"] = {"resources": resources}
+
+    for field in ("shm_size", "ulimits", "ipc", "healthcheck", "tmpfs"):
+        if spec.get(field):
+            service[field] = spec[field]
+    return service
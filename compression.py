@@ -0,0 +1,65 @@
+import gzip
+
+from flask import request
+from werkzeug.http import parse_accept_header
+
+# brotli é opcional: sem o pacote, só gzip é oferecido
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+# Melhor codificação aceita pelo cliente (respeita os pesos q do Accept-Encoding)
+def negotiate(accept_encoding):
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(ENCODINGS)
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=4):
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+# Comprime respostas JSON acima do limite quando o cliente aceita gzip ou brotli
+def init_app(app):
+    app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+    app.config.setdefault("COMPRESS_GZIP_LEVEL", 6)
+    app.config.setdefault("COMPRESS_BROTLI_QUALITY", 4)
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.mimetype != "application/json"
+            or response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        if response.content_length is None or response.content_length < app.config["COMPRESS_MIN_SIZE"]:
+            return response
+
+        encoding = negotiate(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+
+        response.set_data(compress(
+            response.get_data(),
+            encoding,
+            gzip_level=app.config["COMPRESS_GZIP_LEVEL"],
+            brotli_quality=app.config["COMPRESS_BROTLI_QUALITY"],
+        ))
+        response.headers["Content-Encoding"] = encoding
+
+        # A ETag forte descreve os bytes sem compressão
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
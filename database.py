@@ -0,0 +1,130 @@
+import os
+import threading
+
+from flask import current_app
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+import bootstrap
+import metrics
+
+
+# Conexão com o MongoDB criada sob demanda em cada processo: o gunicorn faz fork
+# depois de importar o app e um MongoClient não pode ser compartilhado entre processos
+class Database:
+    def __init__(self, uri, name="fad", ping_timeout_ms=2000, **client_options):
+        self.uri = uri
+        self.name = name
+        self.ping_timeout_ms = ping_timeout_ms
+        self.client_options = client_options
+        self._lock = threading.Lock()
+        self._pid = None
+        self._client = None
+        self._warm_pid = None
+        self._attempt_pid = None
+        self.index_report = []
+        # Listeners extras do pymongo (ex.: profiling.py); precisam entrar antes do primeiro acesso ao client
+        self.event_listeners = []
+
+    @property
+    def client(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._client = MongoClient(
+                        self.uri,
+                        event_listeners=[metrics.MongoCommandMetrics(), *self.event_listeners],
+                        **self.client_options,
+                    )
+                    self._pid = os.getpid()
+                    self._warm_pid = None
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[self.name]
+
+    @property
+    def warm(self):
+        return self._warm_pid == os.getpid()
+
+    def ping(self):
+        try:
+            self.client.admin.command("ping", maxTimeMS=self.ping_timeout_ms)
+            return True
+        except PyMongoError:
+            return False
+
+    # Abre a primeira conexão e garante os índices antes do worker receber tráfego
+    def warmup(self):
+        self._attempt_pid = os.getpid()
+        if not self.ping():
+            print("Erro ao conectar ao MongoDB")
+            return False
+
+        self.index_report = bootstrap.ensure_indexes(self.db)
+        bootstrap.print_report(self.index_report)
+        self._warm_pid = os.getpid()
+        print(f"Conectado ao banco MongoDB (pid {self._warm_pid})")
+        return True
+
+    # Aquece uma única vez por processo; depois disso quem tenta de novo é o /readyz
+    def ensure_warm(self):
+        if self._attempt_pid != os.getpid():
+            self.warmup()
+
+    def index_ready(self, collection_name, index_name):
+        return bootstrap.index_ready(self.index_report, collection_name, index_name)
+
+    def close(self):
+        if self._client is not None and self._pid == os.getpid():
+            self._client.close()
+        self._client = None
+        self._pid = None
+        self._warm_pid = None
+        self._attempt_pid = None
+
+
+def _optional_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def init_app(app):
+    app.config.setdefault("MONGO_URI", os.environ.get("MONGO_URI", "mongodb://127.0.0.1:27017/fad"))
+    app.config.setdefault("MONGO_DB_NAME", os.environ.get("MONGO_DB_NAME", "fad"))
+    app.config.setdefault("MONGO_MAX_POOL_SIZE", int(os.environ.get("MONGO_MAX_POOL_SIZE", 100)))
+    app.config.setdefault("MONGO_MIN_POOL_SIZE", int(os.environ.get("MONGO_MIN_POOL_SIZE", 0)))
+    app.config.setdefault("MONGO_MAX_IDLE_TIME_MS", _optional_int("MONGO_MAX_IDLE_TIME_MS"))
+    app.config.setdefault("MONGO_CONNECT_TIMEOUT_MS", int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 10000)))
+    app.config.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)))
+    app.config.setdefault("MONGO_SOCKET_TIMEOUT_MS", _optional_int("MONGO_SOCKET_TIMEOUT_MS"))
+    app.config.setdefault("MONGO_WAIT_QUEUE_TIMEOUT_MS", _optional_int("MONGO_WAIT_QUEUE_TIMEOUT_MS"))
+    app.config.setdefault("MONGO_READ_PREFERENCE", os.environ.get("MONGO_READ_PREFERENCE", "primary"))
+    app.config.setdefault("MONGO_PING_TIMEOUT_MS", int(os.environ.get("MONGO_PING_TIMEOUT_MS", 2000)))
+
+    options = {
+        "maxPoolSize": app.config["MONGO_MAX_POOL_SIZE"],
+        "minPoolSize": app.config["MONGO_MIN_POOL_SIZE"],
+        "maxIdleTimeMS": app.config["MONGO_MAX_IDLE_TIME_MS"],
+        "connectTimeoutMS": app.config["MONGO_CONNECT_TIMEOUT_MS"],
+        "serverSelectionTimeoutMS": app.config["MONGO_SERVER_SELECTION_TIMEOUT_MS"],
+        "socketTimeoutMS": app.config["MONGO_SOCKET_TIMEOUT_MS"],
+        "waitQueueTimeoutMS": app.config["MONGO_WAIT_QUEUE_TIMEOUT_MS"],
+        "readPreference": app.config["MONGO_READ_PREFERENCE"],
+    }
+    app.extensions["mongo"] = Database(
+        app.config["MONGO_URI"],
+        name=app.config["MONGO_DB_NAME"],
+        ping_timeout_ms=app.config["MONGO_PING_TIMEOUT_MS"],
+        **{key: value for key, value in options.items() if value is not None},
+    )
+    return app.extensions["mongo"]
+
+
+def database():
+    return current_app.extensions["mongo"]
+
+
+def get_db():
+    return database().db
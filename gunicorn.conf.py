@@ -0,0 +1,23 @@
+# Configuração do gunicorn:
+#   gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# O app é importado uma vez no master; cada worker cria o próprio MongoClient depois do fork
+preload_app = True
+
+
+# Aquece o pool de conexões e garante os índices antes do worker aceitar requisições
+def post_worker_init(worker):
+    worker.wsgi.extensions["mongo"].warmup()
+
+
+# Remove as métricas do worker encerrado quando o Prometheus roda em modo multiprocesso
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
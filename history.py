@@ -0,0 +1,272 @@
+import base64
+import datetime
+import hashlib
+import json
+import zlib
+from bson.objectid import ObjectId
+from pymongo import DESCENDING
+from werkzeug.http import parse_date, parse_etags
+
+# Campos retornados no histórico e seus valores padrão
+DOCKERFILE_FIELDS = {
+    "base_image": "",
+    "workdir": "",
+    "framework": "",
+    "dependencies": "",
+    "gpu_support": False,
+    "env_vars": "",
+    "ports": "",
+    "startup_script": "",
+    "use_requirements": False,
+    "created_at": "",
+    "content": "",
+    "optimized": False,
+    "multi_stage": False,
+    # sha256 do arquivo gerado na coleção artifacts (ver artifacts.py)
+    "artifact": "",
+    # Template do usuário usado na geração (ver user_templates.py)
+    "template_id": "",
+    "template_version": None,
+}
+
+DOCKERCOMPOSE_FIELDS = {
+    "service_name": "",
+    "base_image": "",
+    "use_dockerfile": False,
+    "workdir": "",
+    "gpu_support": False,
+    "env_vars": "",
+    "ports": "",
+    "startup_script": "",
+    "context": "",
+    "services": [],
+    "networks": "",
+    "volumes": "",
+    "cpu_limit": "",
+    "memory_limit": "",
+    "cpu_reservation": "",
+    "memory_reservation": "",
+    "gpu_count": None,
+    "gpu_device_ids": [],
+    "shm_size": "",
+    "ulimits": {},
+    "ipc": "",
+    "healthcheck": {},
+    "tmpfs": [],
+    "created_at": "",
+    "artifact": "",
+    "template_id": "",
+    "template_version": None,
+}
+
+# Ordenação do histórico: mais recentes primeiro, _id como desempate
+HISTORY_SORT = [("content.created_at", DESCENDING), ("_id", DESCENDING)]
+
+# Contador de alterações por usuário e coleção, usado nos validadores HTTP (ETag/Last-Modified)
+STATE_COLLECTION = "history_state"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def projection(fields):
+    return {f"content.{field}": 1 for field in fields}
+
+
+# O cursor é opaco para o cliente: created_at + _id do último item retornado
+def encode_cursor(created_at, object_id):
+    raw = f"{created_at.isoformat()}|{object_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, object_id = raw.split("|")
+        return datetime.datetime.fromisoformat(created_at), ObjectId(object_id)
+    except Exception as e:
+        raise InvalidCursor("Cursor inválido") from e
+
+
+# Lê limit e cursor da query string; levanta ValueError com a mensagem para o cliente
+def page_args(args, default_limit, max_limit):
+    limit = args.get("limit", default_limit)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError("Parâmetro limit inválido")
+    if limit < 1:
+        raise ValueError("Parâmetro limit inválido")
+
+    cursor = args.get("cursor") or None
+    if cursor:
+        decode_cursor(cursor)
+
+    return min(limit, max_limit), cursor
+
+
+# Junta dono, cursor e filtros de busca (history_search.py); condições que repetem
+# uma chave ($or, content.created_at) vão para um $and
+def page_filter(user_id, cursor=None, conditions=()):
+    clauses = [{"content.user_id": user_id}, *conditions]
+    if cursor:
+        created_at, object_id = decode_cursor(cursor)
+        clauses.append({"$or": [
+            {"content.created_at": {"$lt": created_at}},
+            {"content.created_at": created_at, "_id": {"$lt": object_id}},
+        ]})
+
+    query = {}
+    for clause in clauses:
+        if query.keys() & clause.keys():
+            query.setdefault("$and", []).append(clause)
+        else:
+            query.update(clause)
+    return query
+
+
+def serialize(document, fields):
+    content = document.get("content", {})
+    item = {"_id": str(document["_id"])}
+    for field, default in fields.items():
+        item[field] = content.get(field, default)
+    return item
+
+
+# Busca uma página do histórico usando o índice (user_id, created_at, _id)
+def fetch_page(collection, user_id, fields, limit, cursor=None, conditions=()):
+    documents = list(
+        collection.find(page_filter(user_id, cursor, conditions), projection(fields))
+        .sort(HISTORY_SORT)
+        .limit(limit + 1)
+    )
+    return page_result(documents, fields, limit)
+
+
+# Mesma consulta de fetch_page com uma coleção do AsyncMongoClient (modo ASGI)
+async def fetch_page_async(collection, user_id, fields, limit, cursor=None, conditions=()):
+    documents = await (
+        collection.find(page_filter(user_id, cursor, conditions), projection(fields))
+        .sort(HISTORY_SORT)
+        .limit(limit + 1)
+        .to_list()
+    )
+    return page_result(documents, fields, limit)
+
+
+# Lê limit + 1 documentos: o excedente indica que existe uma próxima página
+def page_result(documents, fields, limit):
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        next_cursor = encode_cursor(last["content"]["created_at"], last["_id"])
+
+    return [serialize(document, fields) for document in documents], next_cursor
+
+
+def state_id(collection_name, user_id):
+    return f"{collection_name}:{user_id}"
+
+
+# Filtro e update que incrementam a versão do histórico (com upsert); servem aos dois drivers
+def version_update(collection_name, user_id, changed_at=None):
+    changed_at = changed_at or datetime.datetime.now(datetime.timezone.utc)
+    return {"_id": state_id(collection_name, user_id)}, {"$inc": {"version": 1}, "$max": {"updated_at": changed_at}}
+
+
+def bump_version(db, collection_name, user_id):
+    db[STATE_COLLECTION].update_one(*version_update(collection_name, user_id), upsert=True)
+
+
+# Depois de um insert_many (write-behind): uma atualização por usuário do lote
+def bump_versions(db, collection_name, documents):
+    user_ids = {document.get("content", {}).get("user_id") for document in documents}
+    for user_id in user_ids - {None, ""}:
+        bump_version(db, collection_name, user_id)
+
+
+def _utc(value):
+    if isinstance(value, datetime.datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+# Consultas indexadas usadas na validação: estado do usuário e documento mais recente
+def _validator_queries(collection_name, user_id):
+    state = ({"_id": state_id(collection_name, user_id)},)
+    latest = ({"content.user_id": user_id}, {"content.created_at": 1})
+    return state, latest
+
+
+# ETag fraca e Last-Modified de uma página; mudam a cada inserção ou remoção do usuário
+def page_validators(collection_name, fields, limit, cursor, state, latest, search=""):
+    version = state.get("version", 0) if state else 0
+    latest_created_at = _utc(latest.get("content", {}).get("created_at")) if latest else None
+    latest_id = latest["_id"] if latest else None
+
+    raw = f"{collection_name}|{version}|{latest_created_at}|{latest_id}|{limit}|{cursor}|{','.join(fields)}|{search}"
+    etag = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    updated_at = _utc(state.get("updated_at")) if state else None
+    last_modified = max((value for value in (latest_created_at, updated_at) if isinstance(value, datetime.datetime)), default=None)
+    return etag, last_modified
+
+
+# If-None-Match tem precedência; If-Modified-Since só vale sem ele (RFC 9110)
+def not_modified(if_none_match, if_modified_since, etag, last_modified):
+    if if_none_match:
+        return parse_etags(if_none_match).contains_weak(etag)
+
+    since = parse_date(if_modified_since) if if_modified_since else None
+    return bool(since and last_modified and last_modified.replace(microsecond=0) <= since)
+
+
+def fetch_validators(db, collection_name, user_id, fields, limit, cursor=None, search=""):
+    state_query, latest_query = _validator_queries(collection_name, user_id)
+    state = db[STATE_COLLECTION].find_one(*state_query)
+    latest = db[collection_name].find_one(*latest_query, sort=HISTORY_SORT)
+    return page_validators(collection_name, fields, limit, cursor, state, latest, search)
+
+
+async def fetch_validators_async(db, collection_name, user_id, fields, limit, cursor=None, search=""):
+    state_query, latest_query = _validator_queries(collection_name, user_id)
+    state = await db[STATE_COLLECTION].find_one(*state_query)
+    latest = await db[collection_name].find_one(*latest_query, sort=HISTORY_SORT)
+    return page_validators(collection_name, fields, limit, cursor, state, latest, search)
+
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value)
+
+
+# Exporta todo o histórico do usuário em NDJSON, lendo o cursor em lotes
+def iter_export(collection, user_id, fields, batch_size=500, chunk_size=64 * 1024):
+    cursor = collection.find({"content.user_id": user_id}, projection(fields)).sort(HISTORY_SORT).batch_size(batch_size)
+    buffer = []
+    buffered = 0
+    try:
+        for document in cursor:
+            line = json.dumps(serialize(document, fields), ensure_ascii=False, default=_json_default) + "\n"
+            buffer.append(line)
+            buffered += len(line)
+            if buffered >= chunk_size:
+                yield "".join(buffer).encode("utf-8")
+                buffer.clear()
+                buffered = 0
+        if buffer:
+            yield "".join(buffer).encode("utf-8")
+    finally:
+        cursor.close()
+
+
+def iter_gzip(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,169 @@
+import datetime
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+
+import artifacts
+import history
+import history_search
+import history_sync
+import usage_stats
+
+# Registros removidos em lote ficam na lixeira até o TTL (bootstrap.py) e podem ser restaurados
+TRASH_COLLECTION = "history_trash"
+
+def _naive_utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Converte a lista de ids; ids inválidos voltam como resultado em vez de derrubar o lote
+def parse_ids(raw_ids, max_items):
+    if not isinstance(raw_ids, list) or not raw_ids:
+        raise ValueError("Informe a lista de ids")
+    if len(raw_ids) > max_items:
+        raise ValueError(f"Máximo de {max_items} ids por requisição")
+
+    object_ids = []
+    invalid = []
+    for raw_id in dict.fromkeys(str(raw_id) for raw_id in raw_ids):
+        try:
+            object_ids.append(ObjectId(raw_id))
+        except InvalidId:
+            invalid.append(raw_id)
+    return object_ids, invalid
+
+
+# Filtro de remoção em lote: {"older_than": "2026-01-01T00:00:00Z", "base_image": "python:3.11"}
+def parse_filter(collection_name, raw_filter):
+    if not isinstance(raw_filter, dict) or not raw_filter:
+        raise ValueError("Informe ids ou um filtro")
+
+    unknown = set(raw_filter) - {"older_than", "base_image"}
+    if unknown:
+        raise ValueError(f"Filtro desconhecido: {', '.join(sorted(unknown))}")
+
+    query = {}
+    if "older_than" in raw_filter:
+        query["content.created_at"] = {"$lt": history_search.parse_datetime(raw_filter["older_than"], "older_than")}
+
+    if "base_image" in raw_filter:
+        base_image = raw_filter["base_image"]
+        if not isinstance(base_image, str) or not base_image:
+            raise ValueError("base_image inválido")
+        query.update(history_search.field_condition(collection_name, "base_image", base_image))
+
+    return query
+
+
+def _move_to_trash(db, collection_name, user_id, documents):
+    deleted_at = datetime.datetime.now(datetime.timezone.utc)
+    try:
+        db[TRASH_COLLECTION].insert_many([
+            {"_id": document["_id"], "collection": collection_name, "user_id": user_id, "deleted_at": deleted_at, "document": document}
+            for document in documents
+        ], ordered=False)
+    except BulkWriteError as e:
+        # Já estar na lixeira (remoção interrompida antes) não é erro
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+
+    ids = [document["_id"] for document in documents]
+    deleted = db[collection_name].delete_many({"_id": {"$in": ids}, "content.user_id": user_id}).deleted_count
+    removed = documents
+    if deleted < len(ids):
+        # Outra remoção levou parte dos registros entre a busca e o delete_many: só conta como
+        # removido o que saiu da coleção
+        remaining = {document["_id"] for document in db[collection_name].find({"_id": {"$in": ids}}, {"_id": 1})}
+        removed = [document for document in documents if document["_id"] not in remaining]
+
+    if removed:
+        history_sync.record_deletions(db, collection_name, user_id, [document["_id"] for document in removed], deleted_at)
+    if len(removed) == deleted:
+        artifacts.release_many(db, [document.get("content", {}).get("artifact") for document in removed])
+        usage_stats.forget_many(db, collection_name, removed)
+    else:
+        # Não dá para saber quais desses a outra remoção já liberou; liberar de novo poderia zerar um
+        # artefato ainda em uso, então as referências ficam (usage-stats rebuild corrige os contadores)
+        print(f"Remoção concorrente em {collection_name}: {len(removed) - deleted} registro(s) removido(s) por outra requisição")
+    return removed, deleted, deleted_at
+
+
+# Remove em lote, por ids ou por filtro, só registros do próprio usuário
+def bulk_delete(db, collection_name, user_id, data, max_items, trash_ttl):
+    if not isinstance(data, dict):
+        raise ValueError("JSON inválido")
+
+    results = []
+    has_more = False
+    if "ids" in data:
+        object_ids, invalid = parse_ids(data["ids"], max_items)
+        results += [{"_id": raw_id, "status": "invalid_id"} for raw_id in invalid]
+        documents = list(db[collection_name].find({"_id": {"$in": object_ids}, "content.user_id": user_id}))
+        found = {document["_id"] for document in documents}
+        results += [{"_id": str(object_id), "status": "not_found"} for object_id in object_ids if object_id not in found]
+    else:
+        query = dict(parse_filter(collection_name, data.get("filter")), **{"content.user_id": user_id})
+        documents = list(db[collection_name].find(query).sort(history.HISTORY_SORT).limit(max_items + 1))
+        has_more = len(documents) > max_items
+        documents = documents[:max_items]
+
+    deleted = 0
+    restore_until = None
+    removed = set()
+    if documents:
+        removed_documents, deleted, deleted_at = _move_to_trash(db, collection_name, user_id, documents)
+        removed = {document["_id"] for document in removed_documents}
+        restore_until = deleted_at + datetime.timedelta(seconds=trash_ttl)
+        history.bump_version(db, collection_name, user_id)
+    results = [
+        {"_id": str(document["_id"]), "status": "deleted" if document["_id"] in removed else "not_found"}
+        for document in documents
+    ] + results
+
+    return {"deleted": deleted, "has_more": has_more, "restore_until": restore_until, "results": results}
+
+
+# Restaura registros da lixeira dentro da janela de trash_ttl segundos
+def bulk_restore(db, collection_name, user_id, data, max_items, trash_ttl):
+    if not isinstance(data, dict):
+        raise ValueError("JSON inválido")
+
+    object_ids, invalid = parse_ids(data.get("ids"), max_items)
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=trash_ttl)
+    entries = list(db[TRASH_COLLECTION].find({
+        "_id": {"$in": object_ids},
+        "collection": collection_name,
+        "user_id": user_id,
+        "deleted_at": {"$gte": _naive_utc(since)},
+    }))
+
+    # changed_at novo: o registro restaurado aparece na sincronização incremental (since=)
+    restored_at = datetime.datetime.now(datetime.timezone.utc)
+    documents = [dict(entry["document"], changed_at=restored_at) for entry in entries]
+    if documents:
+        inserted = documents
+        try:
+            db[collection_name].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # O registro já estar de volta na coleção conta como restaurado
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            duplicated = {error["index"] for error in e.details["writeErrors"]}
+            inserted = [document for index, document in enumerate(documents) if index not in duplicated]
+        # Só os registros que voltaram agora: os que já estavam na coleção continuam contados
+        # nas estatísticas e no refcount dos artefatos
+        usage_stats.record_many(db, collection_name, inserted)
+        artifacts.reacquire_many(db, [document.get("content", {}).get("artifact") for document in inserted])
+        db[TRASH_COLLECTION].delete_many({"_id": {"$in": [entry["_id"] for entry in entries]}})
+        history_sync.clear_deletions(db, collection_name, user_id, [entry["_id"] for entry in entries])
+        history.bump_version(db, collection_name, user_id)
+
+    restored = {entry["_id"] for entry in entries}
+    results = [
+        {"_id": str(object_id), "status": "restored" if object_id in restored else "not_found"}
+        for object_id in object_ids
+    ] + [{"_id": raw_id, "status": "invalid_id"} for raw_id in invalid]
+    return {"restored": len(restored), "results": results}
@@ -0,0 +1,84 @@
+import datetime
+
+# Filtros do histórico na query string (?base_image=...&framework=...&gpu_support=true&
+# created_from=...&created_to=...&q=...), convertidos em condições do Mongo.
+# Cada filtro lista os campos consultados; o docker compose guarda serviços múltiplos em content.services
+SEARCH_FIELDS = {
+    "dockerfile": {
+        "base_image": ["content.base_image"],
+        "framework": ["content.framework"],
+        "gpu_support": ["content.gpu_support"],
+    },
+    "dockercompose": {
+        "base_image": ["content.base_image", "content.services.base_image"],
+        "gpu_support": ["content.gpu_support", "content.services.gpu_support"],
+    },
+}
+
+# Campos do índice de texto (bootstrap.py) consultados pelo parâmetro q
+TEXT_FIELDS = {
+    "dockerfile": ["content.dependencies", "content.startup_script"],
+    "dockercompose": ["content.startup_script", "content.services.startup_script"],
+}
+
+SEARCH_PARAMS = ("base_image", "framework", "gpu_support", "created_from", "created_to", "q")
+
+MAX_VALUE_LENGTH = 200
+
+
+def parse_datetime(value, name):
+    try:
+        moment = datetime.datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Data inválida em {name}")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _boolean(value, name):
+    if value.lower() in ("1", "true"):
+        return True
+    if value.lower() in ("0", "false"):
+        return False
+    raise ValueError(f"Parâmetro {name} inválido")
+
+
+# Condição de igualdade em um dos campos do filtro; com mais de um campo vira um $or
+def field_condition(collection_name, name, value):
+    fields = SEARCH_FIELDS[collection_name].get(name)
+    if fields is None:
+        raise ValueError(f"Filtro {name} não disponível para este histórico")
+    if len(fields) == 1:
+        return {fields[0]: value}
+    return {"$or": [{field: value} for field in fields]}
+
+
+# Lê os filtros da query string; devolve as condições e uma chave canônica para a ETag
+def parse(collection_name, args):
+    values = {name: args.get(name) for name in SEARCH_PARAMS if args.get(name)}
+    for name, value in values.items():
+        if len(value) > MAX_VALUE_LENGTH:
+            raise ValueError(f"Parâmetro {name} muito longo")
+
+    conditions = []
+    for name in ("base_image", "framework"):
+        if name in values:
+            conditions.append(field_condition(collection_name, name, values[name]))
+    if "gpu_support" in values:
+        conditions.append(field_condition(collection_name, "gpu_support", _boolean(values["gpu_support"], "gpu_support")))
+
+    created_at = {}
+    if "created_from" in values:
+        created_at["$gte"] = parse_datetime(values["created_from"], "created_from")
+    if "created_to" in values:
+        created_at["$lt"] = parse_datetime(values["created_to"], "created_to")
+    if created_at:
+        conditions.append({"content.created_at": created_at})
+
+    # Busca no índice de texto; o prefixo content.user_id do índice exige o filtro por dono (sempre presente)
+    if "q" in values:
+        conditions.append({"$text": {"$search": values["q"]}})
+
+    key = "&".join(f"{name}={values[name]}" for name in sorted(values))
+    return conditions, key
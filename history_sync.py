@@ -0,0 +1,120 @@
+import base64
+import datetime
+
+from pymongo import ASCENDING
+
+import history
+import history_search
+
+# Sincronização incremental do histórico (?since=): registros criados ou restaurados depois do
+# cursor vêm de changed_at (índice user_changed_at) e as remoções vêm das lápides desta coleção,
+# que o índice TTL do bootstrap.py descarta depois de HISTORY_TOMBSTONE_TTL
+TOMBSTONE_COLLECTION = "history_tombstones"
+
+# Paginação e busca não se aplicam ao feed de alterações: lápides não guardam o conteúdo removido
+# e o tamanho da resposta é HISTORY_SYNC_MAX
+EXCLUSIVE_PARAMS = ("limit", "cursor", *history_search.SEARCH_PARAMS)
+
+SYNC_SORT = [("changed_at", ASCENDING), ("_id", ASCENDING)]
+TOMBSTONE_SORT = [("deleted_at", ASCENDING), ("_id", ASCENDING)]
+
+
+# Cursor não pode mais ser atendido (lápides expiradas ou alterações demais): o cliente recarrega tudo
+class SyncExpired(Exception):
+    pass
+
+
+def _naive_utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# O cursor de sincronização também é opaco: um instante UTC em milissegundos
+def encode_since(moment):
+    milliseconds = int(_naive_utc(moment).replace(tzinfo=datetime.timezone.utc).timestamp() * 1000)
+    return base64.urlsafe_b64encode(str(milliseconds).encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_since(token):
+    try:
+        milliseconds = int(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("ascii"))
+        return datetime.datetime.fromtimestamp(milliseconds / 1000, datetime.timezone.utc).replace(tzinfo=None)
+    except Exception as e:
+        raise history.InvalidCursor("Parâmetro since inválido") from e
+
+
+# Lê o since da query string, recusando a combinação com filtros ou paginação
+def since_arg(args):
+    combined = [name for name in EXCLUSIVE_PARAMS if name in args]
+    if combined:
+        raise ValueError(f"O parâmetro since não pode ser combinado com {', '.join(combined)}")
+    return decode_since(args.get("since", ""))
+
+
+# Próximo cursor: "agora" recuado de lag segundos, para não perder registros ainda na fila do
+# write-behind ou gravados por outro worker com o relógio um pouco atrasado. A sobreposição
+# é inofensiva: o cliente aplica os itens por _id e remoções repetidas não mudam nada
+def next_since(lag):
+    return encode_since(datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=lag))
+
+
+def tombstones(collection_name, user_id, history_ids, deleted_at=None):
+    deleted_at = deleted_at or datetime.datetime.now(datetime.timezone.utc)
+    return [
+        {"collection": collection_name, "user_id": user_id, "history_id": history_id, "deleted_at": deleted_at}
+        for history_id in history_ids
+    ]
+
+
+def record_deletions(db, collection_name, user_id, history_ids, deleted_at=None):
+    if history_ids:
+        db[TOMBSTONE_COLLECTION].insert_many(tombstones(collection_name, user_id, history_ids, deleted_at))
+
+
+async def record_deletions_async(db, collection_name, user_id, history_ids, deleted_at=None):
+    if history_ids:
+        await db[TOMBSTONE_COLLECTION].insert_many(tombstones(collection_name, user_id, history_ids, deleted_at))
+
+
+# Registro restaurado volta a existir: a lápide antiga sairia na mesma resposta que o registro
+def clear_deletions(db, collection_name, user_id, history_ids):
+    db[TOMBSTONE_COLLECTION].delete_many({"collection": collection_name, "user_id": user_id, "history_id": {"$in": history_ids}})
+
+
+def _change_queries(collection_name, user_id, fields, since, retention):
+    if since < _naive_utc(datetime.datetime.now(datetime.timezone.utc)) - datetime.timedelta(seconds=retention):
+        raise SyncExpired("Cursor de sincronização expirado; recarregue o histórico completo")
+
+    changed = ({"content.user_id": user_id, "changed_at": {"$gt": since}}, history.projection(fields))
+    deleted = ({"collection": collection_name, "user_id": user_id, "deleted_at": {"$gt": since}}, {"history_id": 1})
+    return changed, deleted
+
+
+def change_result(documents, removed, fields, max_items, token):
+    if len(documents) > max_items or len(removed) > max_items:
+        raise SyncExpired("Alterações demais desde o cursor; recarregue o histórico completo")
+
+    return {
+        "message": "Alterações do histórico recuperadas com sucesso",
+        "history": [history.serialize(document, fields) for document in documents],
+        "deleted": list(dict.fromkeys(str(tombstone["history_id"]) for tombstone in removed)),
+        "since": token,
+    }
+
+
+# Alterações desde o cursor, em duas leituras por intervalo (max_items + 1 indica excesso)
+def fetch_changes(db, collection_name, user_id, fields, since, max_items, lag, retention):
+    token = next_since(lag)
+    changed, deleted = _change_queries(collection_name, user_id, fields, since, retention)
+    documents = list(db[collection_name].find(*changed).sort(SYNC_SORT).limit(max_items + 1))
+    removed = list(db[TOMBSTONE_COLLECTION].find(*deleted).sort(TOMBSTONE_SORT).limit(max_items + 1))
+    return change_result(documents, removed, fields, max_items, token)
+
+
+async def fetch_changes_async(db, collection_name, user_id, fields, since, max_items, lag, retention):
+    token = next_since(lag)
+    changed, deleted = _change_queries(collection_name, user_id, fields, since, retention)
+    documents = await db[collection_name].find(*changed).sort(SYNC_SORT).limit(max_items + 1).to_list()
+    removed = await db[TOMBSTONE_COLLECTION].find(*deleted).sort(TOMBSTONE_SORT).limit(max_items + 1).to_list()
+    return change_result(documents, removed, fields, max_items, token)
@@ -0,0 +1,202 @@
+import os
+import queue
+import threading
+import time
+
+from pymongo.errors import BulkWriteError
+
+
+# Gravação assíncrona (write-behind) do histórico: os documentos vão para uma fila
+# limitada e uma thread os grava em lote com insert_many
+# after_insert(db, collection_name, documents, payloads) roda depois de cada lote, só com os documentos
+# gravados (ex.: versão do histórico); payloads traz o que foi passado em submit junto de cada um,
+# sem ir para o banco. Lotes que falham por erro de conexão voltam para a fila até max_attempts
+# tentativas; o que não pode ser gravado conta em dropped
+class HistoryWriter:
+    def __init__(self, get_db, max_queue=10000, batch_size=200, flush_interval=0.5, put_timeout=0.05, after_insert=None, max_attempts=3):
+        self.get_db = get_db
+        self.after_insert = after_insert
+        self.max_attempts = max_attempts
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+        self.enqueued = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+        self.last_flush_seconds = 0.0
+
+    # Cria a fila e a thread no processo atual (seguro após o fork do gunicorn)
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._thread.start()
+
+    # Retorna False quando a fila está cheia: quem chamou deve gravar de forma síncrona
+    def submit(self, collection_name, document, payload=None):
+        if self._stopping.is_set():
+            return False
+
+        self._ensure_started()
+        try:
+            self._queue.put((collection_name, document, payload, 1), timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            # Depois de uma falha de conexão espera um intervalo antes de tentar de novo
+            if batch:
+                if self._flush(batch):
+                    self._stopping.wait(self.flush_interval)
+            elif self._stopping.is_set():
+                return
+
+    # Junta documentos até completar o lote ou estourar o intervalo de flush
+    def _next_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0 or (self._stopping.is_set() and self._queue.empty()):
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    # Documentos gravados apesar do BulkWriteError (ordered=False grava todos os outros).
+    # _id duplicado numa nova tentativa é o próprio documento, gravado antes da falha de conexão
+    @staticmethod
+    def _stored(entries, error):
+        rejected = {}
+        for write_error in error.details.get("writeErrors", []):
+            rejected[write_error["index"]] = write_error
+        stored = []
+        for index, entry in enumerate(entries):
+            write_error = rejected.get(index)
+            if write_error is None or (
+                entry[2] > 1 and write_error.get("code") == 11000 and write_error.get("keyPattern") == {"_id": 1}
+            ):
+                stored.append(entry)
+        return stored
+
+    # Devolve à fila o que ainda tem tentativas; retorna quantos documentos foram descartados
+    def _requeue(self, collection_name, entries):
+        dropped = 0
+        for document, payload, attempts in entries:
+            if attempts >= self.max_attempts:
+                dropped += 1
+                continue
+            try:
+                self._queue.put_nowait((collection_name, document, payload, attempts + 1))
+            except queue.Full:
+                dropped += 1
+        return dropped
+
+    def _flush(self, batch):
+        grouped = {}
+        for collection_name, document, payload, attempts in batch:
+            grouped.setdefault(collection_name, []).append((document, payload, attempts))
+
+        start = time.perf_counter()
+        written = 0
+        failed = 0
+        retried = 0
+        dropped = 0
+        db = self.get_db()
+        for collection_name, entries in grouped.items():
+            documents = [entry[0] for entry in entries]
+            try:
+                db[collection_name].insert_many(documents, ordered=False)
+                stored = entries
+            except BulkWriteError as e:
+                # Erros por documento (validação, chave duplicada) não mudam numa nova tentativa
+                stored = self._stored(entries, e)
+                failed += len(documents) - len(stored)
+                dropped += len(documents) - len(stored)
+                print(f"Erro ao gravar histórico em lote ({collection_name}): {len(documents) - len(stored)} documento(s) descartado(s)")
+            except Exception as e:
+                # Falha de conexão ou tempo esgotado: nada é contado como gravado e o lote volta para a fila
+                stored = []
+                failed += len(documents)
+                lost = self._requeue(collection_name, entries)
+                retried += len(documents) - lost
+                dropped += lost
+                print(f"Erro ao gravar histórico em lote ({collection_name}): {e}")
+            written += len(stored)
+
+            if stored and self.after_insert is not None:
+                try:
+                    self.after_insert(db, collection_name, [entry[0] for entry in stored], [entry[1] for entry in stored])
+                except Exception as e:
+                    print(f"Erro ao atualizar versão e estatísticas do histórico ({collection_name}): {e}")
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.written += written
+            self.failed += failed
+            self.retried += retried
+            self.dropped += dropped
+            self.flushes += 1
+            self.last_flush_seconds = elapsed
+            self.flush_seconds_total += elapsed
+            self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+        return retried
+
+    # Esvazia a fila e encerra a thread (chamado no desligamento do worker)
+    def close(self, timeout=10):
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+
+    def queue_depth(self):
+        if self._queue is None or self._pid != os.getpid():
+            return 0
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth(),
+                "max_queue": self.max_queue,
+                "enqueued": self.enqueued,
+                "rejected": self.rejected,
+                "written": self.written,
+                "failed": self.failed,
+                "retried": self.retried,
+                "dropped": self.dropped,
+                "flushes": self.flushes,
+                "last_flush_ms": round(self.last_flush_seconds * 1000, 3),
+                "avg_flush_ms": round(self.flush_seconds_total / self.flushes * 1000, 3) if self.flushes else 0.0,
+                "max_flush_ms": round(self.flush_seconds_max * 1000, 3),
+            }
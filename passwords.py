@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+# O pool de hash está cheio ou demorou demais: a rota responde 503 com Retry-After
+class HasherUnavailable(Exception):
+    pass
+
+
+# Funções executadas nos processos do pool
+def _generate(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _check(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+
+def _method_prefix(pwhash):
+    return pwhash.split("$", 1)[0]
+
+
+# Formato do werkzeug: método$salt$hash
+def _salt_length(pwhash):
+    parts = pwhash.split("$")
+    return len(parts[1]) if len(parts) == 3 else None
+
+
+# Hash de senha em um pool de processos limitado, para não travar os workers HTTP
+class PasswordHasher:
+    def __init__(self, method="scrypt", salt_length=16, workers=2, max_pending=16, timeout=5.0):
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pool = None
+        self._slots = None
+        self._method_prefix = None
+
+    # Um pool por processo: o gunicorn faz fork depois de importar o app
+    def _ensure_pool(self):
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+            self._pid = os.getpid()
+
+    # Processo do pool morreu (OOM, sinal): o executor fica inutilizável e é recriado no próximo uso
+    def _discard_pool(self, pool):
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self._pid = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, func, *args):
+        # workers=0 executa no próprio processo (desenvolvimento e benchmarks)
+        if self.workers <= 0:
+            return func(*args)
+
+        self._ensure_pool()
+        pool = self._pool
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HasherUnavailable("Fila de hash de senha cheia")
+
+        try:
+            future = pool.submit(func, *args)
+        except BrokenProcessPool:
+            slots.release()
+            self._discard_pool(pool)
+            raise HasherUnavailable("Pool de hash de senha reiniciado")
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise HasherUnavailable("Tempo esgotado no hash de senha")
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            raise HasherUnavailable("Pool de hash de senha reiniciado")
+
+    def hash(self, password):
+        return self._run(_generate, password, self.method, self.salt_length)
+
+    def check(self, pwhash, password):
+        return self._run(_check, pwhash, password)
+
+    # Hashes gerados com parâmetros diferentes dos configurados são refeitos no login
+    def needs_rehash(self, pwhash):
+        if self._method_prefix is None:
+            self._method_prefix = _method_prefix(_generate("", self.method, 1))
+        return _method_prefix(pwhash) != self._method_prefix or _salt_length(pwhash) != self.salt_length
+
+    def shutdown(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,224 @@
+import collections
+import cProfile
+import itertools
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+
+from flask import current_app, g, request
+from pymongo import monitoring
+
+import auth
+
+# Profiling sob demanda: a requisição com o cabeçalho X-Profile-Token (igual a PROFILE_TOKEN)
+# ou sorteada por PROFILE_SAMPLE_RATE roda dentro de um cProfile, com a linha do tempo dos
+# comandos enviados ao MongoDB. O resultado fica num buffer circular do worker (PROFILE_BUFFER_SIZE)
+# e sai em /profiles. Sem token nem amostragem configurados nenhum hook é registrado.
+# Respostas em streaming (exportação, zip) só têm a view medida, não a geração do corpo
+HEADER = "X-Profile-Token"
+
+
+def authorized():
+    return auth.token_matches(request.headers.get(HEADER), current_app.config["PROFILE_TOKEN"])
+
+
+# Linha do tempo dos comandos do pymongo da requisição em profiling; os eventos de comando
+# são publicados na thread que executa a operação
+class MongoTimeline(monitoring.CommandListener):
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def _current(self):
+        active = self.profiler.active
+        return active if active is not None and active.thread == threading.get_ident() else None
+
+    def started(self, event):
+        current = self._current()
+        if current is None:
+            return
+        collection = event.command.get(event.command_name)
+        current.pending[(event.request_id, event.connection_id)] = {
+            "command": event.command_name,
+            "collection": collection if isinstance(collection, str) else "",
+            "offset_ms": round((time.perf_counter() - current.start) * 1000, 3),
+        }
+
+    def _finish(self, event, outcome):
+        current = self._current()
+        if current is None:
+            return
+        entry = current.pending.pop((event.request_id, event.connection_id), None)
+        if entry is not None:
+            entry["duration_ms"] = round(event.duration_micros / 1000, 3)
+            entry["outcome"] = outcome
+            current.mongo.append(entry)
+
+    def succeeded(self, event):
+        self._finish(event, "success")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+class ActiveProfile:
+    def __init__(self, trigger):
+        self.trigger = trigger
+        self.thread = threading.get_ident()
+        self.profile = cProfile.Profile()
+        self.pending = {}
+        self.mongo = []
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+
+
+class Profiler:
+    def __init__(self, sample_rate=0.0, buffer_size=50, top=30):
+        self.sample_rate = sample_rate
+        self.top = top
+        self.active = None
+        self.timeline = MongoTimeline(self)
+        self._profiles = collections.deque(maxlen=buffer_size)
+        self._ids = itertools.count(1)
+        # Um profiling por vez em cada worker: o cProfile não mede duas threads juntas
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        self.skipped = 0
+
+    def start(self, trigger):
+        if not self._busy.acquire(blocking=False):
+            with self._lock:
+                self.skipped += 1
+            return None
+        self.active = ActiveProfile(trigger)
+        self.active.profile.enable()
+        return self.active
+
+    def _release(self, current):
+        current.profile.disable()
+        if self.active is current:
+            self.active = None
+            self._busy.release()
+
+    def finish(self, current, status):
+        self._release(current)
+        duration = time.perf_counter() - current.start
+        stats = pstats.Stats(current.profile)
+        record = {
+            "id": f"{os.getpid()}-{next(self._ids)}",
+            "method": request.method,
+            "path": request.path,
+            "route": request.url_rule.rule if request.url_rule is not None else None,
+            "status": status,
+            "trigger": current.trigger,
+            "started_at": current.started_at,
+            "duration_ms": round(duration * 1000, 3),
+            "mongo_ms": round(sum(entry["duration_ms"] for entry in current.mongo), 3),
+            "mongo": current.mongo,
+            "functions": _top_functions(stats, self.top),
+            "pstats": marshal.dumps(stats.stats),
+        }
+        with self._lock:
+            self._profiles.append(record)
+        return record["id"]
+
+    # Requisição interrompida antes do after_request: descarta o profiling
+    def abort(self, current):
+        self._release(current)
+
+    def list(self):
+        with self._lock:
+            profiles = list(self._profiles)
+        return [summary(record) for record in reversed(profiles)]
+
+    def get(self, profile_id):
+        with self._lock:
+            return next((record for record in self._profiles if record["id"] == profile_id), None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "profiles": len(self._profiles),
+                "max_profiles": self._profiles.maxlen,
+                "skipped": self.skipped,
+                "sample_rate": self.sample_rate,
+            }
+
+
+# Funções ordenadas pelo tempo acumulado, como pstats.Stats.sort_stats("cumulative")
+def _top_functions(stats, limit):
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": function,
+            "file": filename,
+            "line": line,
+            "calls": calls,
+            "primitive_calls": primitive_calls,
+            "total_ms": round(total * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, line, function), (primitive_calls, calls, total, cumulative, _) in entries
+    ]
+
+
+def summary(record):
+    return {key: value for key, value in record.items() if key not in ("mongo", "functions", "pstats")}
+
+
+def detail(record):
+    return {key: value for key, value in record.items() if key != "pstats"}
+
+
+def profiler():
+    return current_app.extensions.get("profiler")
+
+
+def init_app(app):
+    app.config.setdefault("PROFILE_TOKEN", "")
+    app.config.setdefault("PROFILE_SAMPLE_RATE", 0.0)
+    app.config.setdefault("PROFILE_BUFFER_SIZE", 50)
+    app.config.setdefault("PROFILE_TOP", 30)
+
+    if not app.config["PROFILE_TOKEN"] and app.config["PROFILE_SAMPLE_RATE"] <= 0:
+        return None
+
+    instance = Profiler(
+        sample_rate=app.config["PROFILE_SAMPLE_RATE"],
+        buffer_size=app.config["PROFILE_BUFFER_SIZE"],
+        top=app.config["PROFILE_TOP"],
+    )
+    app.extensions["profiler"] = instance
+    app.extensions["mongo"].event_listeners.append(instance.timeline)
+
+    @app.before_request
+    def start_profile():
+        # As rotas do próprio profiling não entram no buffer
+        if request.endpoint and request.endpoint.startswith("api.profile"):
+            return
+        if authorized():
+            trigger = "header"
+        elif instance.sample_rate > 0 and random.random() < instance.sample_rate:
+            trigger = "sample"
+        else:
+            return
+        g.profile = instance.start(trigger)
+
+    @app.after_request
+    def finish_profile(response):
+        current = g.pop("profile", None)
+        if current is not None:
+            profile_id = instance.finish(current, response.status_code)
+            if current.trigger == "header":
+                response.headers["X-Profile-Id"] = profile_id
+        return response
+
+    @app.teardown_request
+    def abort_profile(exception=None):
+        current = g.pop("profile", None)
+        if current is not None:
+            instance.abort(current)
+
+    return instance
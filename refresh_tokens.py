@@ -0,0 +1,82 @@
+import datetime
+import hashlib
+import secrets
+
+from pymongo import ReturnDocument
+
+# Refresh tokens opacos: só o sha256 fica no banco, com expires_at (índice TTL no bootstrap.py).
+# Cada login abre uma família (sessão); /refresh troca o token por um novo da mesma família
+# e marca o antigo como usado. Reapresentar um token já trocado, fora da pequena janela de
+# requisições simultâneas, indica vazamento: a família inteira é revogada
+COLLECTION = "refresh_tokens"
+
+
+class InvalidRefreshToken(Exception):
+    pass
+
+
+def token_hash(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _naive(moment):
+    return moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def issue(db, user_id, ttl, family=None):
+    token = secrets.token_urlsafe(32)
+    now = _now()
+    db[COLLECTION].insert_one({
+        "_id": token_hash(token),
+        "user_id": user_id,
+        "family": family or secrets.token_hex(16),
+        "created_at": now,
+        "expires_at": now + datetime.timedelta(seconds=ttl),
+        "rotated_at": None,
+    })
+    return token
+
+
+# Troca o refresh token por um novo; retorna (user_id, novo token)
+def rotate(db, token, ttl, reuse_grace):
+    if not isinstance(token, str) or not token:
+        raise InvalidRefreshToken("Refresh token ausente")
+
+    now = _now()
+    current = db[COLLECTION].find_one_and_update(
+        {"_id": token_hash(token), "rotated_at": None},
+        {"$set": {"rotated_at": now}},
+        return_document=ReturnDocument.BEFORE,
+    )
+
+    if current is None:
+        used = db[COLLECTION].find_one({"_id": token_hash(token)})
+        if used is not None and _naive(now) - used["rotated_at"] > datetime.timedelta(seconds=reuse_grace):
+            revoke_family(db, used["family"])
+        raise InvalidRefreshToken("Refresh token inválido")
+
+    # O índice TTL remove os expirados com atraso; a validade é conferida aqui
+    if current["expires_at"] <= _naive(now):
+        raise InvalidRefreshToken("Refresh token expirado")
+
+    return current["user_id"], issue(db, current["user_id"], ttl, current["family"])
+
+
+def revoke_family(db, family):
+    return db[COLLECTION].delete_many({"family": family}).deleted_count
+
+
+# Encerra a sessão do token (a família inteira); token desconhecido não é erro
+def revoke(db, token):
+    if not isinstance(token, str) or not token:
+        return 0
+    current = db[COLLECTION].find_one({"_id": token_hash(token)}, {"family": 1})
+    return revoke_family(db, current["family"]) if current else 0
+
+
+def revoke_all(db, user_id):
+    return db[COLLECTION].delete_many({"user_id": user_id}).deleted_count
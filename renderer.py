@@ -0,0 +1,538 @@
+import json
+import re
+import zipfile
+
+import compose_emitter
+import compose_tuning
+from render_cache import spec_key
+
+# Versão do formato gerado: faz parte da chave do cache e do ETag
+RENDERER_VERSION = 4
+
+CUDA_IMAGE = "nvidia/cuda:11.8-cudnn8-devel-ubuntu20.04"
+
+# Limite de serviços em um único docker-compose
+MAX_COMPOSE_SERVICES = 50
+
+# Imagens que já possuem Python instalado
+PYTHON_READY_IMAGES = frozenset(["python:latest", CUDA_IMAGE])
+
+# Mapeamento dos campos da especificação para as chaves do JSON recebido
+DOCKERFILE_FORM_FIELDS = {
+    "base_image": "baseImage",
+    "workdir": "workdir",
+    "framework": "framework",
+    "dependencies": "dependencies",
+    "gpu_support": "gpuSupport",
+    "env_vars": "envVars",
+    "ports": "ports",
+    "startup_script": "startupScript",
+    "use_requirements": "useRequirements",
+    "optimized": "optimized",
+    "multi_stage": "multiStage",
+}
+DOCKERFILE_HISTORY_FIELDS = {field: field for field in DOCKERFILE_FORM_FIELDS}
+
+DOCKERCOMPOSE_FORM_FIELDS = {
+    "service_name": "service",
+    "base_image": "baseImage",
+    "use_dockerfile": "useDockerfile",
+    "workdir": "workdir",
+    "gpu_support": "gpuSupport",
+    "env_vars": "envVars",
+    "ports": "ports",
+    "startup_script": "startupScript",
+    "context": "context",
+    "depends_on": "dependsOn",
+    "networks": "networks",
+    "volumes": "volumes",
+    **compose_tuning.FORM_FIELDS,
+}
+DOCKERCOMPOSE_HISTORY_FIELDS = {field: field for field in DOCKERCOMPOSE_FORM_FIELDS}
+
+# Campos de texto que são normalizados (strip, vazio vira None)
+_DOCKERFILE_TEXT_FIELDS = ("framework", "dependencies", "env_vars", "ports", "startup_script")
+_DOCKERCOMPOSE_TEXT_FIELDS = ("base_image", "workdir", "env_vars", "ports", "startup_script", "context")
+_DOCKERCOMPOSE_LIST_FIELDS = ("depends_on", "networks", "volumes")
+
+# Blocos fixos do Dockerfile, montados uma única vez
+_DOCKERFILE_HEADER = "# Dockerfile Gerado\n\n# Imagem base\nFROM {}\n\n"
+_DOCKERFILE_APT = (
+    "# Atualizar o APT\n"
+    "RUN apt-get update && \\\n"
+    "    apt-get install -y python3 python3-pip && \\\n"
+    "    apt-get clean && rm -rf /var/lib/apt/lists/*\n\n"
+)
+_DOCKERFILE_WORKDIR = "# Setando o ambiente de trabalho\nWORKDIR {}\n\n"
+_DOCKERFILE_DEPENDENCIES = "# Instalar dependências adicionais\nRUN python3 -m pip install {}\n\n"
+_DOCKERFILE_REQUIREMENTS = (
+    "# Copiando o requirements.txt\nCOPY requirements.txt {0}/requirements.txt\n\n"
+    "# Instalando dependências do requirements.txt\nRUN python3 -m pip install --no-cache-dir -r {0}/requirements.txt\n\n"
+)
+_DOCKERFILE_FRAMEWORK = "# Instalar framework de IA\nRUN python3 -m pip install {}\n\n"
+_DOCKERFILE_COPY = "# Copia os arquivos do diretório\nCOPY . .\n\n"
+_DOCKERFILE_CUDA = (
+    "# Instalando o CUDA\n"
+    "RUN wget https://developer.download.nvidia.com/compute/cuda/repos/ubuntu2004/x86_64/cuda-keyring_1.0-1_all.deb && \\\n"
+    "    dpkg -i cuda-keyring_1.0-1_all.deb && apt-get update && \\\n"
+    "    apt-get install -y cuda && \\\n"
+    "    apt-get clean && rm -rf /var/lib/apt/lists/*\n\n"
+)
+_DOCKERFILE_CMD = '# Comando para iniciar a aplicação \n["{}"]'
+
+# Modo otimizado: camadas que mudam pouco primeiro, instalações em um único RUN com cache do
+# BuildKit (--mount=type=cache), dependências em um venv e o código copiado por último
+_OPTIMIZED_HEADER = "# syntax=docker/dockerfile:1\n# Dockerfile Gerado (otimizado para o cache de build)\n\n"
+_OPTIMIZED_FROM = "# Imagem {}\nFROM {} AS {}\n\n"
+_OPTIMIZED_APT = (
+    "# Pacotes do sistema, com o cache do APT preservado entre builds\n"
+    "RUN --mount=type=cache,target=/var/cache/apt,sharing=locked \\\n"
+    "    --mount=type=cache,target=/var/lib/apt,sharing=locked \\\n"
+    "    rm -f /etc/apt/apt.conf.d/docker-clean && \\\n"
+    "    apt-get update && \\\n"
+    "    apt-get install -y --no-install-recommends {}\n\n"
+)
+# Só as bibliotecas do CUDA: o driver vem do host (NVIDIA Container Toolkit).
+# Mesmo repositório (ubuntu2004) do modo padrão
+_OPTIMIZED_CUDA = (
+    "# Bibliotecas do CUDA (GPU habilitada)\n"
+    "ADD https://developer.download.nvidia.com/compute/cuda/repos/ubuntu2004/x86_64/cuda-keyring_1.0-1_all.deb /tmp/cuda-keyring.deb\n"
+    "RUN --mount=type=cache,target=/var/cache/apt,sharing=locked \\\n"
+    "    --mount=type=cache,target=/var/lib/apt,sharing=locked \\\n"
+    "    rm -f /etc/apt/apt.conf.d/docker-clean && \\\n"
+    "    dpkg -i /tmp/cuda-keyring.deb && rm /tmp/cuda-keyring.deb && \\\n"
+    "    apt-get update && \\\n"
+    "    apt-get install -y --no-install-recommends cuda-libraries-11-8\n\n"
+)
+_OPTIMIZED_VENV = '# Ambiente virtual com as dependências Python\nRUN python3 -m venv /opt/venv\nENV PATH="/opt/venv/bin:$PATH"\n\n'
+_OPTIMIZED_REQUIREMENTS = "# requirements.txt antes do código: editar o código não invalida a instalação\nCOPY requirements.txt ./\n"
+_OPTIMIZED_PIP = (
+    "# Dependências, requirements.txt e framework em uma única camada, com o cache do pip\n"
+    "RUN --mount=type=cache,target=/root/.cache/pip \\\n"
+    "    python3 -m pip install {}\n\n"
+)
+_OPTIMIZED_RUNTIME_VENV = '# Somente o venv pronto vem do estágio de build\nCOPY --from=build /opt/venv /opt/venv\nENV PATH="/opt/venv/bin:$PATH"\n\n'
+_OPTIMIZED_CMD = "# Comando para iniciar a aplicação\nCMD {}\n"
+_OPTIMIZED_WORKDIR = "/app"
+
+# Contexto de build enxuto para o Dockerfile otimizado: nada de VCS, ambientes locais ou caches
+_DOCKERIGNORE = (
+    "# .dockerignore Gerado\n"
+    "\n"
+    "# Controle de versão\n"
+    ".git\n"
+    ".gitignore\n"
+    "\n"
+    "# Ambientes virtuais e caches do Python\n"
+    ".venv\n"
+    "venv\n"
+    "env\n"
+    "__pycache__\n"
+    "**/__pycache__\n"
+    "*.py[cod]\n"
+    ".pytest_cache\n"
+    ".mypy_cache\n"
+    ".ipynb_checkpoints\n"
+    "*.egg-info\n"
+    "build\n"
+    "dist\n"
+    "\n"
+    "# Segredos e configurações locais\n"
+    ".env\n"
+    ".env.*\n"
+    "\n"
+    "# Editores e sistema\n"
+    ".idea\n"
+    ".vscode\n"
+    ".DS_Store\n"
+    "\n"
+    "# Arquivos do próprio Docker\n"
+    "Dockerfile*\n"
+    "docker-compose*.yml\n"
+    ".dockerignore\n"
+)
+
+_ZIP_NAME_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+# Especificação inválida enviada pelo cliente
+class SpecError(ValueError):
+    pass
+
+
+def _text(value):
+    if value is None:
+        return None
+    return str(value).strip() or None
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+# Listas podem vir como array JSON ou texto separado por vírgulas; ficam salvas como texto
+def _list_text(value):
+    if isinstance(value, list):
+        value = ", ".join(str(item).strip() for item in value if str(item).strip())
+    return _text(value)
+
+
+def _compact(data):
+    return {key: value for key, value in data.items() if value not in [None, '', [], {}]}
+
+
+# Normaliza o JSON recebido em uma especificação de Dockerfile
+def dockerfile_spec(form, fields=DOCKERFILE_FORM_FIELDS):
+    spec = {
+        "base_image": form.get(fields["base_image"]),
+        "workdir": form.get(fields["workdir"]),
+        "gpu_support": form.get(fields["gpu_support"], False),
+        "use_requirements": form.get(fields["use_requirements"], False),
+    }
+    for field in _DOCKERFILE_TEXT_FIELDS:
+        spec[field] = _text(form.get(fields[field]))
+    spec["optimized"] = bool(form.get(fields["optimized"], False))
+    spec["multi_stage"] = spec["optimized"] and bool(form.get(fields["multi_stage"], False))
+    return spec
+
+
+def _dockercompose_service_spec(form, fields):
+    spec = {
+        "service_name": form.get(fields["service_name"]),
+        "use_dockerfile": form.get(fields["use_dockerfile"], False),
+        "gpu_support": form.get(fields["gpu_support"], False),
+    }
+    for field in _DOCKERCOMPOSE_TEXT_FIELDS:
+        spec[field] = _text(form.get(fields[field]))
+    for field in _DOCKERCOMPOSE_LIST_FIELDS:
+        spec[field] = _list_text(form.get(fields[field]))
+
+    try:
+        spec.update(compose_tuning.normalize(form, fields))
+    except ValueError as e:
+        raise SpecError(f"Serviço {spec['service_name']}: {e}" if spec["service_name"] else str(e))
+    # Reservar GPUs já é pedir GPU
+    if compose_tuning.wants_gpu(spec):
+        spec["gpu_support"] = True
+    return spec
+
+
+# Confere nomes repetidos e dependências entre os serviços
+def _validate_dockercompose(services):
+    names = [service["service_name"] for service in services]
+    if len(services) > 1 and not all(isinstance(name, str) and name.strip() for name in names):
+        raise SpecError("Todos os serviços precisam de um nome")
+    if len(set(names)) != len(names):
+        raise SpecError("Existem serviços com o mesmo nome")
+
+    dependencies = {}
+    for service in services:
+        depends_on = _split_list(service["depends_on"]) if service["depends_on"] else []
+        for dependency in depends_on:
+            if dependency == service["service_name"]:
+                raise SpecError(f"O serviço {dependency} depende dele mesmo")
+            if dependency not in names:
+                raise SpecError(f"O serviço {service['service_name']} depende de {dependency}, que não existe")
+        dependencies[service["service_name"]] = depends_on
+
+        # ipc: service:<nome> compartilha a memória de outro serviço da mesma stack
+        mode, _, target = (service.get("ipc") or "").partition(":")
+        if mode == "service" and (target == service["service_name"] or target not in names):
+            raise SpecError(f"O serviço {service['service_name']} usa ipc de {target}, que não existe na stack")
+
+    # Busca em profundidade para encontrar dependências circulares
+    state = {}
+
+    def visit(name):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise SpecError(f"Dependência circular envolvendo o serviço {name}")
+        state[name] = "visiting"
+        for dependency in dependencies[name]:
+            visit(dependency)
+        state[name] = "done"
+
+    for name in names:
+        visit(name)
+
+
+# Normaliza o JSON recebido em uma especificação de docker-compose com um ou mais serviços
+def dockercompose_spec(form, fields=DOCKERCOMPOSE_FORM_FIELDS):
+    services = form.get("services")
+
+    if isinstance(services, list) and services:
+        if len(services) > MAX_COMPOSE_SERVICES:
+            raise SpecError(f"Máximo de {MAX_COMPOSE_SERVICES} serviços por docker-compose")
+        if not all(isinstance(service, dict) for service in services):
+            raise SpecError("Serviço inválido na lista de serviços")
+
+        spec = {
+            "services": [_dockercompose_service_spec(service, fields) for service in services],
+            "networks": _list_text(form.get("networks")),
+            "volumes": _list_text(form.get("volumes")),
+        }
+    else:
+        # Formato antigo: um único serviço com os campos na raiz do JSON
+        spec = {"services": [_dockercompose_service_spec(form, fields)], "networks": None, "volumes": None}
+
+    _validate_dockercompose(spec["services"])
+    return spec
+
+
+# Dados salvos no histórico: um serviço simples continua no formato antigo (campos na raiz)
+def dockercompose_record(spec):
+    services = [_compact(service) for service in spec["services"]]
+    if (
+        len(services) == 1
+        and not spec["networks"]
+        and not spec["volumes"]
+        and not any(field in services[0] for field in _DOCKERCOMPOSE_LIST_FIELDS)
+    ):
+        return services[0]
+
+    return _compact({"services": services, "networks": spec["networks"], "volumes": spec["volumes"]})
+
+
+def render_dockerfile(spec):
+    if spec.get("optimized"):
+        return render_dockerfile_optimized(spec)
+
+    base_image = spec["base_image"]
+    workdir = spec["workdir"]
+    parts = [_DOCKERFILE_HEADER.format(base_image)]
+
+    # Instalar o APT e Python, se necessário
+    if base_image not in PYTHON_READY_IMAGES:
+        parts.append(_DOCKERFILE_APT)
+
+    if workdir:
+        parts.append(_DOCKERFILE_WORKDIR.format(workdir))
+
+    if spec["dependencies"]:
+        parts.append(_DOCKERFILE_DEPENDENCIES.format(spec["dependencies"]))
+
+    if spec["use_requirements"]:
+        parts.append(_DOCKERFILE_REQUIREMENTS.format(workdir))
+
+    if spec["framework"]:
+        parts.append(_DOCKERFILE_FRAMEWORK.format(spec["framework"]))
+
+    parts.append(_DOCKERFILE_COPY)
+
+    # Instalar CUDA, se GPU estiver habilitado
+    if spec["gpu_support"] != CUDA_IMAGE:
+        parts.append(_DOCKERFILE_CUDA)
+
+    if spec["env_vars"]:
+        parts.append("# Variáveis de Ambiente\n")
+        parts.append("\n".join("ENV " + env for env in _split_list(spec["env_vars"])))
+        parts.append("\n\n")
+
+    if spec["ports"]:
+        parts.append("# Expor portas\n")
+        parts.append("\n".join("EXPOSE " + port for port in _split_list(spec["ports"])))
+        parts.append("\n\n")
+
+    if spec["startup_script"]:
+        parts.append("CMD " + _DOCKERFILE_CMD.format('", "'.join(spec["startup_script"].split())) + "\n")
+
+    return "".join(parts)
+
+
+def _gpu_requested(value):
+    return value is True or str(value).lower() in ("true", "1")
+
+
+# Imagem do estágio final no modo multi-stage: variante slim do python e runtime do CUDA
+def runtime_image(base_image):
+    name, _, tag = (base_image or "").partition(":")
+    if name == "python" and "slim" not in tag and "alpine" not in tag:
+        return "python:slim" if tag in ("", "latest") else f"python:{tag}-slim"
+    if name == "nvidia/cuda" and "-devel" in tag:
+        return f"{name}:{tag.replace('-devel', '-runtime')}"
+    return base_image
+
+
+# No modo otimizado só as imagens python pulam o apt: a imagem do CUDA não traz python3 nem o venv
+# (o modo padrão continua tratando-a como pronta para não mudar a saída dele)
+def _optimized_stage_setup(image, packages, gpu):
+    parts = []
+    if (image or "").partition(":")[0] != "python":
+        parts.append(_OPTIMIZED_APT.format(packages))
+    # CUDA só quando pedido e quando a imagem ainda não o traz
+    if gpu and not (image or "").startswith("nvidia/cuda"):
+        parts.append(_OPTIMIZED_CUDA)
+    return parts
+
+
+def render_dockerfile_optimized(spec):
+    base_image = spec["base_image"]
+    workdir = spec["workdir"] or _OPTIMIZED_WORKDIR
+    multi_stage = spec["multi_stage"]
+    gpu = _gpu_requested(spec["gpu_support"])
+
+    parts = [_OPTIMIZED_HEADER]
+    parts.append(_OPTIMIZED_FROM.format("base (dependências)" if multi_stage else "base", base_image, "build" if multi_stage else "app"))
+    # No build de vários estágios o CUDA só vai para o estágio final
+    parts.extend(_optimized_stage_setup(base_image, "python3 python3-venv", gpu and not multi_stage))
+    parts.append(_DOCKERFILE_WORKDIR.format(workdir))
+    parts.append(_OPTIMIZED_VENV)
+
+    packages = []
+    if spec["use_requirements"]:
+        parts.append(_OPTIMIZED_REQUIREMENTS)
+        packages.append("-r requirements.txt")
+    packages.extend(filter(None, (spec["dependencies"], spec["framework"])))
+    if packages:
+        parts.append(_OPTIMIZED_PIP.format(" ".join(packages)))
+
+    if multi_stage:
+        runtime = runtime_image(base_image)
+        parts.append(_OPTIMIZED_FROM.format("final, só com o necessário para executar", runtime, "runtime"))
+        parts.extend(_optimized_stage_setup(runtime, "python3", gpu))
+        parts.append(_DOCKERFILE_WORKDIR.format(workdir))
+        parts.append(_OPTIMIZED_RUNTIME_VENV)
+
+    if spec["env_vars"]:
+        parts.append("# Variáveis de Ambiente\n")
+        parts.append("\n".join("ENV " + env for env in _split_list(spec["env_vars"])))
+        parts.append("\n\n")
+
+    if spec["ports"]:
+        parts.append("# Expor portas\n")
+        parts.append("\n".join("EXPOSE " + port for port in _split_list(spec["ports"])))
+        parts.append("\n\n")
+
+    # O código muda a cada build: fica por último para não invalidar as camadas acima
+    parts.append(_DOCKERFILE_COPY)
+
+    if spec["startup_script"]:
+        parts.append(_OPTIMIZED_CMD.format(json.dumps(spec["startup_script"].split(), ensure_ascii=False)))
+
+    return "".join(parts)
+
+
+def render_dockerignore(spec):
+    return _DOCKERIGNORE
+
+
+# Volumes nomeados precisam ser declarados na raiz; caminhos do host não
+def _named_volume(volume):
+    source = volume.split(":", 1)[0]
+    if ":" not in volume or not source or source[0] in "/.~$":
+        return None
+    return source
+
+
+def _build_dockercompose_service(spec):
+    use_dockerfile = spec["use_dockerfile"]
+    service = {}
+
+    # Adiciona as configurações apenas se houverem valores válidos
+    if spec["base_image"] and not use_dockerfile:
+        service["image"] = spec["base_image"]
+    if spec["workdir"] and not use_dockerfile:
+        service["working_dir"] = spec["workdir"]
+    if spec["ports"]:
+        service["ports"] = _split_list(spec["ports"])
+    if spec["env_vars"]:
+        service["environment"] = {
+            env.split('=')[0].strip(): env.split('=')[1].strip()
+            for env in spec["env_vars"].split(',') if '=' in env
+        }
+    if spec["startup_script"]:
+        service["command"] = spec["startup_script"].split()
+
+    if use_dockerfile:
+        service["build"] = {"context": spec["context"] or "", "dockerfile": "Dockerfile"}
+
+    if spec["depends_on"]:
+        service["depends_on"] = _split_list(spec["depends_on"])
+    if spec["networks"]:
+        service["networks"] = _split_list(spec["networks"])
+    if spec["volumes"]:
+        service["volumes"] = _split_list(spec["volumes"])
+
+    # Recursos, GPUs (deploy.resources.reservations.devices), shm_size, ulimits, ipc, healthcheck e tmpfs
+    return compose_tuning.apply(service, spec)
+
+
+# Monta o dicionário do docker-compose.yml com todos os serviços
+def build_dockercompose(spec):
+    document = {"version": "3.8", "services": {}}
+    networks = _split_list(spec["networks"]) if spec["networks"] else []
+    volumes = _split_list(spec["volumes"]) if spec["volumes"] else []
+
+    for service_spec in spec["services"]:
+        service = _build_dockercompose_service(service_spec)
+        document["services"][service_spec["service_name"]] = service
+
+        # Redes e volumes nomeados usados pelos serviços são declarados automaticamente
+        networks.extend(service.get("networks", []))
+        volumes.extend(filter(None, map(_named_volume, service.get("volumes", []))))
+
+    if networks:
+        document["networks"] = {network: {} for network in networks}
+    if volumes:
+        document["volumes"] = {volume: {} for volume in volumes}
+
+    return document
+
+
+def render_dockercompose(spec):
+    return compose_emitter.dump(build_dockercompose(spec))
+
+
+RENDERERS = {
+    "dockerfile": render_dockerfile,
+    "dockercompose": render_dockercompose,
+    "dockerignore": render_dockerignore,
+}
+
+
+# Chave de cache/ETag de um artefato
+def artifact_key(kind, spec):
+    return spec_key(f"{kind}:{RENDERER_VERSION}", spec)
+
+
+def render(kind, spec):
+    return RENDERERS[kind](spec).encode("utf-8")
+
+
+# Nome seguro para uma pasta dentro do zip
+def zip_folder_name(name, index):
+    name = _ZIP_NAME_RE.sub("_", str(name or "")).strip("._")
+    return f"{index + 1:03d}-{name}" if name else f"{index + 1:03d}"
+
+
+# Saída não posicionável: o zipfile escreve nela e os blocos são repassados ao gerador
+class _ZipBuffer:
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# Gera o zip em blocos a partir de pares (nome, conteúdo), sem montar o arquivo inteiro em memória
+def iter_zip(entries):
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries:
+            archive.writestr(name, content)
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+    chunk = buffer.drain()
+    if chunk:
+        yield chunk
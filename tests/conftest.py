@@ -0,0 +1,50 @@
+import datetime
+import os
+import sys
+
+import jwt
+import mongomock
+import pytest
+
+# Os módulos do app ficam na raiz do repositório, ao lado de app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+# App com um MongoDB em memória (mongomock) novo a cada teste; os índices do bootstrap são criados no warmup
+@pytest.fixture
+def app(monkeypatch):
+    import app as module
+
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(database, "MongoClient", lambda *args, **kwargs: client)
+    mongo = module.app.extensions["mongo"]
+    mongo.close()
+    mongo.warmup()
+    module.app.extensions["render_cache"].clear()
+    yield module.app
+    module.app.extensions["usage_recorder"].flush()
+    mongo.close()
+
+
+@pytest.fixture
+def db(app):
+    return app.extensions["mongo"].db
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+# Cabeçalho Authorization com um token de acesso válido para user_id
+@pytest.fixture
+def auth_headers(app):
+    def headers(user_id="u1"):
+        token = jwt.encode(
+            {"user_id": user_id, "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)},
+            app.config["SECRET_KEY"], algorithm="HS256",
+        )
+        return {"Authorization": f"Bearer {token}"}
+    return headers
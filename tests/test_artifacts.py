@@ -0,0 +1,67 @@
+import pytest
+
+import app as app_module
+import artifacts
+
+
+def _artifact(db, key):
+    return db[artifacts.COLLECTION].find_one({"_id": key})
+
+
+# Registros com o mesmo arquivo compartilham o artefato; cada um conta uma referência
+def test_create_stores_artifact_once(client, db, auth_headers):
+    for _ in range(2):
+        response = client.post("/createDockerfile", json={"baseImage": "python:3.11"}, headers=auth_headers())
+    key = db.dockerfile.find_one()["content"]["artifact"]
+
+    assert _artifact(db, key)["refcount"] == 2
+    assert bytes(_artifact(db, key)["content"]) == response.data
+    assert db[artifacts.COLLECTION].count_documents({}) == 1
+
+
+def test_delete_releases_and_orphans(client, db, auth_headers):
+    client.post("/createDockerfile", json={"baseImage": "python:3.11"}, headers=auth_headers())
+    document = db.dockerfile.find_one()
+
+    client.delete("/dockerfileHistoryDelete", json={"_id": str(document["_id"])}, headers=auth_headers())
+
+    artifact = _artifact(db, document["content"]["artifact"])
+    assert artifact["refcount"] == 0
+    assert artifact["orphaned_at"] is not None
+
+
+def test_history_download_uses_stored_artifact(client, db, auth_headers):
+    created = client.post("/createDockerfile", json={"baseImage": "python:3.11"}, headers=auth_headers())
+    key = db.dockerfile.find_one()["content"]["artifact"]
+
+    response = client.post("/createDockerfileHistory", json={"artifact": key})
+    assert response.data == created.data
+    assert response.headers["ETag"] == f'"{key}"'
+
+
+# Registro que não chega a ser gravado não deixa referência no artefato
+def test_failed_insert_does_not_retain(app, client, db, auth_headers, monkeypatch):
+    def insert_one(document):
+        raise RuntimeError("sem conexão")
+
+    monkeypatch.setattr(db.dockerfile, "insert_one", insert_one)
+    with pytest.raises(RuntimeError):
+        with app.test_request_context(json={}, headers=auth_headers()):
+            app_module.save_history("dockerfile", {"created_at": None, "user_id": "u1"}, b"FROM python")
+    assert db[artifacts.COLLECTION].count_documents({}) == 0
+
+
+# No write-behind a requisição não toca na coleção artifacts: a referência vem com o lote gravado
+def test_write_behind_retains_after_insert(app, client, db, auth_headers, monkeypatch):
+    submitted = []
+    monkeypatch.setitem(app.config, "HISTORY_WRITE_BEHIND", True)
+    monkeypatch.setattr(app.extensions["history_writer"], "submit", lambda name, document, payload=None: submitted.append((document, payload)) or True)
+
+    client.post("/createDockerfile", json={"baseImage": "python:3.11"}, headers=auth_headers())
+    client.post("/createDockerfile", json={"baseImage": "python:3.11"}, headers=auth_headers())
+    assert db[artifacts.COLLECTION].count_documents({}) == 0
+
+    documents = [document for document, _ in submitted]
+    db.dockerfile.insert_many(documents)
+    app_module.history_inserted(db, "dockerfile", documents, [payload for _, payload in submitted], app.extensions["usage_recorder"])
+    assert _artifact(db, documents[0]["content"]["artifact"])["refcount"] == 2
@@ -0,0 +1,129 @@
+import asyncio
+import datetime
+import json
+
+import pytest
+
+pytest.importorskip("a2wsgi")
+
+import asgi  # noqa: E402
+import history_sync  # noqa: E402
+
+START = datetime.datetime(2024, 1, 1)
+
+
+# O AsyncMongoClient não funciona com o mongomock: os métodos usados pelo asgi.py viram corrotinas
+class _AsyncCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args):
+        self.cursor = self.cursor.sort(*args)
+        return self
+
+    def limit(self, count):
+        self.cursor = self.cursor.limit(count)
+        return self
+
+    async def to_list(self):
+        return list(self.cursor)
+
+
+class _AsyncCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, *args, **kwargs):
+        return _AsyncCursor(self.collection.find(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class _AsyncDatabase:
+    def __init__(self, db):
+        self.db = self
+        self._db = db
+
+    def __getitem__(self, name):
+        return _AsyncCollection(self._db[name])
+
+
+@pytest.fixture
+def records(db, monkeypatch):
+    monkeypatch.setattr(asgi, "mongo", _AsyncDatabase(db))
+    return db.dockerfile.insert_many([
+        {"content": {"user_id": "u1", "base_image": f"python:3.{i}", "created_at": START + datetime.timedelta(minutes=i)}}
+        for i in range(3)
+    ]).inserted_ids
+
+
+def call(method, path, query=b"", body=None, headers=None):
+    messages = [{"type": "http.request", "body": json.dumps(body).encode("utf-8") if body is not None else b""}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query, "root_path": "", "scheme": "http",
+        "server": ("testserver", 80), "http_version": "1.1",
+        "headers": [(key.lower().encode("latin-1"), value.encode("latin-1")) for key, value in (headers or {}).items()],
+    }
+    asyncio.run(asgi.app(scope, receive, send))
+    start = sent[0]
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    return start["status"], {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in start["headers"]}, body
+
+
+def _without_since(body):
+    data = json.loads(body)
+    data.pop("since", None)
+    return data
+
+
+# A página do modo assíncrono é a mesma do Flask, com a mesma ETag
+def test_history_page_matches_flask(client, auth_headers, records):
+    status, headers, body = call("GET", "/dockerfileHistory", b"limit=2", headers=auth_headers())
+    flask_response = client.get("/dockerfileHistory?limit=2", headers=auth_headers())
+
+    assert status == 200
+    assert _without_since(body) == _without_since(flask_response.data)
+    assert headers["etag"] == flask_response.headers["ETag"]
+
+    status, _, body = call("GET", "/dockerfileHistory", b"limit=2", headers=dict(auth_headers(), **{"If-None-Match": headers["etag"]}))
+    assert (status, body) == (304, b"")
+
+
+def test_delete_records_tombstone(db, auth_headers, records):
+    status, _, _ = call("DELETE", "/dockerfileHistoryDelete", body={"_id": str(records[0])}, headers=auth_headers())
+    assert status == 200
+    assert db.dockerfile.count_documents({}) == 2
+    assert db[history_sync.TOMBSTONE_COLLECTION].count_documents({"history_id": records[0]}) == 1
+
+    status, _, _ = call("DELETE", "/dockerfileHistoryDelete", body={"_id": str(records[0])}, headers=auth_headers("u2"))
+    assert status == 404
+
+
+def test_authentication_errors_match_flask(records):
+    assert call("GET", "/dockerfileHistory")[0] == 403
+    assert call("GET", "/dockerfileHistory", headers={"Authorization": "Bearer lixo"})[0] == 401
+    assert call("GET", "/dockerfileHistory", b"since=x&limit=1", headers={"Authorization": "Bearer lixo"})[0] == 401
+
+
+def test_invalid_parameters(auth_headers, records):
+    assert call("GET", "/dockerfileHistory", b"limit=0", headers=auth_headers())[0] == 400
+    assert call("GET", "/dockerfileHistory", b"since=abc&limit=2", headers=auth_headers())[0] == 400
+
+
+# As outras rotas seguem para o app Flask
+def test_other_routes_go_to_flask(records):
+    status, _, body = call("GET", "/healthz")
+    assert (status, json.loads(body)) == (200, {"status": "ok"})
@@ -0,0 +1,93 @@
+import datetime
+import time
+
+import jwt
+import pytest
+
+import auth
+
+SECRET = "segredo-dos-testes-com-32-bytes-ou-mais"
+
+
+def token(user_id="u1", seconds=300, **claims):
+    exp = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=seconds)
+    return jwt.encode(dict({"user_id": user_id, "exp": exp}, **claims), SECRET, algorithm="HS256")
+
+
+def test_verified_token_is_cached():
+    verifier = auth.TokenVerifier()
+    value = token()
+
+    assert verifier.verify(value, SECRET) == "u1"
+    assert verifier.verify(value, SECRET) == "u1"
+    stats = verifier.stats()
+    assert (stats["verifications"], stats["cache_hits"]) == (1, 1)
+
+
+# A entrada do cache nunca passa do exp do próprio token
+def test_cache_entry_ends_with_the_token(monkeypatch):
+    verifier = auth.TokenVerifier(ttl=300)
+    value = token(seconds=10)
+    verifier.verify(value, SECRET)
+
+    now = time.time()
+    monkeypatch.setattr(auth.time, "time", lambda: now + 11)
+    verifier.verify(value, SECRET)
+    assert verifier.stats()["verifications"] == 2
+
+
+def test_invalid_tokens_are_not_cached():
+    verifier = auth.TokenVerifier()
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.verify(token(), "outro-segredo-dos-testes-com-32-bytes")
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.verify(jwt.encode({"sub": "u1"}, SECRET, algorithm="HS256"), SECRET)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verifier.verify(token(seconds=-10), SECRET)
+
+    stats = verifier.stats()
+    assert (stats["size"], stats["failures"]) == (0, 3)
+
+
+def test_revoke_and_disabled_cache():
+    verifier = auth.TokenVerifier()
+    value = token()
+    verifier.verify(value, SECRET)
+    verifier.revoke(value)
+    assert verifier.stats()["size"] == 0
+
+    verifier = auth.TokenVerifier(max_size=0)
+    verifier.verify(value, SECRET)
+    verifier.verify(value, SECRET)
+    assert verifier.stats()["verifications"] == 2
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("Bearer abc", "abc"),
+    ("abc", "abc"),
+    ("", None),
+    (None, None),
+])
+def test_bearer_token(header, expected):
+    assert auth.bearer_token(header) == expected
+
+
+def _app_token(app, **kwargs):
+    return jwt.encode(dict({"user_id": "u1", "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)}, **kwargs), app.config["SECRET_KEY"], algorithm="HS256")
+
+
+def test_login_required_responses(app, client):
+    expired = _app_token(app, exp=datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=5))
+
+    assert client.get("/dockerfileHistory").status_code == 403
+    assert client.get("/dockerfileHistory", headers={"Authorization": "Bearer lixo"}).status_code == 401
+    response = client.get("/dockerfileHistory", headers={"Authorization": f"Bearer {expired}"})
+    assert (response.status_code, response.get_json()["error"]) == (401, "Token expirado")
+    assert client.get("/dockerfileHistory", headers={"Authorization": _app_token(app)}).status_code == 200
+
+
+# Login opcional ignora o token inválido, a não ser com reject_invalid
+def test_login_optional_with_invalid_token(client):
+    headers = {"Authorization": "Bearer lixo"}
+    assert client.post("/createDockerfile", json={"baseImage": "python:3.11"}, headers=headers).status_code == 200
+    assert client.post("/createDockerfileHistory", json={"base_image": "python:3.11"}, headers=headers).status_code == 401
@@ -0,0 +1,49 @@
+import io
+import zipfile
+
+import pytest
+
+import renderer
+
+DOCKERFILE = {"baseImage": "python:3.11", "dependencies": "flask", "optimized": True}
+COMPOSE = {"service": "web", "baseImage": "nginx", "ports": "80:80"}
+
+
+def test_batch_zip_matches_single_routes(client):
+    response = client.post("/createBatch", json={"projects": [
+        {"name": "api/v1", "dockerfile": DOCKERFILE, "dockerCompose": COMPOSE},
+        {"dockerCompose": COMPOSE},
+    ]})
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    assert archive.namelist() == [
+        "001-api_v1/Dockerfile", "001-api_v1/.dockerignore", "001-api_v1/docker-compose.yml", "002/docker-compose.yml",
+    ]
+    assert archive.read("001-api_v1/Dockerfile") == client.post("/createDockerfile", json=DOCKERFILE).data
+    assert archive.read("002/docker-compose.yml") == client.post("/createDockerCompose", json=COMPOSE).data
+
+
+@pytest.mark.parametrize("body, message", [
+    ({}, "Informe a lista"),
+    ({"projects": []}, "Informe a lista"),
+    ({"projects": ["x"]}, "posição 0"),
+    ({"projects": [{"name": "vazio"}]}, "sem Dockerfile"),
+    ({"projects": [{"dockerCompose": {"services": [{"service": "a", "dependsOn": "b"}]}}]}, "posição 0"),
+])
+def test_invalid_batches_are_rejected_before_streaming(client, body, message):
+    response = client.post("/createBatch", json=body)
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
+
+
+def test_batch_size_is_limited(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "BATCH_MAX_PROJECTS", 2)
+    response = client.post("/createBatch", json={"projects": [{"dockerfile": DOCKERFILE}] * 3})
+    assert response.status_code == 400
+
+
+def test_zip_folder_names():
+    assert renderer.zip_folder_name("../meu projeto", 0) == "001-meu_projeto"
+    assert renderer.zip_folder_name(None, 9) == "010"
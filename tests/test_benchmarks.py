@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+import bench_routes  # noqa: E402
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert bench_routes.percentile(values, 0.5) == 51
+    assert bench_routes.percentile(values, 0.99) == 99
+    assert bench_routes.percentile([7], 0.99) == 7
+
+
+# Só o p99 acima da tolerância conta como regressão; cenários novos são ignorados
+def test_compare_flags_p99_regressions(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    previous = [
+        {"route": "login", "history_size": 100, "concurrency": 1, "p99_ms": 10.0},
+        {"route": "protected", "history_size": 100, "concurrency": 1, "p99_ms": 10.0},
+    ]
+    baseline.write_text(json.dumps({"results": previous}), encoding="utf-8")
+    results = [
+        {"route": "login", "history_size": 100, "concurrency": 1, "p99_ms": 11.0},
+        {"route": "protected", "history_size": 100, "concurrency": 1, "p99_ms": 13.0},
+        {"route": "register", "history_size": 100, "concurrency": 1, "p99_ms": 50.0},
+    ]
+
+    assert bench_routes.compare(results, baseline, 0.2) == ["protected|history=100|concurrency=1"]
+    assert "REGRESSÃO" in capsys.readouterr().out
+
+
+@pytest.fixture
+def fast_hasher(app, monkeypatch):
+    hasher = app.extensions["password_hasher"]
+    monkeypatch.setattr(hasher, "workers", 0)
+    monkeypatch.setattr(hasher, "method", "pbkdf2:sha256:1000")
+
+
+# Todas as rotas do benchmark respondem com sucesso contra o banco em memória
+def test_every_route_succeeds(app, fast_hasher):
+    import app as app_module
+
+    server = bench_routes.start_server(app)
+    context = bench_routes.Context(app_module, history_size=5)
+    try:
+        host, port = server.server_address[:2]
+        for route in bench_routes.ROUTES:
+            result = bench_routes.run_route(host, port, context, route, requests=2, concurrency=2)
+            assert all(status.startswith("2") for status in result["statuses"]), result
+    finally:
+        context.cleanup()
+        server.shutdown()
@@ -0,0 +1,44 @@
+import mongomock
+import pytest
+
+import bootstrap
+
+
+def _statuses(report):
+    return {(entry["collection"], entry["index"]): entry["status"] for entry in report}
+
+
+def test_second_run_finds_every_index():
+    db = mongomock.MongoClient().fad
+    assert set(_statuses(bootstrap.ensure_indexes(db)).values()) == {"created"}
+    assert set(_statuses(bootstrap.ensure_indexes(db)).values()) == {"exists"}
+
+
+# Índice com o mesmo nome e outra definição, ou que os dados impedem, não derruba o bootstrap
+def test_conflicts_and_errors_are_reported():
+    db = mongomock.MongoClient().fad
+    db.user.insert_many([{"name": "ana"}, {"name": "ana"}])
+    db.dockerfile.create_index([("content.user_id", 1)], name="user_created_at")
+
+    report = bootstrap.ensure_indexes(db)
+    statuses = _statuses(report)
+    assert statuses[("user", "name_unique")] == "error"
+    assert statuses[("dockerfile", "user_created_at")] == "conflict"
+    assert statuses[("dockercompose", "user_created_at")] == "created"
+    assert not bootstrap.index_ready(report, "user", "name_unique")
+    assert bootstrap.index_ready(report, "dockercompose", "user_created_at")
+
+
+@pytest.fixture
+def fast_hasher(app, monkeypatch):
+    hasher = app.extensions["password_hasher"]
+    monkeypatch.setattr(hasher, "workers", 0)
+    monkeypatch.setattr(hasher, "method", "pbkdf2:sha256:1000")
+
+
+# O cadastro é um insert só; o índice único recusa o nome repetido
+def test_register_rejects_duplicate_names(client, db, fast_hasher):
+    assert client.post("/register", json={"name": "ana", "password": "segredo"}).status_code == 201
+    response = client.post("/register", json={"name": "ana", "password": "outra"})
+    assert response.status_code == 409
+    assert db.user.count_documents({"name": "ana"}) == 1
@@ -0,0 +1,49 @@
+import pytest
+import yaml
+
+import compose_emitter
+import renderer
+
+# Mesmos documentos que a aplicação gera: o emissor direto tem de produzir os bytes do yaml.safe_dump
+SPECS = {
+    "single": {"service": "web", "baseImage": "python:3.11", "workdir": "/app", "envVars": "A=1,B=production",
+               "ports": "8080:80, 443:443", "startupScript": "python app.py"},
+    "dockerfile": {"service": "api", "useDockerfile": True, "context": ".", "ports": "5000"},
+    "minimal": {"service": "x"},
+    "gpu": {"service": "worker", "baseImage": "nvidia/cuda:11.8-cudnn8-devel-ubuntu20.04", "gpuSupport": True,
+            "envVars": "CUDA_VISIBLE_DEVICES=0,OMP_NUM_THREADS=4", "startupScript": "bash run.sh --epochs 10",
+            "gpuCount": 2, "shmSize": "2g", "ipc": "host", "ulimits": {"memlock": -1, "nofile": {"soft": 1024, "hard": 4096}}},
+    "multi": {"services": [
+        {"service": "web", "baseImage": "python:3.11", "ports": "80:80", "dependsOn": ["db", "cache"],
+         "networks": ["front", "back"], "volumes": ["static:/app/static"], "cpuLimit": "1.5", "memoryLimit": "512m",
+         "healthcheck": {"test": ["CMD", "curl", "-f", "http://localhost"], "interval": "30s", "retries": 3}},
+        {"service": "db", "baseImage": "postgres:16", "envVars": "POSTGRES_PASSWORD=secret", "networks": ["back"],
+         "volumes": ["pgdata:/var/lib/postgresql/data"], "tmpfs": ["/tmp"]},
+        {"service": "cache", "baseImage": "redis:7", "networks": ["back"]},
+    ]},
+    "quoted": {"service": "on", "baseImage": "3.8", "workdir": "/app", "envVars": "yes,No,null,0x1F,1e3",
+               "ports": "8080:50, 22:22", "startupScript": "true"},
+}
+
+# Valores que o YAML leria como outro tipo ou que pedem aspas
+TRICKY_VALUES = ["", "yes", "No", "on", "OFF", "true", "null", "~", "3.8", "42", "0x1F", "1e3", ".inf", "-", "8080:50",
+                 "a b", "a: b", "#x", "x#y", "é", "*ref", "&anchor", "!tag", "@x", "x:", "...", "---", "<<", "2026-10-18", "a" * 140]
+
+
+@pytest.mark.parametrize("name", sorted(SPECS))
+def test_emitter_matches_safe_dump(name):
+    document = renderer.build_dockercompose(renderer.dockercompose_spec(SPECS[name]))
+    assert compose_emitter.emit(document) == yaml.safe_dump(document, default_flow_style=False)
+
+
+# Fora do formato conhecido o emissor desiste (Unsupported) e dump usa o PyYAML; em todo caso o YAML volta ao mesmo documento
+@pytest.mark.parametrize("value", TRICKY_VALUES)
+def test_special_strings(value):
+    document = {"services": {"web": {"image": value, "environment": [value], value or "x": {"key": value}}}}
+    try:
+        produced = compose_emitter.emit(document)
+    except compose_emitter.Unsupported:
+        produced = compose_emitter.dump(document)
+    else:
+        assert produced == yaml.safe_dump(document, default_flow_style=False)
+    assert yaml.safe_load(produced) == document
@@ -0,0 +1,70 @@
+import pytest
+import yaml
+
+import renderer
+
+STACK = {
+    "services": [
+        {"service": "web", "baseImage": "nginx", "ports": "80:80", "dependsOn": ["api"], "networks": "front"},
+        {"service": "api", "useDockerfile": True, "context": "./api", "dependsOn": "db", "networks": ["front", "back"]},
+        {"service": "db", "baseImage": "postgres:16", "volumes": ["dados:/var/lib/postgresql/data", "./init:/docker-entrypoint-initdb.d"], "networks": "back"},
+    ],
+    "volumes": "cache",
+}
+
+
+def compose(form):
+    return renderer.build_dockercompose(renderer.dockercompose_spec(form))
+
+
+def test_stack_declares_services_networks_and_named_volumes():
+    document = compose(STACK)
+
+    assert list(document["services"]) == ["web", "api", "db"]
+    assert document["services"]["web"]["depends_on"] == ["api"]
+    assert document["services"]["api"]["build"] == {"context": "./api", "dockerfile": "Dockerfile"}
+    assert document["networks"] == {"front": {}, "back": {}}
+    # Caminhos do host não viram volumes nomeados
+    assert document["volumes"] == {"cache": {}, "dados": {}}
+
+
+# Um serviço sem lista continua gerando o mesmo arquivo e o mesmo registro de antes
+def test_single_service_keeps_the_old_format():
+    spec = renderer.dockercompose_spec({"service": "web", "baseImage": "nginx", "ports": "80:80"})
+    assert renderer.build_dockercompose(spec) == {"version": "3.8", "services": {"web": {"image": "nginx", "ports": ["80:80"]}}}
+    assert renderer.dockercompose_record(spec) == {"service_name": "web", "base_image": "nginx", "ports": "80:80", "use_dockerfile": False, "gpu_support": False}
+
+
+def test_record_round_trips_through_history_fields():
+    spec = renderer.dockercompose_spec(STACK)
+    record = renderer.dockercompose_record(spec)
+    assert renderer.dockercompose_spec(record, renderer.DOCKERCOMPOSE_HISTORY_FIELDS) == spec
+
+
+@pytest.mark.parametrize("services, message", [
+    ([{"service": "a"}, {"service": "a"}], "mesmo nome"),
+    ([{"service": "a"}, {"baseImage": "nginx"}], "precisam de um nome"),
+    ([{"service": "a", "dependsOn": "b"}], "não existe"),
+    ([{"service": "a", "dependsOn": "a"}], "dele mesmo"),
+    ([{"service": "a", "dependsOn": "b"}, {"service": "b", "dependsOn": "a"}], "circular"),
+    (["a"], "Serviço inválido"),
+])
+def test_invalid_stacks_are_rejected(services, message):
+    with pytest.raises(renderer.SpecError, match=message):
+        renderer.dockercompose_spec({"services": services})
+
+
+def test_too_many_services():
+    services = [{"service": f"s{i}"} for i in range(renderer.MAX_COMPOSE_SERVICES + 1)]
+    with pytest.raises(renderer.SpecError, match="Máximo"):
+        renderer.dockercompose_spec({"services": services})
+
+
+def test_route_returns_stack_and_saves_record(client, db, auth_headers):
+    response = client.post("/createDockerCompose", json=STACK, headers=auth_headers())
+    assert response.status_code == 200
+    assert set(yaml.safe_load(response.data)["services"]) == {"web", "api", "db"}
+    assert [service["service_name"] for service in db.dockercompose.find_one()["content"]["services"]] == ["web", "api", "db"]
+
+    invalid = client.post("/createDockerCompose", json={"services": [{"service": "a", "dependsOn": "b"}]})
+    assert invalid.status_code == 400
@@ -0,0 +1,86 @@
+import pytest
+
+import renderer
+
+
+def service(**form):
+    spec = renderer.dockercompose_spec(dict({"service": "app", "baseImage": "python:3.11"}, **form))
+    return renderer.build_dockercompose(spec)["services"]["app"]
+
+
+def test_resources_and_gpu_reservation():
+    deploy = service(cpuLimit="2", memoryLimit="4G", cpuReservation=0.5, memoryReservation="1g", gpuCount=2)["deploy"]
+
+    assert deploy["resources"]["limits"] == {"cpus": "2", "memory": "4g"}
+    assert deploy["resources"]["reservations"] == {
+        "cpus": "0.5",
+        "memory": "1g",
+        "devices": [{"driver": "nvidia", "capabilities": ["gpu"], "count": 2}],
+    }
+
+
+def test_gpu_support_reserves_all_gpus_and_device_ids_pick_gpus():
+    assert service(gpuSupport=True)["deploy"]["resources"]["reservations"]["devices"][0]["count"] == "all"
+    device = service(gpuDeviceIds="0, 1")["deploy"]["resources"]["reservations"]["devices"][0]
+    assert device["device_ids"] == ["0", "1"]
+    assert "count" not in device
+
+
+def test_shm_ulimits_ipc_healthcheck_and_tmpfs():
+    result = service(
+        shmSize="2gb",
+        ulimits={"nofile": {"soft": 1024, "hard": 65536}, "memlock": -1},
+        ipc="host",
+        healthcheck={"test": "curl -f http://localhost", "interval": "30s", "retries": 3, "startPeriod": "1m"},
+        tmpfs="/tmp",
+    )
+
+    assert result["shm_size"] == "2gb"
+    assert result["ulimits"] == {"nofile": {"soft": 1024, "hard": 65536}, "memlock": -1}
+    assert result["ipc"] == "host"
+    assert result["healthcheck"] == {"test": ["CMD-SHELL", "curl -f http://localhost"], "interval": "30s", "start_period": "1m", "retries": 3}
+    assert result["tmpfs"] == ["/tmp"]
+
+
+# Sem ajustes o serviço sai igual ao de antes
+def test_no_tuning_adds_nothing():
+    assert service() == {"image": "python:3.11"}
+
+
+@pytest.mark.parametrize("form, message", [
+    ({"cpuLimit": "0"}, "cpuLimit"),
+    ({"memoryLimit": "muito"}, "memoryLimit"),
+    ({"cpuLimit": "1", "cpuReservation": "2"}, "cpuReservation não pode passar"),
+    ({"memoryLimit": "512m", "memoryReservation": "1g"}, "memoryReservation não pode passar"),
+    ({"gpuCount": 1, "gpuDeviceIds": ["0"]}, "não os dois"),
+    ({"gpuCount": True}, "gpuCount"),
+    ({"ulimits": {"fds": 10}}, "ulimit desconhecido"),
+    ({"ulimits": {"nofile": {"soft": 10, "hard": 5}}}, "soft não pode passar"),
+    ({"ipc": "todos"}, "ipc deve ser"),
+    ({"healthcheck": {"test": ["ls"]}}, "healthcheck.test"),
+    ({"healthcheck": {"test": "ls", "interval": "depois"}}, "healthcheck.interval"),
+    ({"tmpfs": ["tmp"]}, "caminhos absolutos"),
+])
+def test_invalid_tuning_is_rejected(form, message):
+    with pytest.raises(renderer.SpecError, match=message):
+        renderer.dockercompose_spec(dict({"service": "app"}, **form))
+
+
+def test_ipc_must_point_to_a_service_of_the_stack():
+    services = [{"service": "a", "ipc": "service:b"}, {"service": "b", "ipc": "shareable"}]
+    assert renderer.build_dockercompose(renderer.dockercompose_spec({"services": services}))["services"]["a"]["ipc"] == "service:b"
+    with pytest.raises(renderer.SpecError, match="ipc de c"):
+        renderer.dockercompose_spec({"services": [{"service": "a", "ipc": "service:c"}]})
+
+
+def test_route_rejects_invalid_tuning(client):
+    response = client.post("/createDockerCompose", json={"service": "app", "cpuLimit": "-1"})
+    assert response.status_code == 400
+    assert "cpuLimit" in response.get_json()["error"]
+
+
+# O registro guarda os ajustes e gera de novo o mesmo arquivo
+def test_tuning_round_trips_through_history_fields():
+    spec = renderer.dockercompose_spec({"service": "app", "memoryLimit": "1g", "gpuCount": "all", "healthcheck": {"test": "true", "startPeriod": "5s"}})
+    record = renderer.dockercompose_record(spec)
+    assert renderer.dockercompose_spec(record, renderer.DOCKERCOMPOSE_HISTORY_FIELDS) == spec
@@ -0,0 +1,57 @@
+import gzip
+import json
+
+import compression
+
+
+def _create(client, auth_headers, count):
+    for i in range(count):
+        client.post("/createDockerfile", json={"baseImage": f"python:3.{i}", "dependencies": "flask, numpy, pandas"}, headers=auth_headers())
+
+
+def test_large_history_is_gzipped(client, auth_headers):
+    _create(client, auth_headers, 10)
+
+    plain = client.get("/dockerfileHistory", headers=auth_headers())
+    response = client.get("/dockerfileHistory", headers=dict(auth_headers(), **{"Accept-Encoding": "gzip"}))
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.data))["history"] == plain.get_json()["history"]
+    # A ETag forte vira fraca: os bytes enviados não são os mesmos
+    assert response.headers["ETag"].startswith("W/")
+
+
+def test_small_responses_are_not_compressed(client, auth_headers):
+    response = client.get("/dockerfileHistory", headers=dict(auth_headers(), **{"Accept-Encoding": "gzip"}))
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_negotiate_respects_weights():
+    assert compression.negotiate("gzip;q=0, deflate") is None
+    assert compression.negotiate("gzip, deflate") == "gzip"
+    assert compression.negotiate(None) is None
+
+
+# Com a ETag da página o histórico responde 304 até o próximo registro
+def test_history_conditional_get(client, auth_headers):
+    _create(client, auth_headers, 1)
+    first = client.get("/dockerfileHistory", headers=auth_headers())
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    assert client.get("/dockerfileHistory", headers=dict(auth_headers(), **{"If-None-Match": etag})).status_code == 304
+    last_modified = first.headers["Last-Modified"]
+    assert client.get("/dockerfileHistory", headers=dict(auth_headers(), **{"If-Modified-Since": last_modified})).status_code == 304
+
+    _create(client, auth_headers, 1)
+    assert client.get("/dockerfileHistory", headers=dict(auth_headers(), **{"If-None-Match": etag})).status_code == 200
+
+
+# A página depende do limit: outra página não reaproveita a ETag
+def test_etag_depends_on_page(client, auth_headers):
+    _create(client, auth_headers, 1)
+    etag = client.get("/dockerfileHistory", headers=auth_headers()).headers["ETag"]
+    response = client.get("/dockerfileHistory?limit=1", headers=dict(auth_headers(), **{"If-None-Match": etag}))
+    assert response.status_code == 200
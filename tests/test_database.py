@@ -0,0 +1,54 @@
+import flask
+import mongomock
+
+import database
+
+
+class _Clients:
+    def __init__(self):
+        self.created = []
+
+    def __call__(self, uri, **options):
+        client = mongomock.MongoClient()
+        self.created.append(options)
+        return client
+
+
+# Depois do fork (outro pid) o processo abre o próprio MongoClient
+def test_client_is_recreated_per_process(monkeypatch):
+    clients = _Clients()
+    monkeypatch.setattr(database, "MongoClient", clients)
+    mongo = database.Database("mongodb://localhost", maxPoolSize=10)
+
+    first = mongo.client
+    assert mongo.client is first
+    monkeypatch.setattr(database.os, "getpid", lambda: -1)
+    assert mongo.client is not first
+    assert len(clients.created) == 2
+    assert clients.created[0]["maxPoolSize"] == 10
+
+
+def test_pool_options_come_from_config(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "20")
+    monkeypatch.setenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "500")
+    monkeypatch.delenv("MONGO_SOCKET_TIMEOUT_MS", raising=False)
+    mongo = database.init_app(flask.Flask(__name__))
+
+    assert mongo.client_options["maxPoolSize"] == 20
+    assert mongo.client_options["waitQueueTimeoutMS"] == 500
+    # Opções sem valor ficam com o padrão do pymongo
+    assert "socketTimeoutMS" not in mongo.client_options
+
+
+def test_healthz_does_not_touch_mongo(app, client, monkeypatch):
+    monkeypatch.setattr(app.extensions["mongo"], "ping", lambda: 1 / 0)
+    assert client.get("/healthz").status_code == 200
+
+
+def test_readyz_follows_mongo(app, client, monkeypatch):
+    assert client.get("/readyz").get_json() == {"status": "ok", "mongo": True}
+
+    monkeypatch.setattr(app.extensions["mongo"], "ping", lambda: False)
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.get_json()["mongo"] is False
@@ -0,0 +1,75 @@
+import datetime
+
+import mongomock
+
+import artifacts
+import history_bulk
+import usage_stats
+
+
+def make_db():
+    db = mongomock.MongoClient().db
+    created_at = datetime.datetime(2026, 10, 18, 12, 0)
+    documents = [
+        {"content": {"user_id": "u1", "created_at": created_at, "base_image": "python:3.11", "artifact": artifacts.content_key(str(index).encode())}}
+        for index in range(3)
+    ]
+    db.dockerfile.insert_many(documents)
+    for index, document in enumerate(documents):
+        artifacts.retain(db, "dockerfile", str(index).encode())
+    usage_stats.record_many(db, "dockerfile", documents)
+    return db, [document["_id"] for document in documents]
+
+
+def test_bulk_delete_reports_removed_ids():
+    db, ids = make_db()
+    result = history_bulk.bulk_delete(db, "dockerfile", "u1", {"ids": [str(object_id) for object_id in ids]}, 10, 60)
+    assert result["deleted"] == 3
+    assert [entry["status"] for entry in result["results"]] == ["deleted"] * 3
+    assert db[usage_stats.COLLECTION].find_one()["count"] == 0
+
+
+# Registro removido por outra requisição entre a busca e o delete_many: deleted segue o deleted_count
+# e o artefato dele não é liberado duas vezes
+def test_bulk_delete_with_concurrent_removal(monkeypatch):
+    db, ids = make_db()
+    collection = db.dockerfile
+    delete_many = collection.delete_many
+
+    def racing_delete_many(query):
+        artifacts.delete_history(db, "dockerfile", {"_id": ids[0]})
+        return delete_many(query)
+
+    monkeypatch.setattr(collection, "delete_many", racing_delete_many)
+    result = history_bulk.bulk_delete(db, "dockerfile", "u1", {"ids": [str(object_id) for object_id in ids]}, 10, 60)
+
+    assert result["deleted"] == 2
+    assert {entry["status"] for entry in result["results"]} == {"deleted"}
+    assert db[artifacts.COLLECTION].find_one({"_id": artifacts.content_key(b"0")})["refcount"] == 0
+
+
+# Registros encontrados na busca que o delete_many não removeu voltam como not_found
+def test_bulk_delete_reports_records_left_in_place(monkeypatch):
+    db, ids = make_db()
+    delete_many = db.dockerfile.delete_many
+    monkeypatch.setattr(db.dockerfile, "delete_many", lambda query: delete_many({"_id": {"$in": ids[1:]}}))
+    result = history_bulk.bulk_delete(db, "dockerfile", "u1", {"ids": [str(object_id) for object_id in ids]}, 10, 60)
+
+    assert result["deleted"] == 2
+    assert [entry["status"] for entry in result["results"]] == ["not_found", "deleted", "deleted"]
+    assert db[artifacts.COLLECTION].find_one({"_id": artifacts.content_key(b"0")})["refcount"] == 1
+    assert db[usage_stats.COLLECTION].find_one()["count"] == 1
+
+
+# Registro que já voltou para a coleção (restauração interrompida antes de limpar a lixeira)
+# não ganha uma segunda referência no artefato
+def test_bulk_restore_skips_records_already_back():
+    db, ids = make_db()
+    history_bulk.bulk_delete(db, "dockerfile", "u1", {"ids": [str(object_id) for object_id in ids]}, 10, 60)
+    db.dockerfile.insert_one(db[history_bulk.TRASH_COLLECTION].find_one({"_id": ids[0]})["document"])
+    artifacts.reacquire_many(db, [artifacts.content_key(b"0")])
+
+    result = history_bulk.bulk_restore(db, "dockerfile", "u1", {"ids": [str(object_id) for object_id in ids]}, 10, 60)
+
+    assert result["restored"] == 3
+    assert [db[artifacts.COLLECTION].find_one({"_id": artifacts.content_key(str(index).encode())})["refcount"] for index in range(3)] == [1, 1, 1]
@@ -0,0 +1,51 @@
+import datetime
+import gzip
+import json
+
+import history
+
+START = datetime.datetime(2024, 1, 1)
+
+
+def _insert(db, count, user_id="u1"):
+    db.dockerfile.insert_many([
+        {"content": {"user_id": user_id, "base_image": f"python:3.{i}", "created_at": START + datetime.timedelta(minutes=i)}}
+        for i in range(count)
+    ])
+
+
+def _lines(data):
+    return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+
+# Uma linha por registro, mais novo primeiro, só do usuário do token
+def test_export_streams_ndjson(client, db, auth_headers):
+    _insert(db, 3)
+    _insert(db, 2, user_id="u2")
+
+    response = client.get("/dockerfileHistoryExport", headers=auth_headers())
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = _lines(response.data)
+    assert [line["base_image"] for line in lines] == ["python:3.2", "python:3.1", "python:3.0"]
+    assert lines[0]["created_at"] == "2024-01-01T00:02:00"
+    assert set(lines[0]) == {"_id", *history.DOCKERFILE_FIELDS}
+
+
+def test_export_gzip(client, db, auth_headers):
+    _insert(db, 2)
+    response = client.get("/dockerfileHistoryExport?gzip=1", headers=auth_headers())
+    assert response.mimetype == "application/gzip"
+    assert len(_lines(gzip.decompress(response.data))) == 2
+
+
+def test_export_requires_login(client):
+    assert client.get("/dockerComposeHistoryExport").status_code == 403
+
+
+# Os registros saem em blocos de chunk_size, sem juntar o histórico inteiro na memória
+def test_export_is_chunked(db):
+    _insert(db, 50)
+    chunks = list(history.iter_export(db.dockerfile, "u1", history.DOCKERFILE_FIELDS, batch_size=10, chunk_size=1024))
+    assert len(chunks) > 1
+    assert len(_lines(b"".join(chunks))) == 50
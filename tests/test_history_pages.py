@@ -0,0 +1,61 @@
+import datetime
+
+import pytest
+from bson.objectid import ObjectId
+
+import history
+
+START = datetime.datetime(2024, 1, 1)
+
+
+# Cinco registros de u1 (dois com o mesmo created_at) e um de outro usuário
+@pytest.fixture
+def records(db):
+    documents = [
+        {"content": {"user_id": "u1", "base_image": f"python:3.{minute}", "created_at": START + datetime.timedelta(minutes=minute)}}
+        for minute in (0, 1, 1, 2, 3)
+    ]
+    documents.append({"content": {"user_id": "u2", "base_image": "node", "created_at": START}})
+    db.dockerfile.insert_many(documents)
+    return [document["_id"] for document in documents]
+
+
+def _pages(client, auth_headers, limit):
+    ids, cursor = [], None
+    while True:
+        query = f"?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        body = client.get(f"/dockerfileHistory{query}", headers=auth_headers()).get_json()
+        assert len(body["history"]) <= limit
+        ids += [item["_id"] for item in body["history"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+# Mais novo primeiro, empates de created_at desfeitos pelo _id, sem repetir nem pular registros
+def test_pages_follow_created_at_and_id(client, auth_headers, records):
+    expected = [str(records[i]) for i in (4, 3, 2, 1, 0)]
+    assert _pages(client, auth_headers, 2) == expected
+    assert _pages(client, auth_headers, 50) == expected
+
+
+def test_last_page_has_no_cursor(client, auth_headers, records):
+    body = client.get("/dockerfileHistory?limit=5", headers=auth_headers()).get_json()
+    assert len(body["history"]) == 5
+    assert body["next_cursor"] is None
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=abc", "cursor=invalido"])
+def test_invalid_parameters_are_rejected(client, auth_headers, query):
+    response = client.get(f"/dockerfileHistory?{query}", headers=auth_headers())
+    assert response.status_code == 400
+
+
+def test_limit_is_capped():
+    assert history.page_args({"limit": "1000"}, 50, 200) == (200, None)
+    assert history.page_args({}, 50, 200) == (50, None)
+
+
+def test_cursor_round_trip():
+    object_id = ObjectId()
+    assert history.decode_cursor(history.encode_cursor(START, object_id)) == (START, object_id)
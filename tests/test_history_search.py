@@ -0,0 +1,73 @@
+import datetime
+
+import pytest
+
+import history_search
+
+START = datetime.datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def records(db):
+    db.dockerfile.insert_many([
+        {"content": {"user_id": "u1", "base_image": "python:3.11", "framework": "flask", "gpu_support": False, "created_at": START}},
+        {"content": {"user_id": "u1", "base_image": "python:3.11", "framework": "django", "gpu_support": True, "created_at": START + datetime.timedelta(days=1)}},
+        {"content": {"user_id": "u1", "base_image": "node:20", "gpu_support": False, "created_at": START + datetime.timedelta(days=2)}},
+        {"content": {"user_id": "u2", "base_image": "python:3.11", "created_at": START}},
+    ])
+    db.dockercompose.insert_many([
+        {"content": {"user_id": "u1", "base_image": "nginx", "created_at": START}},
+        {"content": {"user_id": "u1", "services": [{"base_image": "redis"}, {"base_image": "nginx"}], "created_at": START + datetime.timedelta(days=1)}},
+        {"content": {"user_id": "u1", "services": [{"base_image": "postgres:16"}], "created_at": START + datetime.timedelta(days=2)}},
+    ])
+
+
+def _search(client, auth_headers, path, query):
+    response = client.get(f"{path}?{query}", headers=auth_headers())
+    assert response.status_code == 200
+    return response.get_json()["history"]
+
+
+@pytest.mark.parametrize("query, frameworks", [
+    ("base_image=python:3.11", ["django", "flask"]),
+    ("base_image=python:3.11&framework=flask", ["flask"]),
+    ("gpu_support=true", ["django"]),
+    ("created_from=2024-01-02&created_to=2024-01-03", ["django"]),
+    ("created_from=2024-01-02T00:00:00%2B00:00", ["", "django"]),
+])
+def test_dockerfile_filters(client, auth_headers, records, query, frameworks):
+    assert [item["framework"] for item in _search(client, auth_headers, "/dockerfileHistory", query)] == frameworks
+
+
+# Registros com vários serviços são encontrados pela imagem de qualquer serviço
+def test_compose_base_image_searches_services(client, auth_headers, records):
+    items = _search(client, auth_headers, "/dockerComposeHistory", "base_image=nginx")
+    assert len(items) == 2
+
+
+@pytest.mark.parametrize("query, message", [
+    ("gpu_support=talvez", "gpu_support"),
+    ("created_from=ontem", "created_from"),
+    ("base_image=" + "x" * 201, "muito longo"),
+])
+def test_invalid_filters_are_rejected(client, auth_headers, query, message):
+    response = client.get(f"/dockerfileHistory?{query}", headers=auth_headers())
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
+
+
+def test_framework_filter_is_dockerfile_only(client, auth_headers):
+    assert client.get("/dockerComposeHistory?framework=flask", headers=auth_headers()).status_code == 400
+
+
+def test_text_search_and_etag_key():
+    conditions, key = history_search.parse("dockerfile", {"q": "numpy", "base_image": "python"})
+    assert conditions == [{"content.base_image": "python"}, {"$text": {"$search": "numpy"}}]
+    assert key == "base_image=python&q=numpy"
+
+
+# Resultados filtrados têm ETag própria
+def test_filtered_page_has_its_own_etag(client, auth_headers, records):
+    etag = client.get("/dockerfileHistory", headers=auth_headers()).headers["ETag"]
+    response = client.get("/dockerfileHistory?framework=flask", headers=dict(auth_headers(), **{"If-None-Match": etag}))
+    assert response.status_code == 200
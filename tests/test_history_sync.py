@@ -0,0 +1,50 @@
+import datetime
+
+import history_sync
+
+
+def _since(seconds_ago):
+    return history_sync.encode_since(datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=seconds_ago))
+
+
+# Registro criado e depois removido: aparece primeiro em history e depois só em deleted
+def test_since_returns_created_and_deleted_records(client, auth_headers):
+    since = _since(60)
+    client.post("/createDockerfile", json={"baseImage": "python:3.11"}, headers=auth_headers())
+
+    changes = client.get(f"/dockerfileHistory?since={since}", headers=auth_headers()).get_json()
+    assert [item["base_image"] for item in changes["history"]] == ["python:3.11"]
+    assert changes["deleted"] == []
+    history_id = changes["history"][0]["_id"]
+
+    response = client.delete("/dockerfileHistoryDelete", json={"_id": history_id}, headers=auth_headers())
+    assert response.status_code == 200
+
+    changes = client.get(f"/dockerfileHistory?since={since}", headers=auth_headers()).get_json()
+    assert changes["history"] == []
+    assert changes["deleted"] == [history_id]
+
+
+def test_since_ignores_other_users(client, auth_headers):
+    since = _since(60)
+    client.post("/createDockerfile", json={"baseImage": "python:3.11"}, headers=auth_headers("u2"))
+    changes = client.get(f"/dockerfileHistory?since={since}", headers=auth_headers()).get_json()
+    assert changes["history"] == [] and changes["deleted"] == []
+
+
+# Filtros e paginação não valem para o feed de alterações
+def test_since_rejects_search_and_paging(client, auth_headers):
+    since = _since(60)
+    for extra in ("q=torch", "base_image=python:3.11", "created_from=2026-01-01", "limit=10"):
+        response = client.get(f"/dockerfileHistory?since={since}&{extra}", headers=auth_headers())
+        assert response.status_code == 400
+        assert "since" in response.get_json()["error"]
+
+
+def test_expired_since_returns_410(app, client, auth_headers):
+    since = _since(app.config["HISTORY_TOMBSTONE_TTL"] + 60)
+    assert client.get(f"/dockerfileHistory?since={since}", headers=auth_headers()).status_code == 410
+
+
+def test_invalid_since_returns_400(client, auth_headers):
+    assert client.get("/dockerfileHistory?since=@@", headers=auth_headers()).status_code == 400
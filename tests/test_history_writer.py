@@ -0,0 +1,76 @@
+import queue
+
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from history_writer import HistoryWriter
+
+
+class FakeCollection:
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.inserted = []
+
+    def insert_many(self, documents, ordered=True):
+        outcome = self.outcomes.pop(0) if self.outcomes else None
+        if isinstance(outcome, Exception):
+            raise outcome
+        self.inserted.extend(documents)
+
+
+def make_writer(collection, **options):
+    calls = []
+    writer = HistoryWriter(
+        lambda: {"dockerfile": collection}, after_insert=lambda db, name, documents, payloads: calls.append(list(documents)), **options
+    )
+    writer._queue = queue.Queue()
+    return writer, calls
+
+
+def test_bulk_write_error_runs_after_insert_only_for_stored_documents():
+    error = BulkWriteError({"nInserted": 2, "writeErrors": [{"index": 1, "code": 121, "errmsg": "validação"}]})
+    writer, calls = make_writer(FakeCollection([error]))
+    documents = [{"n": 0}, {"n": 1}, {"n": 2}]
+
+    writer._flush([("dockerfile", document, None, 1) for document in documents])
+
+    assert calls == [[documents[0], documents[2]]]
+    assert writer.stats()["written"] == 2
+    assert writer.stats()["dropped"] == 1
+
+
+def test_connection_error_requeues_without_after_insert():
+    collection = FakeCollection([AutoReconnect("sem conexão")])
+    writer, calls = make_writer(collection, max_attempts=2)
+    documents = [{"n": 0}, {"n": 1}]
+
+    assert writer._flush([("dockerfile", document, None, 1) for document in documents]) == 2
+    assert calls == []
+    assert writer.stats()["retried"] == 2
+
+    # Nova tentativa grava o lote e só então atualiza versão e estatísticas
+    writer._flush([writer._queue.get_nowait() for _ in documents])
+    assert collection.inserted == documents
+    assert calls == [documents]
+
+
+def test_documents_are_dropped_after_max_attempts():
+    writer, calls = make_writer(FakeCollection([AutoReconnect("sem conexão")]), max_attempts=2)
+
+    writer._flush([("dockerfile", {"n": 0}, None, 2)])
+
+    assert writer._queue.empty()
+    assert calls == []
+    assert writer.stats()["dropped"] == 1
+
+
+# O payload de submit chega ao after_insert junto do documento gravado, sem ir para o banco
+def test_payloads_follow_stored_documents():
+    error = BulkWriteError({"nInserted": 1, "writeErrors": [{"index": 0, "code": 121, "errmsg": "validação"}]})
+    collection = FakeCollection([error])
+    calls = []
+    writer = HistoryWriter(lambda: {"dockerfile": collection}, after_insert=lambda db, name, documents, payloads: calls.append(payloads))
+    writer._queue = queue.Queue()
+
+    writer._flush([("dockerfile", {"n": 0}, b"a", 1), ("dockerfile", {"n": 1}, b"b", 1)])
+
+    assert calls == [[b"b"]]
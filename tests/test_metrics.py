@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from prometheus_client import REGISTRY
+
+import metrics
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+# A rota entra no label como o padrão do Flask, não com o valor da URL
+def test_requests_are_labeled_by_route(client, auth_headers):
+    labels = {"route": "/templates/<template_id>", "method": "GET", "status": "404"}
+    before = _sample("http_request_duration_seconds_count", **labels)
+
+    client.get("/templates/abc", headers=auth_headers())
+    client.get("/templates/def", headers=auth_headers())
+
+    assert _sample("http_request_duration_seconds_count", **labels) == before + 2
+    assert _sample("http_requests_in_flight", route="/templates/<template_id>") == 0
+
+
+def test_mongo_commands_are_timed_by_collection():
+    listener = metrics.MongoCommandMetrics()
+    labels = {"collection": "dockerfile", "operation": "find", "outcome": "success"}
+    before = _sample("mongo_command_duration_seconds_count", **labels)
+
+    listener.started(SimpleNamespace(command={"find": "dockerfile"}, command_name="find", request_id=1, connection_id=("h", 1)))
+    listener.succeeded(SimpleNamespace(command_name="find", request_id=1, connection_id=("h", 1), duration_micros=1500))
+
+    assert _sample("mongo_command_duration_seconds_count", **labels) == before + 1
+    assert listener._pending == {}
+
+
+# Contadores de /stats aparecem como gauges; textos e booleanos ficam de fora
+def test_stats_collector_exports_numbers():
+    collector = metrics.StatsCollector()
+    collector.add("cache", lambda: {"hits": 3, "hit_rate": 0.5, "enabled": True, "mode": "lru"})
+    families = {family.name: family.samples[0].value for family in collector.collect()}
+    assert families == {"fad_cache_hits": 3, "fad_cache_hit_rate": 0.5}
+
+
+def test_metrics_endpoint(client):
+    client.post("/createDockerfile", json={"baseImage": "python:3.11"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    assert b'http_request_duration_seconds_bucket{le="0.005",method="POST",route="/createDockerfile"' in response.data
+    assert b"fad_render_cache_misses" in response.data
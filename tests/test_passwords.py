@@ -0,0 +1,29 @@
+import os
+import signal
+
+import pytest
+
+from passwords import HasherUnavailable, PasswordHasher
+
+
+def _kill(pid):
+    os.kill(pid, signal.SIGKILL)
+
+
+# Um processo do pool morto vira 503 uma vez; a chamada seguinte usa um pool novo
+def test_broken_pool_is_recreated():
+    hasher = PasswordHasher(method="pbkdf2:sha256:1000", workers=1)
+    try:
+        pwhash = hasher.hash("segredo")
+        with pytest.raises(HasherUnavailable):
+            hasher._run(_kill, next(iter(hasher._pool._processes)))
+        assert hasher.check(pwhash, "segredo")
+    finally:
+        hasher.shutdown()
+
+
+def test_needs_rehash_on_salt_length_change():
+    pwhash = PasswordHasher(method="pbkdf2:sha256:1000", salt_length=16, workers=0).hash("segredo")
+    assert not PasswordHasher(method="pbkdf2:sha256:1000", salt_length=16, workers=0).needs_rehash(pwhash)
+    assert PasswordHasher(method="pbkdf2:sha256:1000", salt_length=24, workers=0).needs_rehash(pwhash)
+    assert PasswordHasher(method="scrypt", salt_length=16, workers=0).needs_rehash(pwhash)
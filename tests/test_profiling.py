@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+from flask import Flask
+
+import profiling
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["PROFILE_TOKEN"] = "segredo"
+    app.extensions["mongo"] = SimpleNamespace(event_listeners=[])
+    profiling.init_app(app)
+    app.add_url_rule("/ping", "ping", lambda: "ok")
+    return app
+
+
+# Cabeçalho com caracteres fora do ASCII não pode derrubar a requisição
+def test_non_ascii_token_is_rejected_without_error():
+    client = make_app().test_client()
+    response = client.get("/ping", headers={"X-Profile-Token": "séçret".encode("utf-8").decode("latin-1")})
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_valid_token_profiles_the_request():
+    client = make_app().test_client()
+    response = client.get("/ping", headers={"X-Profile-Token": "segredo"})
+    assert response.status_code == 200
+    assert "X-Profile-Id" in response.headers
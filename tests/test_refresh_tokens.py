@@ -0,0 +1,81 @@
+import datetime
+
+import pytest
+
+import refresh_tokens
+
+
+def _later(monkeypatch, seconds):
+    moment = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=seconds)
+    monkeypatch.setattr(refresh_tokens, "_now", lambda: moment)
+
+
+def test_only_the_hash_is_stored(db):
+    token = refresh_tokens.issue(db, "u1", 60)
+    document = db[refresh_tokens.COLLECTION].find_one()
+    assert document["_id"] == refresh_tokens.token_hash(token) != token
+
+
+# Cada troca devolve um token novo da mesma família; o antigo deixa de valer
+def test_rotation_keeps_the_family(db):
+    first = refresh_tokens.issue(db, "u1", 60)
+    user_id, second = refresh_tokens.rotate(db, first, 60, reuse_grace=10)
+
+    assert user_id == "u1"
+    assert second != first
+    families = {document["family"] for document in db[refresh_tokens.COLLECTION].find()}
+    assert len(families) == 1
+    with pytest.raises(refresh_tokens.InvalidRefreshToken):
+        refresh_tokens.rotate(db, first, 60, reuse_grace=10)
+    # Reapresentado dentro da janela de requisições simultâneas, não revoga a família
+    assert refresh_tokens.rotate(db, second, 60, reuse_grace=10)[0] == "u1"
+
+
+# Token trocado reapresentado depois da janela: a sessão inteira é revogada
+def test_reuse_after_grace_revokes_the_family(db, monkeypatch):
+    first = refresh_tokens.issue(db, "u1", 600)
+    other_session = refresh_tokens.issue(db, "u1", 600)
+    _, second = refresh_tokens.rotate(db, first, 600, reuse_grace=10)
+
+    _later(monkeypatch, 60)
+    with pytest.raises(refresh_tokens.InvalidRefreshToken):
+        refresh_tokens.rotate(db, first, 600, reuse_grace=10)
+    with pytest.raises(refresh_tokens.InvalidRefreshToken):
+        refresh_tokens.rotate(db, second, 600, reuse_grace=10)
+    assert refresh_tokens.rotate(db, other_session, 600, reuse_grace=10)[0] == "u1"
+
+
+def test_expired_token_is_rejected(db, monkeypatch):
+    token = refresh_tokens.issue(db, "u1", 60)
+    _later(monkeypatch, 120)
+    with pytest.raises(refresh_tokens.InvalidRefreshToken, match="expirado"):
+        refresh_tokens.rotate(db, token, 60, reuse_grace=10)
+
+
+@pytest.mark.parametrize("token", [None, "", "desconhecido"])
+def test_missing_or_unknown_token(db, token):
+    with pytest.raises(refresh_tokens.InvalidRefreshToken):
+        refresh_tokens.rotate(db, token, 60, reuse_grace=10)
+
+
+def test_logout_revokes_the_session_and_logout_all_every_session(client, db, auth_headers):
+    first = refresh_tokens.issue(db, "u1", 60)
+    second = refresh_tokens.issue(db, "u1", 60)
+    third = refresh_tokens.issue(db, "u1", 60)
+
+    assert client.post("/logout", json={"refresh_token": first}).status_code == 200
+    assert client.post("/refresh", json={"refresh_token": first}).status_code == 401
+
+    response = client.post("/logoutAll", headers=auth_headers())
+    assert response.get_json()["revoked"] == 2
+    assert client.post("/refresh", json={"refresh_token": second}).status_code == 401
+    assert client.post("/refresh", json={"refresh_token": third}).status_code == 401
+
+
+def test_refresh_route_returns_new_tokens(client, db):
+    token = refresh_tokens.issue(db, "u1", 60)
+    body = client.post("/refresh", json={"refresh_token": token}).get_json()
+
+    assert body["token"]
+    assert body["refresh_token"] != token
+    assert client.post("/refresh", json={}).status_code == 401
@@ -0,0 +1,82 @@
+import renderer
+import render_cache
+from render_cache import RenderCache
+
+FORM = {"baseImage": "python:3.11", "dependencies": "flask"}
+
+
+def _not_rendered(kind, spec):
+    raise AssertionError("o arquivo não deveria ser gerado")
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RenderCache(max_size=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entry_is_a_miss(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(render_cache.time, "monotonic", lambda: now[0])
+    cache = RenderCache(ttl=10)
+    cache.set("a", b"1")
+    now[0] += 11
+
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_zero_size_disables_the_cache():
+    cache = RenderCache(max_size=0)
+    cache.set("a", b"1")
+    assert cache.get("a") is None
+
+
+def test_spec_key_ignores_field_order():
+    assert render_cache.spec_key("dockerfile", {"a": 1, "b": 2}) == render_cache.spec_key("dockerfile", {"b": 2, "a": 1})
+    assert render_cache.spec_key("dockerfile", {"a": 1}) != render_cache.spec_key("dockercompose", {"a": 1})
+
+
+# A mesma especificação é gerada uma vez e servida do cache depois
+def test_same_spec_renders_once(client, monkeypatch):
+    calls = []
+    render = renderer.render
+    monkeypatch.setattr(renderer, "render", lambda kind, spec: calls.append(kind) or render(kind, spec))
+
+    first = client.post("/createDockerfile", json=FORM)
+    second = client.post("/createDockerfile", json=FORM)
+
+    assert calls == ["dockerfile"]
+    assert first.data == second.data
+    assert first.headers["ETag"] == second.headers["ETag"]
+
+
+def test_if_none_match_returns_304_without_rendering(client, monkeypatch):
+    etag = client.post("/createDockerfile", json=FORM).headers["ETag"]
+    monkeypatch.setattr(renderer, "render", _not_rendered)
+
+    response = client.post("/createDockerfile", json=FORM, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_different_spec_has_different_etag(client):
+    first = client.post("/createDockerfile", json=FORM)
+    second = client.post("/createDockerfile", json=dict(FORM, dependencies="numpy"))
+    assert first.headers["ETag"] != second.headers["ETag"]
+
+
+def test_compose_etag(client):
+    form = {"serviceName": "web", "baseImage": "nginx", "ports": "80:80"}
+    response = client.post("/createDockerCompose", json=form)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert client.post("/createDockerCompose", json=form, headers={"If-None-Match": etag}).status_code == 304
+
@@ -0,0 +1,22 @@
+import renderer
+
+
+# A imagem do CUDA não traz python3: o modo otimizado precisa instalá-lo antes de criar o venv
+def test_optimized_cuda_image_installs_python():
+    spec = renderer.dockerfile_spec({"baseImage": renderer.CUDA_IMAGE, "optimized": True, "dependencies": "torch"})
+    content = renderer.render("dockerfile", spec).decode("utf-8")
+    install = content.index("apt-get install -y --no-install-recommends python3 python3-venv")
+    assert install < content.index("RUN python3 -m venv /opt/venv")
+
+
+def test_optimized_python_image_skips_apt():
+    spec = renderer.dockerfile_spec({"baseImage": "python:3.11", "optimized": True})
+    assert "apt-get" not in renderer.render("dockerfile", spec).decode("utf-8")
+
+
+# O modo padrão não muda: a imagem do CUDA segue sem o passo do apt
+def test_default_cuda_image_output_unchanged():
+    spec = renderer.dockerfile_spec({"baseImage": renderer.CUDA_IMAGE, "dependencies": "torch"})
+    content = renderer.render("dockerfile", spec).decode("utf-8")
+    assert "apt-get install -y python3 python3-pip" not in content
+    assert content.startswith("# Dockerfile Gerado\n\n# Imagem base\nFROM nvidia/cuda:11.8-cudnn8-devel-ubuntu20.04\n\n# Instalar dependências")
@@ -0,0 +1,72 @@
+import datetime
+from collections import Counter
+
+import mongomock
+
+import auth
+import usage_stats
+
+
+def test_token_matches_requires_configured_token():
+    assert not auth.token_matches("", "")
+    assert not auth.token_matches(None, "segredo")
+    assert not auth.token_matches("séçret", "segredo")
+    assert auth.token_matches("segredo", "segredo")
+
+
+# Remoções descontam o que a criação somou: os contadores ao vivo batem com o rebuild
+def test_forget_many_matches_rebuild():
+    db = mongomock.MongoClient().db
+    created_at = datetime.datetime(2026, 10, 18, 12, 0)
+    documents = [
+        {"content": {"created_at": created_at, "base_image": "python:3.11", "framework": "torch", "gpu_support": True}},
+        {"content": {"created_at": created_at, "base_image": "node:20", "gpu_support": False}},
+    ]
+    db.dockerfile.insert_many(documents)
+    usage_stats.record_many(db, "dockerfile", documents)
+
+    db.dockerfile.delete_one({"_id": documents[0]["_id"]})
+    usage_stats.forget_many(db, "dockerfile", [documents[0]])
+    live = db[usage_stats.COLLECTION].find_one({"_id": "dockerfile:2026-10-18"})
+    assert live["count"] == 1 and live["gpu"] == 0
+
+    usage_stats.rebuild(db)
+    rebuilt = db[usage_stats.COLLECTION].find_one({"_id": "dockerfile:2026-10-18"})
+    assert rebuilt["count"] == live["count"]
+    assert rebuilt["base_images"] == {"node:20": 1}
+    assert usage_stats._top(Counter(live["base_images"]), 10) == [{"name": "node:20", "count": 1}]
+
+
+# Criar e remover não grava em usage_stats durante a requisição; o flush aplica o saldo
+def test_recorder_defers_counters(app, client, db, auth_headers):
+    recorder = app.extensions["usage_recorder"]
+    client.post("/createDockerfile", json={"baseImage": "python:3.11"}, headers=auth_headers())
+    client.post("/createDockerfile", json={"baseImage": "node:20"}, headers=auth_headers())
+    assert db[usage_stats.COLLECTION].count_documents({}) == 0
+
+    recorder.flush()
+    day = db[usage_stats.COLLECTION].find_one()
+    assert day["count"] == 2
+
+    history_id = str(db.dockerfile.find_one({"content.base_image": "node:20"})["_id"])
+    client.delete("/dockerfileHistoryDelete", json={"_id": history_id}, headers=auth_headers())
+    recorder.flush()
+    day = db[usage_stats.COLLECTION].find_one()
+    assert day["count"] == 1 and day["base_images"]["node:20"] == 0
+
+
+def test_recorder_keeps_counters_when_flush_fails():
+    db = mongomock.MongoClient().db
+    databases = [None, db]
+    recorder = usage_stats.UsageRecorder(lambda: databases.pop(0), flush_interval=60)
+    content = {"created_at": datetime.datetime(2026, 10, 18, 12, 0), "base_image": "python:3.11"}
+    recorder.record("dockerfile", content)
+    recorder.record("dockerfile", content)
+    recorder.forget("dockerfile", [{"content": content}])
+
+    recorder.flush()
+    assert recorder.stats()["failed"] == 1 and recorder.stats()["pending"] == 1
+
+    recorder.flush()
+    assert db[usage_stats.COLLECTION].find_one({"_id": "dockerfile:2026-10-18"})["count"] == 1
+    recorder.close()
@@ -0,0 +1,174 @@
+import time
+
+import pytest
+
+import renderer
+import user_templates
+
+SPEC = renderer.dockerfile_spec({"baseImage": "python:3.11", "dependencies": "flask, numpy", "startupScript": "python app.py"})
+
+NESTED_LOOPS = "{% for i in range(10000) %}{% for j in range(10000) %}{% endfor %}{% endfor %}"
+
+
+def compiled(source, template_id="id", version=1):
+    return user_templates.CompiledTemplate(template_id, version, source, user_templates.compile_source(source))
+
+
+def render(source, max_output=1024 * 1024):
+    return compiled(source).render("dockerfile", SPEC, max_output)
+
+
+@pytest.fixture(scope="module")
+def template_renderer():
+    template_renderer = user_templates.TemplateRenderer(workers=1, timeout=0.5, memory_limit=256 * 1024 * 1024)
+    yield template_renderer
+    template_renderer.shutdown()
+
+
+def test_render_spec_fields():
+    source = "FROM {{ base_image }}\n{% for d in dependencies|split_list %}RUN pip install {{ d }}\n{% endfor %}CMD {{ command|json }}\n"
+    assert render(source) == b'FROM python:3.11\nRUN pip install flask\nRUN pip install numpy\nCMD ["python", "app.py"]\n'
+
+
+# A repetição é recusada antes de alocar o texto
+def test_huge_repeat_fails_fast():
+    start = time.perf_counter()
+    with pytest.raises(user_templates.TemplateError):
+        render("{{ 'a' * 300000000 }}")
+    assert time.perf_counter() - start < 0.5
+
+
+def test_range_is_capped():
+    with pytest.raises(user_templates.TemplateError):
+        render("{% for i in range(10000000) %}{% endfor %}")
+
+
+# A saída é interrompida assim que passa do limite, sem gerar o restante
+def test_output_stops_at_max_output():
+    start = time.perf_counter()
+    with pytest.raises(user_templates.TemplateError, match="grande demais"):
+        render("{% for i in range(10000) %}{% for j in range(10000) %}x{% endfor %}{% endfor %}", max_output=1000)
+    assert time.perf_counter() - start < 0.5
+
+
+@pytest.mark.parametrize("source", [
+    "{{ 10 ** 10000000 }}",
+    "{{ '%0999999999d' % 1 }}",
+    "{{ 'a'|center(300000000) }}",
+    "{{ 'a'.ljust(300000000) }}",
+])
+def test_growing_values_are_rejected(source):
+    with pytest.raises(user_templates.TemplateError):
+        render(source)
+
+
+def test_renderer_process_matches_in_process_render(template_renderer):
+    source = "FROM {{ base_image }}\nCMD {{ command|json }}\n"
+    assert template_renderer.render(compiled(source), "dockerfile", SPEC, 1024) == render(source)
+
+
+# O processo que passa do prazo é morto; o próximo render usa um processo novo
+def test_nested_loops_hit_the_time_limit(template_renderer):
+    start = time.perf_counter()
+    with pytest.raises(user_templates.TemplateError, match="Tempo esgotado"):
+        template_renderer.render(compiled(NESTED_LOOPS, "loops"), "dockerfile", SPEC, 1024)
+    assert time.perf_counter() - start < 1.5
+
+    assert template_renderer.render(compiled("FROM {{ base_image }}", "loops", version=2), "dockerfile", SPEC, 1024) == b"FROM python:3.11"
+    assert template_renderer.stats()["timeouts"] == 1
+
+
+# Concatenação com ~ não passa pelo sandbox: para no limite de memória do processo
+def test_concat_growth_hits_the_memory_limit(template_renderer):
+    source = "{% set ns = namespace(s='x') %}{% for i in range(40) %}{% set ns.s = ns.s ~ ns.s %}{% endfor %}"
+    with pytest.raises(user_templates.TemplateError, match="Memória esgotada"):
+        template_renderer.render(compiled(source, "concat"), "dockerfile", SPEC, 1024)
+
+
+def test_template_errors_come_back_from_the_process(template_renderer):
+    with pytest.raises(user_templates.TemplateError, match="Erro ao renderizar"):
+        template_renderer.render(compiled("{{ 1 / 0 }}", "division"), "dockerfile", SPEC, 1024)
+
+
+def _create_template(client, auth_headers, source):
+    response = client.post("/templates", json={"name": "meu", "kind": "dockerfile", "source": source}, headers=auth_headers())
+    return response.get_json()["id"]
+
+
+def _history_form(db):
+    content = db.dockerfile.find_one()["content"]
+    return {key: value for key, value in content.items() if key not in ("created_at", "user_id", "artifact")}
+
+
+# Artefato expirado: o registro é gerado de novo com a versão do template usada na criação
+def test_history_without_artifact_uses_recorded_template(app, client, db, auth_headers, monkeypatch):
+    monkeypatch.setattr(app.extensions["template_renderer"], "workers", 0)
+    template_id = _create_template(client, auth_headers, "FROM {{ base_image }} # meu template\n")
+    created = client.post("/createDockerfile", json={"baseImage": "python:3.11", "templateId": template_id}, headers=auth_headers())
+    app.extensions["render_cache"].clear()
+
+    response = client.post("/createDockerfileHistory", json=_history_form(db), headers=auth_headers())
+    assert response.status_code == 200
+    assert response.data == created.data == b"FROM python:3.11 # meu template\n"
+
+
+def test_history_without_artifact_rejects_changed_template(app, client, db, auth_headers, monkeypatch):
+    monkeypatch.setattr(app.extensions["template_renderer"], "workers", 0)
+    template_id = _create_template(client, auth_headers, "FROM {{ base_image }}\n")
+    client.post("/createDockerfile", json={"baseImage": "python:3.11", "templateId": template_id}, headers=auth_headers())
+    client.put(f"/templates/{template_id}", json={"source": "FROM {{ runtime_image }}\n"}, headers=auth_headers())
+
+    response = client.post("/createDockerfileHistory", json=_history_form(db), headers=auth_headers())
+    assert response.status_code == 409
+
+    client.delete(f"/templates/{template_id}", headers=auth_headers())
+    response = client.post("/createDockerfileHistory", json=_history_form(db), headers=auth_headers())
+    assert response.status_code == 404
+
+
+def test_cache_keeps_one_version_per_template():
+    cache = user_templates.TemplateCache(max_size=2)
+    cache.compile("a", 1, "v1")
+    assert cache.get("a", 1).source == "v1"
+    assert cache.get("a", 2) is None
+
+    cache.compile("a", 2, "v2")
+    # Uma versão mais antiga compilada depois não substitui a atual
+    cache.set(compiled("v1", "a", version=1))
+    assert cache.get("a", 2).source == "v2"
+
+    cache.compile("b", 1, "b")
+    cache.compile("c", 1, "c")
+    assert cache.get("a", 2) is None
+    assert cache.stats()["compilations"] == 4
+
+
+def test_template_crud(client, auth_headers):
+    template_id = _create_template(client, auth_headers, "FROM {{ base_image }}\n")
+
+    assert client.get("/templates", headers=auth_headers()).get_json()["templates"][0]["id"] == template_id
+    assert client.get(f"/templates/{template_id}", headers=auth_headers("u2")).status_code == 404
+    updated = client.put(f"/templates/{template_id}", json={"name": "outro"}, headers=auth_headers()).get_json()
+    assert (updated["name"], updated["version"]) == ("outro", 2)
+
+    invalid = client.post("/templates", json={"name": "x", "kind": "dockerfile", "source": "{% if %}"}, headers=auth_headers())
+    assert invalid.status_code == 400
+    assert "sintaxe" in invalid.get_json()["error"]
+
+    assert client.delete(f"/templates/{template_id}", headers=auth_headers()).status_code == 200
+    assert client.get("/templates", headers=auth_headers()).get_json()["templates"] == []
+
+
+# A versão nova do template muda o arquivo e a ETag na próxima geração
+def test_update_changes_generated_file(app, client, auth_headers, monkeypatch):
+    monkeypatch.setattr(app.extensions["template_renderer"], "workers", 0)
+    template_id = _create_template(client, auth_headers, "FROM {{ base_image }}\n")
+    form = {"baseImage": "python:3.11", "templateId": template_id}
+    first = client.post("/createDockerfile", json=form, headers=auth_headers())
+
+    client.put(f"/templates/{template_id}", json={"source": "FROM {{ base_image }} AS app\n"}, headers=auth_headers())
+    second = client.post("/createDockerfile", json=form, headers=auth_headers())
+
+    assert second.data == b"FROM python:3.11 AS app\n"
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert client.post("/createDockerfile", json=form).status_code == 400
@@ -0,0 +1,306 @@
+import datetime
+import os
+import threading
+import time
+from collections import Counter
+from urllib.parse import unquote
+
+import click
+from flask import current_app, request
+from flask.cli import AppGroup
+
+import auth
+from database import get_db
+
+# Estatísticas de uso pré-calculadas: um documento por tipo e dia ("dockerfile:2026-10-18")
+# com o total de registros, quantos pedem GPU e contadores por imagem base e framework.
+# Contam os registros existentes no histórico, agrupados pelo dia de criação: save_history e o
+# write-behind incrementam, remoções decrementam e restaurações da lixeira incrementam de novo,
+# a mesma regra do rebuild. Criações e remoções avulsas passam pelo UsageRecorder, que soma em
+# memória e grava a cada USAGE_STATS_FLUSH_INTERVAL segundos, fora da requisição.
+# O painel lê no máximo um documento por dia em vez de agregar o histórico.
+# Dados de todos os usuários: o painel exige o cabeçalho X-Stats-Token (USAGE_STATS_TOKEN)
+COLLECTION = "usage_stats"
+STAGING_COLLECTION = "usage_stats_rebuild"
+
+KINDS = ("dockerfile", "dockercompose")
+
+MAX_VALUE_LENGTH = 100
+
+TOKEN_HEADER = "X-Stats-Token"
+
+# Campos lidos pela reconstrução e pelas remoções
+PROJECTION = {
+    "content.created_at": 1,
+    "content.base_image": 1,
+    "content.framework": 1,
+    "content.gpu_support": 1,
+    "content.services.base_image": 1,
+    "content.services.gpu_support": 1,
+}
+
+
+# Nomes de imagem viram chaves de documento: "." e "$" não podem aparecer no caminho do $inc
+def _escape(value):
+    return value.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def _day(created_at):
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(datetime.timezone.utc)
+    return created_at.date().isoformat()
+
+
+def stats_id(kind, day):
+    return f"{kind}:{day}"
+
+
+def _values(*values):
+    return [value.strip()[:MAX_VALUE_LENGTH] for value in values if isinstance(value, str) and value.strip()]
+
+
+# O que um registro soma no dia dele; no docker compose com vários serviços, cada serviço conta uma imagem
+def _increments(content):
+    services = content.get("services") if isinstance(content.get("services"), list) else [content]
+    increments = Counter({"count": 1})
+    if any(service.get("gpu_support") for service in services if isinstance(service, dict)):
+        increments["gpu"] += 1
+    for base_image in _values(*(service.get("base_image") for service in services if isinstance(service, dict))):
+        increments[f"base_images.{_escape(base_image)}"] += 1
+    for framework in _values(content.get("framework")):
+        increments[f"frameworks.{_escape(framework)}"] += 1
+    return increments
+
+
+# Contadores de cada dia do lote, já somados; sign=-1 desconta registros removidos
+def _day_increments(documents, sign):
+    days = {}
+    for document in documents:
+        content = document.get("content", {})
+        if not isinstance(content.get("created_at"), datetime.datetime):
+            continue
+        days.setdefault(_day(content["created_at"]), Counter()).update(_increments(content))
+
+    return {day: {key: value * sign for key, value in increments.items()} for day, increments in days.items()}
+
+
+def _update(kind, day, increments):
+    return {"_id": stats_id(kind, day)}, {"$inc": increments, "$setOnInsert": {"kind": kind, "day": day}}
+
+
+# Um upsert por dia do lote
+def record_many(db, kind, documents, collection_name=COLLECTION, sign=1):
+    for day, increments in _day_increments(documents, sign).items():
+        db[collection_name].update_one(*_update(kind, day, increments), upsert=True)
+
+
+# Registros removidos do histórico (documentos lidos com PROJECTION)
+def forget_many(db, kind, documents):
+    record_many(db, kind, documents, sign=-1)
+
+
+# Contadores acumulados em memória por tipo e dia e gravados por uma thread a cada flush_interval
+# (um upsert por tipo e dia). Um flush que falha devolve os contadores ao buffer; o que ainda
+# estiver no buffer quando o worker morre sem passar pelo close se perde (o rebuild recalcula)
+class UsageRecorder:
+    def __init__(self, get_db, flush_interval=5.0):
+        self.get_db = get_db
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pending = {}
+        self._thread = None
+        self._stopping = threading.Event()
+
+        self.flushes = 0
+        self.updates = 0
+        self.failed = 0
+
+    # Buffer e thread do processo atual (seguro após o fork do gunicorn); chamado com o lock
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        if self._pid != os.getpid():
+            self._pending = {}
+        self._pid = os.getpid()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="usage-stats", daemon=True)
+        self._thread.start()
+
+    def _merge(self, pending):
+        for slot, increments in pending.items():
+            self._pending.setdefault(slot, Counter()).update(increments)
+
+    def add(self, kind, documents, sign=1):
+        increments = _day_increments(documents, sign)
+        if not increments:
+            return
+        with self._lock:
+            if self._stopping.is_set() and self._pid == os.getpid():
+                return
+            self._ensure_started()
+            self._merge({(kind, day): values for day, values in increments.items()})
+
+    def record(self, kind, content):
+        self.add(kind, [{"content": content}])
+
+    def forget(self, kind, documents):
+        self.add(kind, documents, -1)
+
+    def flush(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            pending, self._pending = self._pending, {}
+
+        updates = 0
+        try:
+            db = self.get_db()
+            while pending:
+                (kind, day), increments = next(iter(pending.items()))
+                # Criação e remoção no mesmo intervalo se anulam
+                increments = {key: value for key, value in increments.items() if value}
+                if increments:
+                    db[COLLECTION].update_one(*_update(kind, day, increments), upsert=True)
+                    updates += 1
+                del pending[(kind, day)]
+        except Exception as e:
+            print(f"Erro ao gravar estatísticas de uso: {e}")
+            with self._lock:
+                self._merge(pending)
+                self.failed += 1
+
+        with self._lock:
+            self.flushes += 1
+            self.updates += updates
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+
+    # Grava o que restou no buffer (chamado no desligamento do worker)
+    def close(self, timeout=10):
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending) if self._pid == os.getpid() else 0,
+                "flushes": self.flushes,
+                "updates": self.updates,
+                "failed": self.failed,
+            }
+
+
+def recorder():
+    return current_app.extensions["usage_recorder"]
+
+
+# Contadores zerados por remoções não entram no ranking
+def _top(counters, limit):
+    ranked = sorted(((name, count) for name, count in counters.items() if count > 0), key=lambda item: (-item[1], item[0]))[:limit]
+    return [{"name": unquote(name), "count": count} for name, count in ranked]
+
+
+# Junta os documentos diários do período: até days leituras por _id, sem tocar no histórico
+def summary(db, kind, days, top):
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    period = [(today - datetime.timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+    documents = {
+        document["day"]: document
+        for document in db[COLLECTION].find({"_id": {"$in": [stats_id(kind, day) for day in period]}})
+    }
+
+    total = gpu = 0
+    base_images = Counter()
+    frameworks = Counter()
+    per_day = []
+    for day in period:
+        document = documents.get(day, {})
+        total += document.get("count", 0)
+        gpu += document.get("gpu", 0)
+        base_images.update(document.get("base_images", {}))
+        frameworks.update(document.get("frameworks", {}))
+        per_day.append({"day": day, "count": document.get("count", 0)})
+
+    result = {
+        "total": total,
+        "gpu": gpu,
+        "gpu_rate": round(gpu / total, 4) if total else 0,
+        "base_images": _top(base_images, top),
+        "per_day": per_day,
+    }
+    if kind == "dockerfile":
+        result["frameworks"] = _top(frameworks, top)
+    return result
+
+
+# Recalcula tudo a partir dos registros atuais do histórico (a mesma contagem mantida ao vivo),
+# em lotes, numa coleção temporária que depois substitui usage_stats. Registros criados entre o fim da leitura e o rename não entram;
+# os que ainda estavam no buffer dos workers entram duas vezes
+def rebuild(db, batch_size=1000, progress=None):
+    db[STAGING_COLLECTION].drop()
+    processed = 0
+    for kind in KINDS:
+        cursor = db[kind].find({}, PROJECTION).sort("_id", 1).batch_size(batch_size)
+        try:
+            batch = []
+            for document in cursor:
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    record_many(db, kind, batch, STAGING_COLLECTION)
+                    processed += len(batch)
+                    batch = []
+                    if progress:
+                        progress(kind, processed)
+            if batch:
+                record_many(db, kind, batch, STAGING_COLLECTION)
+                processed += len(batch)
+        finally:
+            cursor.close()
+
+    if db[STAGING_COLLECTION].estimated_document_count():
+        db[STAGING_COLLECTION].rename(COLLECTION, dropTarget=True)
+    else:
+        db[COLLECTION].delete_many({})
+    return processed
+
+
+# Os comandos de um AppGroup rodam dentro do contexto do app
+cli = AppGroup("usage-stats", help="Estatísticas de uso pré-calculadas")
+
+
+@cli.command("rebuild", help="Recalcula as estatísticas a partir do histórico completo")
+@click.option("--batch-size", type=int, default=None, help="Registros lidos por lote")
+def rebuild_command(batch_size):
+    current_app.extensions["mongo"].warmup()
+    start = time.perf_counter()
+    processed = rebuild(
+        get_db(),
+        batch_size or current_app.config["USAGE_STATS_REBUILD_BATCH"],
+        progress=lambda kind, count: click.echo(f"{count} registros processados ({kind})"),
+    )
+    click.echo(f"Estatísticas reconstruídas: {processed} registros em {time.perf_counter() - start:.1f}s")
+
+
+def authorized():
+    return auth.token_matches(request.headers.get(TOKEN_HEADER), current_app.config["USAGE_STATS_TOKEN"])
+
+
+#   flask --app app usage-stats rebuild
+def init_app(app):
+    app.config.setdefault("USAGE_STATS_TOKEN", "")
+    app.config.setdefault("USAGE_STATS_DAYS", 30)
+    app.config.setdefault("USAGE_STATS_MAX_DAYS", 365)
+    app.config.setdefault("USAGE_STATS_TOP", 10)
+    app.config.setdefault("USAGE_STATS_REBUILD_BATCH", 1000)
+    app.config.setdefault("USAGE_STATS_FLUSH_INTERVAL", 5.0)
+    app.cli.add_command(cli)
+
+    instance = UsageRecorder(lambda: app.extensions["mongo"].db, app.config["USAGE_STATS_FLUSH_INTERVAL"])
+    app.extensions["usage_recorder"] = instance
+    return instance
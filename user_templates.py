@@ -0,0 +1,592 @@
+import datetime
+import functools
+import json
+import multiprocessing
+import os
+import queue
+import re
+import threading
+from collections import OrderedDict
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from jinja2 import TemplateError as JinjaTemplateError
+from jinja2.sandbox import SandboxedEnvironment
+from pymongo import ReturnDocument
+
+import compose_emitter
+import renderer
+
+try:
+    import resource
+except ImportError:  # Windows: sem limite de memória nos processos de render
+    resource = None
+
+# Templates de Dockerfile e docker-compose salvos pelos usuários (Jinja2 em sandbox).
+# Cada gravação incrementa version; o worker guarda o template compilado por _id e versão
+# e a cada uso só lê a versão atual (leitura por _id com projeção) para saber se o compilado vale.
+# O template roda com limites: tamanho de cada valor produzido (MAX_VALUE_SIZE, conferido antes
+# de repetir ou preencher textos), itens de range e tamanho da saída. Tempo e memória são
+# impostos de fora do interpretador: o render roda em processos separados (TemplateRenderer)
+COLLECTION = "templates"
+
+KINDS = ("dockerfile", "dockercompose")
+
+NAME_MAX_LENGTH = 100
+
+MAX_VALUE_SIZE = 1024 * 1024
+MAX_INT_BITS = 4096
+MAX_RANGE = 10000
+
+# Métodos de texto que crescem conforme um argumento numérico ou uma lista; os filtros
+# equivalentes (center, indent, replace, format, join) são conferidos antes de rodar
+_UNSAFE_STR_METHODS = frozenset(["center", "ljust", "rjust", "zfill", "expandtabs", "format", "format_map", "replace", "join"])
+# Largura ou precisão enorme (ou vinda de argumento, "*") em formatação com %
+_WIDE_FORMAT_RE = re.compile(r"%[-+ #0]*(?:\*|\d{5,})|%[-+ #0]*\d*\.(?:\*|\d{5,})")
+
+
+# Template inválido, de outro tipo ou que falhou ao renderizar
+class TemplateError(ValueError):
+    pass
+
+
+class TemplateNotFound(LookupError):
+    pass
+
+
+# Registro gerado com uma versão do template que já foi alterada
+class TemplateChanged(Exception):
+    pass
+
+
+# Todos os processos de render ocupados: a rota responde 503 com Retry-After
+class TemplateUnavailable(Exception):
+    pass
+
+
+def _split_list(value):
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in str(value or "").split(",") if item.strip()]
+
+
+# "CHAVE=valor, OUTRA=2" -> {"CHAVE": "valor", "OUTRA": "2"}
+def _env_dict(value):
+    return {
+        item.split("=", 1)[0].strip(): item.split("=", 1)[1].strip()
+        for item in _split_list(value) if "=" in item
+    }
+
+
+# Tamanho aproximado do valor depois de virar texto; para de contar ao passar do limite
+def _size(value):
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (list, tuple, dict)):
+        total = 0
+        for item in value.items() if isinstance(value, dict) else value:
+            total += _size(item) + 1
+            if total > MAX_VALUE_SIZE:
+                break
+        return total
+    return 1
+
+
+def _check_size(size):
+    if size > MAX_VALUE_SIZE:
+        raise TemplateError(f"O template produziu um valor maior que {MAX_VALUE_SIZE} caracteres")
+
+
+def _check_format(value):
+    if isinstance(value, str) and _WIDE_FORMAT_RE.search(value):
+        raise TemplateError("Largura de formatação grande demais no template")
+
+
+def _check_int_bits(bits):
+    if bits > MAX_INT_BITS:
+        raise TemplateError("Número grande demais no template")
+
+
+def _safe_range(*args):
+    numbers = range(*args)
+    if len(numbers) > MAX_RANGE:
+        raise TemplateError(f"range com mais de {MAX_RANGE} itens no template")
+    return numbers
+
+
+# Confere o tamanho do valor recebido e do resultado de um filtro
+def _limited_filter(function, check=None):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        # Filtros com pass_context/pass_eval_context recebem o contexto antes do valor
+        offset = 1 if getattr(function, "jinja_pass_arg", None) is not None else 0
+        value = args[offset]
+        # Geradores (map, select...) viram lista para poderem ser medidos e ainda usados pelo filtro
+        if hasattr(value, "__next__"):
+            value = list(value)
+            args = args[:offset] + (value,) + args[offset + 1:]
+        _check_size(_size(value))
+        if check is not None:
+            check(*args[offset:], **kwargs)
+        result = function(*args, **kwargs)
+        _check_size(_size(result))
+        return result
+    return wrapper
+
+
+def _check_center(value, width=80, *args, **kwargs):
+    _check_size(width if isinstance(width, int) else 0)
+
+
+def _check_indent(value, width=4, *args, **kwargs):
+    width = len(width) if isinstance(width, str) else width if isinstance(width, int) else 0
+    _check_size(_size(value) + width * (str(value).count("\n") + 1))
+
+
+def _check_replace(value, old, new, count=None):
+    text = str(value)
+    occurrences = text.count(str(old)) if str(old) else len(text) + 1
+    if isinstance(count, int) and count >= 0:
+        occurrences = min(occurrences, count)
+    _check_size(len(text) + occurrences * len(str(new)))
+
+
+def _check_format_filter(value, *args, **kwargs):
+    _check_format(value)
+
+
+def _check_join(value, separator="", attribute=None):
+    _check_size(sum(_size(item) for item in value) + len(value) * len(str(separator)))
+
+
+_FILTER_CHECKS = {
+    "center": _check_center,
+    "indent": _check_indent,
+    "replace": _check_replace,
+    "format": _check_format_filter,
+    "join": _check_join,
+}
+
+
+# Concatenação com ~ não tem gancho no sandbox: quem repete ~ em laço esbarra no limite de
+# memória do processo de render
+class _LimitedEnvironment(SandboxedEnvironment):
+    intercepted_binops = frozenset(["*", "**", "%", "+"])
+
+    def call_binop(self, context, operator, left, right):
+        if operator == "*":
+            for sequence, count in ((left, right), (right, left)):
+                if isinstance(sequence, (str, list, tuple)) and isinstance(count, int):
+                    _check_size(_size(sequence) * count)
+            if isinstance(left, int) and isinstance(right, int):
+                _check_int_bits(left.bit_length() + right.bit_length())
+        elif operator == "**":
+            if isinstance(left, int) and isinstance(right, int) and right > 0 and abs(left) > 1:
+                _check_int_bits(left.bit_length() * right)
+            elif isinstance(right, (int, float)) and abs(right) > MAX_INT_BITS:
+                raise TemplateError("Expoente grande demais no template")
+        elif operator == "%":
+            _check_format(left)
+        elif operator == "+" and isinstance(left, (str, list, tuple)):
+            _check_size(_size(left) + _size(right))
+        return super().call_binop(context, operator, left, right)
+
+    def is_safe_attribute(self, obj, attr, value):
+        if isinstance(obj, str) and attr in _UNSAFE_STR_METHODS:
+            return False
+        return super().is_safe_attribute(obj, attr, value)
+
+
+# Valores impressos com {{ }} também respeitam o limite antes de virar texto
+def _finalize(value):
+    _check_size(_size(value))
+    return value
+
+
+def _make_environment():
+    environment = _LimitedEnvironment(
+        autoescape=False, trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True, finalize=_finalize,
+    )
+    environment.filters["split_list"] = _split_list
+    environment.filters["env_dict"] = _env_dict
+    environment.filters["json"] = lambda value: json.dumps(value, ensure_ascii=False)
+    environment.filters["yaml"] = compose_emitter.dump
+    for name, function in list(environment.filters.items()):
+        environment.filters[name] = _limited_filter(function, _FILTER_CHECKS.get(name))
+    environment.globals["range"] = _safe_range
+    environment.globals.pop("lipsum", None)
+    return environment
+
+
+# Um ambiente por processo; compilar e renderizar com ele é seguro entre threads
+ENVIRONMENT = _make_environment()
+
+
+def compile_source(source):
+    try:
+        return ENVIRONMENT.from_string(source)
+    except JinjaTemplateError as e:
+        raise TemplateError(f"Erro de sintaxe no template: {e}")
+
+
+# Variáveis disponíveis no template: os campos da especificação e alguns valores já prontos
+def context(kind, spec):
+    if kind == "dockerfile":
+        return dict(
+            spec,
+            cuda_image=renderer.CUDA_IMAGE,
+            runtime_image=renderer.runtime_image(spec["base_image"]),
+            command=spec["startup_script"].split() if spec["startup_script"] else [],
+        )
+    # compose é o documento que o gerador padrão escreveria ({{ compose | yaml }})
+    return dict(spec, compose=renderer.build_dockercompose(spec))
+
+
+# Template compilado pronto para uso; key entra na chave de cache/ETag do arquivo gerado
+class CompiledTemplate:
+    def __init__(self, template_id, version, source, template):
+        self.id = template_id
+        self.version = version
+        self.source = source
+        self.template = template
+
+    @property
+    def key(self):
+        return f"template:{self.id}:{self.version}"
+
+    # A saída é gerada em partes e o render para assim que passa de max_output bytes
+    def render(self, kind, spec, max_output):
+        chunks = []
+        size = 0
+        try:
+            for chunk in self.template.generate(context(kind, spec)):
+                chunk = chunk.encode("utf-8")
+                size += len(chunk)
+                if size > max_output:
+                    raise TemplateError("O template gerou um arquivo grande demais")
+                chunks.append(chunk)
+        except JinjaTemplateError as e:
+            raise TemplateError(f"Erro ao renderizar o template: {e}")
+        return b"".join(chunks)
+
+
+# Cache LRU dos templates compilados; uma entrada com versão diferente da atual é descartada
+class TemplateCache:
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.compilations = 0
+
+    def get(self, template_id, version):
+        with self._lock:
+            entry = self._entries.get(template_id)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(template_id)
+            self.hits += 1
+            return entry
+
+    def set(self, compiled):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            current = self._entries.get(compiled.id)
+            # Outra thread pode ter compilado uma versão mais nova enquanto isso
+            if current is not None and current.version > compiled.version:
+                return
+            self._entries[compiled.id] = compiled
+            self._entries.move_to_end(compiled.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, template_id):
+        with self._lock:
+            self._entries.pop(template_id, None)
+
+    def compile(self, template_id, version, source):
+        compiled = CompiledTemplate(template_id, version, source, compile_source(source))
+        with self._lock:
+            self.compilations += 1
+        self.set(compiled)
+        return compiled
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "compilations": self.compilations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Laço dos processos de render: cada pedido traz o código-fonte, compilado uma vez por versão
+# no cache do próprio processo. Responde ("ok", bytes) ou ("error", mensagem)
+def _render_worker(connection, memory_limit, cache_size):
+    if memory_limit and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    cache = TemplateCache(max_size=cache_size)
+    while True:
+        try:
+            template_id, version, source, kind, spec, max_output = connection.recv()
+        except EOFError:
+            return
+        try:
+            compiled = cache.get(template_id, version) or cache.compile(template_id, version, source)
+            reply = ("ok", compiled.render(kind, spec, max_output))
+        except TemplateError as e:
+            reply = ("error", str(e))
+        except MemoryError:
+            reply = ("error", "Memória esgotada ao renderizar o template")
+        except Exception as e:
+            reply = ("error", f"Erro ao renderizar o template: {e}")
+        connection.send(reply)
+
+
+class _RenderProcess:
+    def __init__(self, context, memory_limit, cache_size):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_render_worker, args=(child, memory_limit, cache_size), daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+# Render dos templates em processos separados. O processo que passa do prazo é morto e
+# trocado por outro no próximo uso; a memória de cada processo é limitada por RLIMIT_AS
+class TemplateRenderer:
+    def __init__(self, workers=2, timeout=2.0, memory_limit=512 * 1024 * 1024, cache_size=256):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._context = None
+        self._idle = None
+        self.renders = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    # Processos por worker HTTP: o gunicorn faz fork depois de importar o app.
+    # A fila guarda um lugar por processo; None é um lugar ainda sem processo
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            methods = multiprocessing.get_all_start_methods()
+            self._context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self._idle = queue.LifoQueue()
+            for _ in range(self.workers):
+                self._idle.put(None)
+            self._pid = os.getpid()
+
+    def _discard(self, process, timed_out=False):
+        process.kill()
+        with self._lock:
+            self.restarts += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def render(self, template, kind, spec, max_output):
+        # workers=0 renderiza no próprio processo, sem limite de tempo nem de memória (desenvolvimento)
+        if self.workers <= 0:
+            return template.render(kind, spec, max_output)
+
+        self._ensure_started()
+        idle = self._idle
+        try:
+            process = idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TemplateUnavailable("Processos de template ocupados")
+
+        try:
+            if process is None:
+                process = _RenderProcess(self._context, self.memory_limit, self.cache_size)
+            process.connection.send((template.id, template.version, template.source, kind, spec, max_output))
+            if not process.connection.poll(self.timeout):
+                self._discard(process, timed_out=True)
+                process = None
+                raise TemplateError("Tempo esgotado ao renderizar o template")
+            status, result = process.connection.recv()
+        except (EOFError, OSError):
+            # Processo encerrado no meio do render (OOM killer, sinal)
+            if process is not None:
+                self._discard(process)
+            process = None
+            raise TemplateError("O processo de template foi encerrado ao renderizar")
+        finally:
+            idle.put(process)
+
+        with self._lock:
+            self.renders += 1
+        if status == "error":
+            raise TemplateError(result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "renders": self.renders,
+                "timeouts": self.timeouts,
+                "restarts": self.restarts,
+            }
+
+    def shutdown(self):
+        if self._idle is None or self._pid != os.getpid():
+            return
+        while True:
+            try:
+                process = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if process is not None:
+                process.kill()
+
+
+def object_id(template_id):
+    try:
+        return ObjectId(template_id)
+    except (InvalidId, TypeError):
+        raise TemplateNotFound("Template não encontrado")
+
+
+def serialize(document, include_source=True):
+    result = {
+        "id": str(document["_id"]),
+        "name": document["name"],
+        "kind": document["kind"],
+        "version": document["version"],
+        "created_at": document["created_at"],
+        "updated_at": document["updated_at"],
+    }
+    if include_source:
+        result["source"] = document["source"]
+    return result
+
+
+# Valida o JSON recebido; partial=True aceita só parte dos campos (atualização)
+def parse(data, max_size, partial=False):
+    if not isinstance(data, dict):
+        raise TemplateError("JSON inválido")
+
+    fields = {}
+    if "name" in data or not partial:
+        name = data.get("name")
+        if not isinstance(name, str) or not name.strip():
+            raise TemplateError("Informe o nome do template")
+        if len(name.strip()) > NAME_MAX_LENGTH:
+            raise TemplateError(f"Nome do template com mais de {NAME_MAX_LENGTH} caracteres")
+        fields["name"] = name.strip()
+    if not partial:
+        if data.get("kind") not in KINDS:
+            raise TemplateError("kind deve ser dockerfile ou dockercompose")
+        fields["kind"] = data["kind"]
+    if "source" in data or not partial:
+        source = data.get("source")
+        if not isinstance(source, str) or not source.strip():
+            raise TemplateError("Informe o conteúdo do template")
+        if len(source.encode("utf-8")) > max_size:
+            raise TemplateError(f"Template maior que {max_size} bytes")
+        # Erro de sintaxe aparece ao salvar, não na primeira geração
+        compile_source(source)
+        fields["source"] = source
+    if partial and not fields:
+        raise TemplateError("Nada para atualizar")
+    return fields
+
+
+def create(db, user_id, fields, max_per_user):
+    if db[COLLECTION].count_documents({"user_id": user_id}, limit=max_per_user) >= max_per_user:
+        raise TemplateError(f"Máximo de {max_per_user} templates por usuário")
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    document = dict(fields, user_id=user_id, version=1, created_at=now, updated_at=now)
+    document["_id"] = db[COLLECTION].insert_one(document).inserted_id
+    return document
+
+
+def list_templates(db, user_id, kind=None):
+    query = {"user_id": user_id}
+    if kind:
+        query["kind"] = kind
+    projection = {"source": 0}
+    return [serialize(document, include_source=False) for document in db[COLLECTION].find(query, projection).sort("name", 1)]
+
+
+def get(db, user_id, template_id):
+    document = db[COLLECTION].find_one({"_id": object_id(template_id), "user_id": user_id})
+    if document is None:
+        raise TemplateNotFound("Template não encontrado")
+    return document
+
+
+# Toda gravação muda a versão: os workers recompilam no próximo uso
+def update(db, user_id, template_id, fields):
+    document = db[COLLECTION].find_one_and_update(
+        {"_id": object_id(template_id), "user_id": user_id},
+        {"$set": dict(fields, updated_at=datetime.datetime.now(datetime.timezone.utc)), "$inc": {"version": 1}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if document is None:
+        raise TemplateNotFound("Template não encontrado")
+    return document
+
+
+def delete(db, user_id, template_id):
+    if not db[COLLECTION].delete_one({"_id": object_id(template_id), "user_id": user_id}).deleted_count:
+        raise TemplateNotFound("Template não encontrado")
+
+
+# Template compilado do usuário para o tipo pedido. Com o compilado em cache custa uma leitura
+# pequena por _id; o código-fonte só é lido quando a versão mudou ou o worker ainda não o tem
+def load(db, cache, user_id, template_id, kind):
+    oid = object_id(template_id)
+    current = db[COLLECTION].find_one({"_id": oid, "user_id": user_id}, {"version": 1, "kind": 1})
+    if current is None:
+        raise TemplateNotFound("Template não encontrado")
+    if current["kind"] != kind:
+        raise TemplateError(f"O template {template_id} não é de {kind}")
+
+    key = str(oid)
+    compiled = cache.get(key, current["version"])
+    if compiled is not None:
+        return compiled
+
+    document = db[COLLECTION].find_one({"_id": oid, "user_id": user_id}, {"version": 1, "source": 1})
+    if document is None:
+        raise TemplateNotFound("Template não encontrado")
+    return cache.compile(key, document["version"], document["source"])
+
+
+def init_app(app):
+    app.config.setdefault("TEMPLATE_CACHE_SIZE", 256)
+    app.config.setdefault("TEMPLATE_MAX_SIZE", 64 * 1024)
+    app.config.setdefault("TEMPLATE_MAX_OUTPUT", 1024 * 1024)
+    app.config.setdefault("TEMPLATE_RENDER_TIMEOUT", 2.0)
+    app.config.setdefault("TEMPLATE_RENDER_WORKERS", 2)
+    app.config.setdefault("TEMPLATE_RENDER_MEMORY", 512 * 1024 * 1024)
+    app.config.setdefault("TEMPLATE_MAX_PER_USER", 100)
+    app.extensions["template_cache"] = TemplateCache(max_size=app.config["TEMPLATE_CACHE_SIZE"])
+    app.extensions["template_renderer"] = TemplateRenderer(
+        workers=app.config["TEMPLATE_RENDER_WORKERS"],
+        timeout=app.config["TEMPLATE_RENDER_TIMEOUT"],
+        memory_limit=app.config["TEMPLATE_RENDER_MEMORY"],
+        cache_size=app.config["TEMPLATE_CACHE_SIZE"],
+    )
+    return app.extensions["template_cache"]